@@ -0,0 +1,190 @@
+"""
+Dedicated executor and admission control for batch work
+
+Analysis and bulk apply make long runs of blocking Discogs calls. Run on
+Starlette's shared threadpool (or straight on the event loop) a few of them
+can exhaust the default anyio limiter and stall unrelated endpoints such as
+/auth/me. Instead, batch work:
+- runs on its own thread pool (BATCH_EXECUTOR_WORKERS threads), so interactive
+  endpoints never queue behind it
+- is admitted up front: at most BATCH_MAX_ACTIVE runs at a time, further runs
+  are turned away with 503 + Retry-After instead of piling up
+- bulk apply runs as a background job (submit) that the client polls
+- streams (analysis SSE) advance their generator one step at a time on the
+  pool, so a slow client never pins a worker thread
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+BATCH_EXECUTOR_WORKERS = int(os.getenv("BATCH_EXECUTOR_WORKERS", "4"))
+BATCH_MAX_ACTIVE = int(os.getenv("BATCH_MAX_ACTIVE", "8"))
+BATCH_RETRY_AFTER_SECONDS = int(os.getenv("BATCH_RETRY_AFTER_SECONDS", "30"))
+
+BATCH_ACTIVE_RUNS = Gauge("batch_active_runs", "Admitted batch runs (analysis, bulk apply)", ("kind",))
+BATCH_REJECTIONS = Counter("batch_rejections_total", "Batch runs turned away by admission control", ("kind",))
+
+_DONE = object()
+
+class BatchCapacityError(Exception):
+    """Raised when admission control turns a batch run away"""
+
+    def __init__(self, kind: str, retry_after: int = BATCH_RETRY_AFTER_SECONDS):
+        super().__init__(f"Too many {kind} runs in progress, try again in {retry_after}s")
+        self.kind = kind
+        self.retry_after = retry_after
+
+class BatchTicket:
+    """
+    An admitted batch run
+
+    release() is idempotent and thread-safe, so every path that can end a run
+    (the run itself, a response that never started streaming) may call it.
+    """
+
+    def __init__(self, executor: "BatchExecutor", kind: str):
+        self.executor = executor
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._released = False
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.executor._release(self.kind)
+
+class BatchExecutor:
+    """
+    Thread pool plus admission control for analysis and bulk apply
+    """
+
+    def __init__(self, workers: int = BATCH_EXECUTOR_WORKERS, max_active: int = BATCH_MAX_ACTIVE):
+        """
+        Args:
+            workers: Threads that run batch work
+            max_active: Batch runs admitted at once (across all kinds)
+        """
+        self.workers = max(1, workers)
+        self.max_active = max(1, max_active)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch")
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {}
+        self._rejected: Dict[str, int] = {}
+
+    def admit(self, kind: str) -> BatchTicket:
+        """
+        Admit one batch run
+
+        Raises:
+            BatchCapacityError: If BATCH_MAX_ACTIVE runs are already in progress
+        """
+        with self._lock:
+            if sum(self._active.values()) >= self.max_active:
+                self._rejected[kind] = self._rejected.get(kind, 0) + 1
+                BATCH_REJECTIONS.inc(kind=kind)
+                logger.warning(f"Rejected {kind} run: {self.max_active} batch runs already in progress")
+                raise BatchCapacityError(kind)
+            self._active[kind] = self._active.get(kind, 0) + 1
+        BATCH_ACTIVE_RUNS.inc(kind=kind)
+        return BatchTicket(self, kind)
+
+    def _release(self, kind: str):
+        with self._lock:
+            self._active[kind] = max(0, self._active.get(kind, 0) - 1)
+        BATCH_ACTIVE_RUNS.dec(kind=kind)
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Admit a run and start fn(*args, **kwargs) on the batch pool without waiting for it
+
+        Admission happens here, before anything runs, so a caller that hands back a
+        job id (bulk apply) can still turn the request away with 503.
+
+        Raises:
+            BatchCapacityError: If BATCH_MAX_ACTIVE runs are already in progress
+        """
+        ticket = self.admit(kind)
+        try:
+            pending = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            ticket.release()
+            raise
+        # Released when the work ends, not when the caller stops waiting (e.g. client disconnect)
+        pending.add_done_callback(lambda _: ticket.release())
+        return pending
+
+    async def run(self, kind: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Admit a run and execute fn(*args, **kwargs) on the batch pool"""
+        return await asyncio.wrap_future(self.submit(kind, fn, *args, **kwargs))
+
+    async def iterate(self, iterator: Iterator[Any], ticket: Optional[BatchTicket] = None) -> AsyncIterator[Any]:
+        """
+        Drive a blocking iterator (e.g. an SSE generator) on the batch pool
+
+        Each next() runs on a pool thread; nothing blocks the event loop. When
+        the consumer stops early (client disconnect), the iterator is closed on
+        the pool once its current step finishes. The ticket, if given, is
+        released when iteration ends. A response body that is never iterated
+        never gets here, so streaming responses must also release the ticket
+        when they finish (e.g. in a background task).
+        """
+        pending: Optional[Future] = None
+        try:
+            while True:
+                pending = self._executor.submit(next, iterator, _DONE)
+                item = await asyncio.wrap_future(pending)
+                pending = None
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                if pending is None:
+                    self._close(close)
+                else:
+                    # A generator can't be closed while it is running its current step. The pool's
+                    # own future (unlike the cancelled asyncio one) completes only when the step does.
+                    pending.add_done_callback(lambda _: self._close(close))
+            if ticket is not None:
+                ticket.release()
+
+    def _close(self, close: Callable[[], Any]):
+        """Close a finished iterator on the pool (inline once the pool is shut down)"""
+        def run_close():
+            try:
+                close()
+            except Exception as e:
+                logger.error(f"Error closing batch iterator: {e}")
+
+        try:
+            self._executor.submit(run_close)
+        except RuntimeError:
+            run_close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Active and rejected runs by kind"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "maxActive": self.max_active,
+                "active": dict(self._active),
+                "rejected": dict(self._rejected)
+            }
+
+    def shutdown(self):
+        """Stop accepting work; running steps finish in the background"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# Global batch executor instance
+batch_executor = BatchExecutor()
@@ -0,0 +1,61 @@
+"""
+End-to-end analysis stream throughput against a mocked Discogs client
+
+Drives the /inventory/suggestions/stream endpoint function directly and drains
+its event stream, so the timing covers inventory fetch, per-item pricing,
+batching/serialization, job heartbeats and session persistence.
+
+The 10k case is above INVENTORY_EXPORT_THRESHOLD, so its inventory comes from
+the (mocked) inventory export and its CSV parsing is part of the timing.
+"""
+
+import asyncio
+import secrets
+
+import pytest
+
+import main
+from conftest import FakeDiscogsClient, make_listings
+
+def _new_session() -> str:
+    session_id = secrets.token_urlsafe(16)
+    main.session_manager.set_session(session_id, {
+        "user": {
+            "id": session_id,
+            "username": f"bench-{session_id[:6]}",
+            "email": "bench@example.invalid",
+            "discogsUserId": None,
+            "accessToken": "bench-token",
+            "accessTokenSecret": "bench-secret"
+        },
+        "strategies": [],
+        "settings": {},
+        "logs": []
+    })
+    return session_id
+
+async def _drain(session_id: str) -> int:
+    response = await main.get_suggestions_stream(
+        session_id=session_id, batch=25, progress_ms=250, progress_items=50, last_event_id=None)
+    frames = 0
+    async for _ in response.body_iterator:
+        frames += 1
+    return frames
+
+@pytest.mark.parametrize("size", [100, 1000, 10000])
+def test_generate_suggestions(benchmark, monkeypatch, size):
+    FakeDiscogsClient.listings = make_listings(size)
+    monkeypatch.setattr(main, "discogs_client_for", lambda user, lane=None: FakeDiscogsClient())
+
+    def setup():
+        # Fresh session each round so the stream always runs a full analysis
+        return (_new_session(),), {}
+
+    def run(session_id):
+        frames = asyncio.run(_drain(session_id))
+        main.session_manager.delete_session(session_id)
+        return frames
+
+    rounds = 1 if size >= 10000 else 3
+    benchmark.extra_info["listings"] = size
+    benchmark.pedantic(run, setup=setup, rounds=rounds, iterations=1)
@@ -0,0 +1,39 @@
+"""
+Per-item pricing benchmarks: condition matching, status classification and
+building a full suggestion
+"""
+
+import pytest
+
+from pricing import build_suggestion, classify_status, match_condition_price
+from conftest import make_price_suggestions
+
+def _pairs(listings):
+    return [(listing, make_price_suggestions(listing["release"]["id"])) for listing in listings]
+
+def test_match_condition_price(benchmark, listings_1k):
+    pairs = _pairs(listings_1k)
+
+    def run():
+        for listing, suggestions in pairs:
+            match_condition_price(suggestions, listing["condition"])
+
+    benchmark(run)
+
+def test_classify_status(benchmark, listings_1k):
+    prices = [(listing["price"]["value"] * 1.2, listing["price"]["value"]) for listing in listings_1k]
+
+    def run():
+        for suggested, current in prices:
+            classify_status(suggested, current)
+
+    benchmark(run)
+
+def test_build_suggestion(benchmark, listings_1k):
+    pairs = _pairs(listings_1k)
+
+    def run():
+        for listing, suggestions in pairs:
+            build_suggestion(listing, suggestions)
+
+    benchmark(run)
@@ -0,0 +1,50 @@
+"""
+SessionManager write cost of the analysis loop's incremental saves
+"""
+
+import os
+import secrets
+from typing import Any, Dict, List
+
+import pytest
+
+from session_manager import SessionManager
+from pricing import build_suggestion
+from conftest import make_listings, make_price_suggestions
+
+OTHER_SESSIONS = 10
+
+def _suggestions(count: int) -> List[Dict[str, Any]]:
+    listings = make_listings(count)
+    suggestions = [build_suggestion(listing, make_price_suggestions(listing["release"]["id"])) for listing in listings]
+    return [s for s in suggestions if s is not None]
+
+def _session() -> Dict[str, Any]:
+    return {
+        "user": {"id": "bench", "username": "bench", "email": "bench@example.invalid"},
+        "suggestions": [],
+        "settings": {},
+        "strategies": []
+    }
+
+@pytest.mark.parametrize("suggestion_count", [100, 1000, 10000])
+def test_update_session_data(benchmark, scratch_dir, suggestion_count):
+    """
+    One incremental save (as done every 10 suggestions) of a run that has found
+    N suggestions so far, flushed to disk, with other sessions in the store
+    """
+    manager = SessionManager(os.path.join(scratch_dir, f"sessions-{suggestion_count}.db"),
+                             sessions_dir=None, legacy_file=None)
+    for _ in range(OTHER_SESSIONS):
+        manager.set_session(secrets.token_hex(8), _session())
+    session_id = secrets.token_hex(8)
+    manager.set_session(session_id, _session())
+    suggestions = _suggestions(suggestion_count)
+
+    def save():
+        # The analysis loop saves a copy of its growing suggestion list
+        manager.update_session_data(session_id, "suggestions", list(suggestions))
+        manager.flush()
+
+    benchmark(save)
+    manager.close()
@@ -0,0 +1,37 @@
+"""
+SSE serialization benchmarks: raw event encoding and the batcher at different
+batch sizes
+"""
+
+import pytest
+
+from pricing import build_suggestion
+from sse import EventBatcher, StreamCursor, StreamOptions, encode_event
+from conftest import make_price_suggestions
+
+@pytest.fixture(scope="module")
+def suggestions(listings_1k):
+    built = (build_suggestion(listing, make_price_suggestions(listing["release"]["id"])) for listing in listings_1k)
+    return [suggestion for suggestion in built if suggestion is not None]
+
+def test_encode_event(benchmark, suggestions):
+    def run():
+        for suggestion in suggestions:
+            encode_event("suggestion", {"suggestion": suggestion})
+
+    benchmark(run)
+
+@pytest.mark.parametrize("batch_size", [1, 25, 100])
+def test_event_batcher(benchmark, suggestions, batch_size):
+    options = StreamOptions(batch_size=batch_size)
+
+    def run():
+        batcher = EventBatcher(options, StreamCursor("bench"))
+        frames = []
+        for i, suggestion in enumerate(suggestions):
+            frames.extend(batcher.add_suggestion(suggestion))
+            frames.extend(batcher.progress({"current": i + 1, "total": len(suggestions)}))
+        frames.extend(batcher.flush())
+        return frames
+
+    benchmark(run)
@@ -0,0 +1,94 @@
+"""
+Shared fixtures for the WaxValue benchmarks
+
+Benchmarks run against synthetic inventories from discogs_simulator and a
+mocked Discogs client, inside a scratch directory so session, job and rate-limit
+files never touch the working tree.
+
+Run from backend/:
+    pytest benchmarks
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:25%
+"""
+
+import os
+import sys
+import logging
+import tempfile
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Scratch directory for sessions, run logs, the job registry and rate-limit buckets.
+# This must happen before any backend module is imported.
+SCRATCH_DIR = tempfile.mkdtemp(prefix="waxvalue-bench-")
+os.environ.setdefault("SESSIONS_DB", os.path.join(SCRATCH_DIR, "sessions.db"))
+os.environ.setdefault("SESSIONS_DIR", os.path.join(SCRATCH_DIR, "sessions"))
+os.environ.setdefault("SESSIONS_LEGACY_FILE", os.path.join(SCRATCH_DIR, "sessions.json"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(SCRATCH_DIR, 'waxvalue.db')}")
+os.environ.setdefault("JOB_REGISTRY_DB", os.path.join(SCRATCH_DIR, "jobs.db"))
+os.environ.setdefault("DISCOGS_RATE_LIMIT_DIR", SCRATCH_DIR)
+
+from discogs_simulator import SimulatedSeller, CONDITIONS, export_row, release_base_price
+from discogs_client import RequestStats
+
+def pytest_configure(config):
+    # Per-item INFO logging would dominate the timings
+    logging.disable(logging.INFO)
+
+def make_listings(size: int) -> List[Dict[str, Any]]:
+    """Synthetic inventory with the simulator's default duplicate ratio"""
+    return SimulatedSeller(f"bench-{size}", size).listings
+
+def make_price_suggestions(release_id: int) -> Dict[str, Any]:
+    """Price suggestions shaped like Discogs' response"""
+    base = release_base_price(release_id)
+    return {condition: {"currency": "USD", "value": round(base * factor, 2)} for condition, factor in CONDITIONS}
+
+class FakeDiscogsClient:
+    """In-memory stand-in for DiscogsClient serving one synthetic seller"""
+
+    listings: List[Dict[str, Any]] = []
+
+    def __init__(self, *args, **kwargs):
+        self.stats = RequestStats()
+
+    def with_run_stats(self) -> "FakeDiscogsClient":
+        return self
+
+    def get_user_profile(self, username: str) -> Dict[str, Any]:
+        for_sale = sum(1 for listing in self.listings if listing["status"] == "For Sale")
+        return {"username": username, "num_for_sale": for_sale, "num_listing": len(self.listings)}
+
+    def get_user_inventory(self, username: str, page: int = 1, per_page: int = 100, **sort) -> Dict[str, Any]:
+        start = (page - 1) * per_page
+        pages = max(1, (len(self.listings) + per_page - 1) // per_page)
+        return {
+            "pagination": {"page": page, "pages": pages, "per_page": per_page, "items": len(self.listings)},
+            "listings": self.listings[start:start + per_page]
+        }
+
+    def get_price_suggestions(self, release_id: int) -> Dict[str, Any]:
+        self.stats.add(calls=1)
+        return make_price_suggestions(release_id)
+
+    def request_inventory_export(self) -> int:
+        return 1
+
+    def get_inventory_export(self, export_id: int) -> Dict[str, Any]:
+        return {"id": export_id, "status": "success"}
+
+    def iter_inventory_export(self, export_id: int) -> Iterator[Dict[str, str]]:
+        # CSV rows are all strings
+        for listing in self.listings:
+            yield {column: str(value) for column, value in export_row(listing).items()}
+
+@pytest.fixture(scope="session")
+def scratch_dir() -> str:
+    return SCRATCH_DIR
+
+@pytest.fixture(scope="session")
+def listings_1k() -> List[Dict[str, Any]]:
+    return make_listings(1000)
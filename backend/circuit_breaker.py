@@ -0,0 +1,146 @@
+"""
+Circuit breakers for Discogs API calls
+
+Each endpoint class (inventory, price suggestions, listings, ...) has its own
+breaker shared by every client in the process:
+- closed: calls go through; consecutive failures (5xx, timeouts, connection
+  errors) are counted
+- open: after DISCOGS_CIRCUIT_FAILURE_THRESHOLD failures in a row, calls are
+  rejected immediately for DISCOGS_CIRCUIT_OPEN_SECONDS
+- half-open: then a limited number of probe calls are let through; a success
+  closes the breaker, a failure opens it again
+
+429 responses are per-account throttling rather than an outage, so they do not
+trip a breaker.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+DISCOGS_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("DISCOGS_CIRCUIT_FAILURE_THRESHOLD", "5"))
+DISCOGS_CIRCUIT_OPEN_SECONDS = float(os.getenv("DISCOGS_CIRCUIT_OPEN_SECONDS", "30"))
+DISCOGS_CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("DISCOGS_CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = Gauge(
+    "discogs_circuit_state", "Circuit breaker state per endpoint class (0=closed, 1=half-open, 2=open)",
+    ("endpoint_class",))
+CIRCUIT_REJECTIONS = Counter(
+    "discogs_circuit_rejections_total", "Calls rejected without reaching Discogs by an open circuit",
+    ("endpoint_class",))
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with half-open probing
+    """
+
+    def __init__(self, name: str, failure_threshold: int = DISCOGS_CIRCUIT_FAILURE_THRESHOLD,
+                 open_seconds: float = DISCOGS_CIRCUIT_OPEN_SECONDS,
+                 half_open_probes: int = DISCOGS_CIRCUIT_HALF_OPEN_PROBES):
+        """
+        Args:
+            name: Endpoint class this breaker guards (used in logs and metrics)
+            failure_threshold: Consecutive failures that open the circuit
+            open_seconds: How long the circuit stays open before probing
+            half_open_probes: Concurrent probe calls allowed while half-open
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(_STATE_VALUES[CLOSED], endpoint_class=name)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"Discogs circuit '{self.name}' {self.state} -> {state}")
+            self.state = state
+            CIRCUIT_STATE.set(_STATE_VALUES[state], endpoint_class=self.name)
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may proceed
+
+        A True result must be followed by exactly one record() call.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    CIRCUIT_REJECTIONS.inc(endpoint_class=self.name)
+                    return False
+                self._set_state(HALF_OPEN)
+                self._probes_in_flight = 0
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    CIRCUIT_REJECTIONS.inc(endpoint_class=self.name)
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def record(self, success: Optional[bool]):
+        """
+        Record the outcome of an allowed call
+
+        Args:
+            success: True if Discogs answered normally, False for an outage-type
+                     failure, None if the call says nothing about Discogs' health
+                     (throttled, or never sent)
+        """
+        with self._lock:
+            probing = self.state == HALF_OPEN
+            if probing:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if success is None:
+                return
+            if success:
+                self.failures = 0
+                self._set_state(CLOSED)
+                return
+            self.failures += 1
+            if probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit starts probing again"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Get the process-wide breaker for an endpoint class"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+def circuit_states() -> Dict[str, Dict[str, object]]:
+    """Current state of every breaker (for the stats endpoint)"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -3,123 +3,299 @@ Discogs API Client for WaxValue
 
 This module provides a proper interface to the Discogs API with:
 - OAuth 1.0a authentication
-- Rate limiting with exponential backoff
+- Rate limiting with a token bucket per account, shared by all worker processes
+- Bounded retries (jittered backoff, per-call deadline, retry budget) via retry_policy
+- Circuit breakers per endpoint class that fail fast while Discogs is degraded
 - Proper User-Agent headers
 - Error handling for API responses
+- Per-request metrics (latency, token wait, retries, bytes) exported via metrics.REGISTRY
 """
 
+import io
+import re
+import csv
+import copy
 import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
 import requests
 import requests_oauthlib
-from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Any
 from urllib.parse import urlencode
 import logging
-import json
 import os
 from datetime import datetime, timedelta
+from discogs_scheduler import discogs_scheduler, SchedulerTimeout, INTERACTIVE, BATCH
+from metrics import Counter, Histogram
+from retry_policy import RetryPolicy, INTERACTIVE_RETRY_POLICY, BATCH_RETRY_POLICY, get_retry_budget
+from circuit_breaker import get_circuit_breaker
 
 logger = logging.getLogger(__name__)
 
+# Discogs API root - point at discogs_simulator for offline benchmarks and load tests
+DISCOGS_API_BASE_URL = os.getenv("DISCOGS_API_BASE_URL", "https://api.discogs.com").rstrip("/")
+
+# SQLite database holding every account's token bucket, shared by all worker processes
+RATE_LIMIT_DIR = os.getenv("DISCOGS_RATE_LIMIT_DIR", ".")
+RATE_LIMIT_DB = os.getenv("DISCOGS_RATE_LIMIT_DB", os.path.join(RATE_LIMIT_DIR, "discogs_rate_limits.db"))
+
+# Tokens of each account's bucket that batch work leaves for interactive calls
+BATCH_TOKEN_RESERVE = int(os.getenv("DISCOGS_BATCH_TOKEN_RESERVE", "3"))
+
+# Socket timeout for a single attempt (further capped by the call's remaining deadline)
+DISCOGS_REQUEST_TIMEOUT = float(os.getenv("DISCOGS_REQUEST_TIMEOUT", "15"))
+
+# Request instrumentation
+DISCOGS_REQUESTS = Counter(
+    "discogs_requests_total", "Discogs HTTP requests by endpoint template and status",
+    ("method", "endpoint", "status"))
+DISCOGS_REQUEST_SECONDS = Histogram(
+    "discogs_request_duration_seconds", "Discogs HTTP request latency (network time only)",
+    ("method", "endpoint"))
+DISCOGS_RESPONSE_BYTES = Counter(
+    "discogs_response_bytes_total", "Response bytes received from Discogs", ("endpoint",))
+DISCOGS_TOKEN_WAIT_SECONDS = Histogram(
+    "discogs_rate_limit_wait_seconds", "Time spent waiting for a rate limit token", ("lane",))
+DISCOGS_SCHEDULER_WAIT_SECONDS = Histogram(
+    "discogs_scheduler_wait_seconds", "Time spent waiting for a scheduler slot", ("lane",))
+DISCOGS_RETRIES = Counter(
+    "discogs_retries_total", "Discogs request retries by reason", ("endpoint", "reason"))
+DISCOGS_RETRY_SLEEP_SECONDS = Counter(
+    "discogs_retry_sleep_seconds_total", "Time spent sleeping before retries (including 429 backoff)",
+    ("endpoint", "reason"))
+DISCOGS_UPDATE_LISTING_SECONDS = Histogram(
+    "discogs_update_listing_duration_seconds", "End-to-end update_listing_price duration", ("outcome",))
+
+_NUMERIC_SEGMENT = re.compile(r"^\d+$")
+
+def endpoint_template(endpoint: str) -> str:
+    """
+    Collapse a concrete endpoint path into its template for metric labels
+    
+    e.g. /users/someone/inventory -> /users/{username}/inventory,
+         /marketplace/listings/123 -> /marketplace/listings/{id}
+    """
+    segments = endpoint.split("?", 1)[0].strip("/").split("/")
+    if len(segments) >= 2 and segments[0] == "users":
+        segments[1] = "{username}"
+    return "/" + "/".join("{id}" if _NUMERIC_SEGMENT.match(segment) else segment for segment in segments)
+
+def endpoint_class(endpoint: str) -> str:
+    """
+    Group an endpoint into the class its circuit breaker guards
+    
+    e.g. /users/someone/inventory -> inventory, /marketplace/listings/123 -> listings
+    """
+    segments = endpoint.split("?", 1)[0].strip("/").split("/")
+    if segments[0] == "users":
+        return segments[2] if len(segments) > 2 else "profile"
+    if segments[0] == "marketplace" and len(segments) > 1:
+        return segments[1]
+    if segments[0] == "oauth":
+        return "identity"
+    return segments[0] or "other"
+
+class RequestStats:
+    """Running request totals for one client (used for per-run profiles)"""
+    
+    FIELDS = ("calls", "errors", "retries", "bytes_received",
+              "network_seconds", "token_wait_seconds", "scheduler_wait_seconds", "retry_sleep_seconds")
+    
+    def __init__(self, parent: Optional["RequestStats"] = None):
+        """
+        Args:
+            parent: Totals that everything added here is also added to
+        """
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._values = {field: 0 for field in self.FIELDS}
+    
+    def add(self, **amounts):
+        with self._lock:
+            for field, amount in amounts.items():
+                self._values[field] += amount
+        if self.parent is not None:
+            self.parent.add(**amounts)
+    
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
 class TokenBucketRateLimiter:
     """
     Token bucket rate limiter for Discogs API calls
     Based on the Stack Overflow rate limiting patterns
+    
+    The bucket is a row in a SQLite database shared by every worker process, and
+    each acquire refills and spends it in one transaction, so all workers draw
+    on the same per-account budget.
     """
     
-    def __init__(self, capacity: int = 60, refill_rate: float = 1.0, 
-                 bucket_file: str = "discogs_rate_limit.json"):
+    def __init__(self, key: str = "default", capacity: int = 60, refill_rate: float = 1.0,
+                 db_path: str = None):
         """
         Initialize token bucket rate limiter
         
         Args:
+            key: Bucket name (one per Discogs account)
             capacity: Maximum number of tokens (requests) allowed
             refill_rate: Tokens added per second
-            bucket_file: File to persist bucket state
+            db_path: SQLite database holding the buckets (default RATE_LIMIT_DB)
         """
+        self.key = key
         self.capacity = capacity
         self.refill_rate = refill_rate
-        self.bucket_file = bucket_file
-        self.tokens = capacity
-        self.last_refill = time.time()
-        self._load_state()
+        self.db_path = db_path or RATE_LIMIT_DB
+        self._init_db()
     
-    def _load_state(self):
-        """Load bucket state from file if it exists"""
-        try:
-            if os.path.exists(self.bucket_file):
-                with open(self.bucket_file, 'r') as f:
-                    data = json.load(f)
-                    self.tokens = data.get('tokens', self.capacity)
-                    self.last_refill = data.get('last_refill', time.time())
-                    logger.debug(f"Loaded rate limiter state: {self.tokens} tokens")
-        except Exception as e:
-            logger.warning(f"Failed to load rate limiter state: {e}")
-            self.tokens = self.capacity
-            self.last_refill = time.time()
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; acquires use BEGIN IMMEDIATE so the read-modify-write is atomic
+        return sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
     
-    def _save_state(self):
-        """Save bucket state to file"""
+    def _init_db(self):
+        conn = self._connect()
         try:
-            data = {
-                'tokens': self.tokens,
-                'last_refill': self.last_refill
-            }
-            with open(self.bucket_file, 'w') as f:
-                json.dump(data, f)
-        except Exception as e:
-            logger.warning(f"Failed to save rate limiter state: {e}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    last_refill REAL NOT NULL
+                )
+            """)
+        finally:
+            conn.close()
+    
+    def _refilled(self, row: Optional[tuple], now: float) -> float:
+        """Tokens in the bucket at `now`, given its stored (tokens, last_refill)"""
+        if row is None:
+            return float(self.capacity)
+        tokens, last_refill = row
+        return min(float(self.capacity), tokens + max(0.0, now - last_refill) * self.refill_rate)
     
-    def _refill_tokens(self):
-        """Refill tokens based on elapsed time"""
-        now = time.time()
-        elapsed = now - self.last_refill
-        tokens_to_add = elapsed * self.refill_rate
+    def _take(self, reserve: int) -> float:
+        """
+        Spend one token if the bucket has 1 + reserve of them
         
-        if tokens_to_add > 0:
-            self.tokens = min(self.capacity, self.tokens + tokens_to_add)
-            self.last_refill = now
-            self._save_state()
+        Returns:
+            0 if a token was taken, otherwise seconds until enough tokens accrue
+        """
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT tokens, last_refill FROM rate_buckets WHERE key = ?", (self.key,)).fetchone()
+            tokens = self._refilled(row, now)
+            wait = 0.0
+            if tokens >= 1 + reserve:
+                tokens -= 1
+            else:
+                wait = (1 + reserve - tokens) / self.refill_rate
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, last_refill) VALUES (?, ?, ?)",
+                         (self.key, tokens, now))
+            conn.execute("COMMIT")
+            if wait == 0:
+                logger.debug(f"Token acquired. Remaining: {tokens:.1f}")
+            return wait
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+    
+    @property
+    def tokens(self) -> float:
+        """Tokens currently available (across all workers)"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT tokens, last_refill FROM rate_buckets WHERE key = ?", (self.key,)).fetchone()
+            return self._refilled(row, time.time())
+        finally:
+            conn.close()
     
-    def acquire_token(self, timeout: float = 60.0) -> bool:
+    def acquire_token(self, timeout: float = 60.0, reserve: int = 0) -> bool:
         """
         Try to acquire a token (make a request)
         
         Args:
             timeout: Maximum time to wait for a token
+            reserve: Tokens that must remain in the bucket afterwards
+                     (lets batch work leave headroom for interactive calls)
             
         Returns:
             True if token acquired, False if timeout
         """
-        start_time = time.time()
+        deadline = time.monotonic() + timeout
         
-        while time.time() - start_time < timeout:
-            self._refill_tokens()
-            
-            if self.tokens >= 1:
-                self.tokens -= 1
-                self._save_state()
-                logger.debug(f"Token acquired. Remaining: {self.tokens}")
+        while True:
+            wait = self._take(reserve)
+            if wait == 0:
                 return True
             
-            # Wait a bit before checking again
-            time.sleep(0.1)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Sleep until the next token is due; another worker may still take it first
+            time.sleep(max(0.01, min(wait, remaining)))
         
         logger.warning("Rate limiter timeout - no tokens available")
         return False
     
-    def wait_for_token(self, timeout: float = 60.0):
+    def wait_for_token(self, timeout: float = 60.0, reserve: int = 0):
         """
         Wait for a token to become available
         
         Args:
             timeout: Maximum time to wait
+            reserve: Tokens that must remain in the bucket afterwards
             
         Raises:
             DiscogsRateLimitError: If timeout exceeded
         """
-        if not self.acquire_token(timeout):
+        if not self.acquire_token(timeout, reserve):
             raise DiscogsRateLimitError(f"Rate limit exceeded. No tokens available within {timeout} seconds")
 
+# Discogs limits authenticated requests per user (60/min) and anonymous ones to 25/min
+AUTHENTICATED_RATE_LIMIT = int(os.getenv("DISCOGS_RATE_LIMIT_PER_MINUTE", "60"))
+ANONYMOUS_RATE_LIMIT = int(os.getenv("DISCOGS_ANONYMOUS_RATE_LIMIT_PER_MINUTE", "25"))
+
+_rate_limiters: Dict[str, TokenBucketRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+def rate_limit_key(access_token: str = None, account_id: Any = None) -> str:
+    """
+    Key identifying whose Discogs rate budget a request spends
+    
+    The Discogs user id is preferred because one user can hold several access
+    tokens (one per browser session). The token is hashed so it is never stored
+    in the rate limit database.
+    """
+    if account_id:
+        return f"user-{account_id}"
+    if access_token:
+        return f"token-{hashlib.sha256(access_token.encode('utf-8')).hexdigest()[:16]}"
+    return "anonymous"
+
+def get_rate_limiter(key: str) -> TokenBucketRateLimiter:
+    """
+    Get the shared rate limiter for a Discogs account
+    
+    Every client for the same account uses the same bucket, in this process
+    and in every other worker sharing RATE_LIMIT_DB.
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            capacity = ANONYMOUS_RATE_LIMIT if key == "anonymous" else AUTHENTICATED_RATE_LIMIT
+            limiter = TokenBucketRateLimiter(key=key, capacity=capacity, refill_rate=capacity / 60.0)
+            _rate_limiters[key] = limiter
+        return limiter
+
 class DiscogsRateLimitError(Exception):
     """Raised when Discogs API rate limit is exceeded"""
     pass
@@ -132,16 +308,22 @@ class DiscogsAPIError(Exception):
     """Raised for general Discogs API errors"""
     pass
 
+class DiscogsCircuitOpenError(DiscogsAPIError):
+    """Raised without calling Discogs while the endpoint's circuit breaker is open"""
+    pass
+
 class DiscogsClient:
     """
     Discogs API client with proper authentication and rate limiting
     """
     
-    BASE_URL = "https://api.discogs.com"
+    BASE_URL = DISCOGS_API_BASE_URL
     USER_AGENT = "WaxValue/1.0 +https://waxvalue.com"
     
     def __init__(self, consumer_key: str, consumer_secret: str, 
-                 access_token: str = None, access_token_secret: str = None):
+                 access_token: str = None, access_token_secret: str = None,
+                 account_id: Any = None, lane: str = INTERACTIVE,
+                 retry_policy: Optional[RetryPolicy] = None):
         """
         Initialize Discogs API client
         
@@ -150,22 +332,42 @@ class DiscogsClient:
             consumer_secret: Discogs application consumer secret
             access_token: OAuth access token (for authenticated requests)
             access_token_secret: OAuth access token secret (for authenticated requests)
+            account_id: Discogs user id, if known (keys the shared rate budget)
+            lane: Scheduler lane - INTERACTIVE for user-facing calls, BATCH for
+                  analysis and bulk apply
+            retry_policy: Retry policy for every call (defaults to the lane's policy)
         """
         self.consumer_key = consumer_key
         self.consumer_secret = consumer_secret
         self.access_token = access_token
         self.access_token_secret = access_token_secret
         
-        # Rate limiting with token bucket
-        self.rate_limiter = TokenBucketRateLimiter(
-            capacity=60,  # 60 requests per minute
-            refill_rate=1.0,  # 1 request per second
-            bucket_file="discogs_rate_limit.json"
-        )
+        # Rate limiting with a token bucket shared by every client of the same account
+        self.rate_limit_key = rate_limit_key(access_token, account_id)
+        self.rate_limiter = get_rate_limiter(self.rate_limit_key)
+        self.lane = lane
+        self.stats = RequestStats()
+        
+        # Retries: per-lane deadlines, budget shared with the account's other clients
+        self.retry_policy = retry_policy or (BATCH_RETRY_POLICY if lane == BATCH else INTERACTIVE_RETRY_POLICY)
+        self.retry_budget = get_retry_budget(self.rate_limit_key)
         
         # Setup OAuth session
         self._setup_oauth_session()
     
+    def with_run_stats(self) -> "DiscogsClient":
+        """
+        View of this client that counts its requests separately
+        
+        The view shares the OAuth session, rate limiter, retry budget and lane,
+        but has its own RequestStats (which also feed this client's totals). A
+        run profile built on it only sees the run's own requests, even though
+        the pooled client also serves concurrent bulk apply and prefetch work.
+        """
+        view = copy.copy(self)
+        view.stats = RequestStats(parent=self.stats)
+        return view
+    
     def _setup_oauth_session(self):
         """Setup OAuth session for authenticated requests"""
         if self.access_token and self.access_token_secret:
@@ -187,17 +389,148 @@ class DiscogsClient:
             'User-Agent': self.USER_AGENT
         })
     
-    def _handle_rate_limit(self):
+    def _handle_rate_limit(self, timeout: float = 60.0):
         """Handle rate limiting using token bucket algorithm"""
+        reserve = BATCH_TOKEN_RESERVE if self.lane == BATCH else 0
+        start = time.monotonic()
         try:
-            self.rate_limiter.wait_for_token(timeout=60.0)
+            self.rate_limiter.wait_for_token(timeout=timeout, reserve=reserve)
         except DiscogsRateLimitError as e:
             logger.error(f"Rate limit exceeded: {e}")
             raise
+        finally:
+            waited = time.monotonic() - start
+            DISCOGS_TOKEN_WAIT_SECONDS.observe(waited, lane=self.lane)
+            self.stats.add(token_wait_seconds=waited)
+    
+    def _record_retry(self, endpoint: str, reason: str, sleep_seconds: float):
+        """Count a retry and the time slept before it"""
+        template = endpoint_template(endpoint)
+        DISCOGS_RETRIES.inc(endpoint=template, reason=reason)
+        DISCOGS_RETRY_SLEEP_SECONDS.inc(sleep_seconds, endpoint=template, reason=reason)
+        self.stats.add(retries=1, retry_sleep_seconds=sleep_seconds)
+    
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send one HTTP request while holding a fair-scheduler slot, recording its metrics"""
+        template = endpoint_template(url[len(self.BASE_URL):] if url.startswith(self.BASE_URL) else url)
+        wait_start = time.monotonic()
+        try:
+            with discogs_scheduler.slot(self.rate_limit_key, self.lane):
+                slot_wait = time.monotonic() - wait_start
+                DISCOGS_SCHEDULER_WAIT_SECONDS.observe(slot_wait, lane=self.lane)
+                
+                start = time.monotonic()
+                status = "error"
+                size = 0
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                    status = str(response.status_code)
+                    # Streamed bodies are read later by the caller; count their declared size
+                    if kwargs.get('stream'):
+                        size = int(response.headers.get('Content-Length') or 0)
+                    else:
+                        size = len(response.content or b"")
+                    return response
+                finally:
+                    elapsed = time.monotonic() - start
+                    DISCOGS_REQUESTS.inc(method=method, endpoint=template, status=status)
+                    DISCOGS_REQUEST_SECONDS.observe(elapsed, method=method, endpoint=template)
+                    DISCOGS_RESPONSE_BYTES.inc(size, endpoint=template)
+                    failed = status == "error" or int(status) >= 400
+                    self.stats.add(calls=1, errors=int(failed), bytes_received=size,
+                                   network_seconds=elapsed, scheduler_wait_seconds=slot_wait)
+        except SchedulerTimeout as e:
+            logger.error(f"Discogs scheduler busy: {e}")
+            raise DiscogsRateLimitError(str(e))
+    
+    def _attempt(self, method: str, endpoint: str, remaining: float, **kwargs) -> requests.Response:
+        """One attempt of a call: take a rate token, then send within the remaining deadline"""
+        if remaining <= 0:
+            raise DiscogsRateLimitError(f"Deadline exceeded before calling {endpoint_template(endpoint)}")
+        
+        breaker = get_circuit_breaker(endpoint_class(endpoint))
+        if not breaker.allow():
+            raise DiscogsCircuitOpenError(
+                f"Discogs {breaker.name} endpoints are unavailable, retrying in {breaker.retry_in():.0f}s")
+        
+        healthy = None
+        try:
+            self._handle_rate_limit(timeout=min(60.0, remaining))
+            kwargs.setdefault('timeout', min(DISCOGS_REQUEST_TIMEOUT, remaining))
+            response = self._send(method, f"{self.BASE_URL}{endpoint}", **kwargs)
+            if response.status_code != 429:
+                healthy = response.status_code < 500
+            return response
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            healthy = False
+            raise
+        finally:
+            breaker.record(healthy)
+    
+    def _request_with_retry(self, method: str, endpoint: str, idempotent: bool = None,
+                            **kwargs) -> requests.Response:
+        """
+        Send a request under the client's retry policy (each attempt takes its own token)
+        
+        Args:
+            method: HTTP method
+            endpoint: API endpoint (without base URL)
+            idempotent: Whether the call may be repeated after an ambiguous failure
+                        (defaults to True for everything except POST)
+            
+        Returns:
+            The final response (may still be a 429/5xx once retries are exhausted)
+        """
+        if idempotent is None:
+            idempotent = method.upper() != 'POST'
+        return self.retry_policy.run(
+            lambda remaining: self._attempt(method, endpoint, remaining, **kwargs),
+            idempotent=idempotent,
+            budget=self.retry_budget,
+            on_retry=lambda reason, delay: self._on_retry(endpoint, reason, delay)
+        )
+    
+    async def _request_with_retry_async(self, method: str, endpoint: str, idempotent: bool = None,
+                                        **kwargs) -> requests.Response:
+        """Async variant of _request_with_retry: attempts run in a thread, backoff awaits"""
+        if idempotent is None:
+            idempotent = method.upper() != 'POST'
+        return await self.retry_policy.run_async(
+            lambda remaining: asyncio.to_thread(self._attempt, method, endpoint, remaining, **kwargs),
+            idempotent=idempotent,
+            budget=self.retry_budget,
+            on_retry=lambda reason, delay: self._on_retry(endpoint, reason, delay)
+        )
+    
+    def _on_retry(self, endpoint: str, reason: str, delay: float):
+        logger.warning(f"Retrying {endpoint_template(endpoint)} in {delay:.2f}s ({reason})")
+        self._record_retry(endpoint, reason, delay)
+    
+    def _parse_response(self, response: requests.Response) -> Dict[str, Any]:
+        """Turn a final response into JSON data or the matching client error"""
+        # Retries exhausted while still throttled
+        if response.status_code == 429:
+            raise DiscogsRateLimitError("Discogs rate limit exceeded (429) - retries exhausted")
+        
+        # Handle authentication errors
+        if response.status_code == 401:
+            raise DiscogsAuthError("Authentication failed. Check your tokens.")
+        
+        # Handle method not allowed (often authentication issue)
+        if response.status_code == 405:
+            raise DiscogsAuthError("Method not allowed. Check authentication and User-Agent.")
+        
+        # Handle other errors
+        if not response.ok:
+            error_msg = f"API request failed: {response.status_code} - {response.text}"
+            logger.error(error_msg)
+            raise DiscogsAPIError(error_msg)
+        
+        return response.json() if response.content else {}
     
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         """
-        Make authenticated request to Discogs API with rate limiting and error handling
+        Make authenticated request to Discogs API with rate limiting, retries and error handling
         
         Args:
             method: HTTP method (GET, POST, PUT, DELETE)
@@ -212,42 +545,22 @@ class DiscogsClient:
             DiscogsAuthError: When authentication fails
             DiscogsAPIError: For other API errors
         """
-        self._handle_rate_limit()
-        
-        url = f"{self.BASE_URL}{endpoint}"
-        
         try:
-            response = self.session.request(method, url, **kwargs)
-            
-            # Handle rate limiting
-            if response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After', 60))
-                logger.warning(f"Rate limit exceeded. Waiting {retry_after} seconds")
-                time.sleep(retry_after)
-                # Retry the request
-                response = self.session.request(method, url, **kwargs)
-            
-            # Handle authentication errors
-            if response.status_code == 401:
-                raise DiscogsAuthError("Authentication failed. Check your tokens.")
-            
-            # Handle method not allowed (often authentication issue)
-            if response.status_code == 405:
-                raise DiscogsAuthError("Method not allowed. Check authentication and User-Agent.")
-            
-            # Handle other errors
-            if not response.ok:
-                error_msg = f"API request failed: {response.status_code} - {response.text}"
-                logger.error(error_msg)
-                raise DiscogsAPIError(error_msg)
-            
-            return response.json()
-            
+            return self._parse_response(self._request_with_retry(method, endpoint, **kwargs))
         except requests.exceptions.RequestException as e:
             logger.error(f"Request failed: {e}")
             raise DiscogsAPIError(f"Request failed: {e}")
     
-    def get_user_inventory(self, username: str, page: int = 1, per_page: int = 100) -> Dict[str, Any]:
+    async def _make_request_async(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+        """Async variant of _make_request for use from async endpoints"""
+        try:
+            return self._parse_response(await self._request_with_retry_async(method, endpoint, **kwargs))
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request failed: {e}")
+            raise DiscogsAPIError(f"Request failed: {e}")
+    
+    def get_user_inventory(self, username: str, page: int = 1, per_page: int = 100,
+                           sort: str = None, sort_order: str = None) -> Dict[str, Any]:
         """
         Get user's inventory listings
         
@@ -255,6 +568,8 @@ class DiscogsClient:
             username: Discogs username
             page: Page number (1-based)
             per_page: Items per page (max 100)
+            sort: Server-side sort across all pages (listed, price, item, artist, label, ...)
+            sort_order: asc or desc
             
         Returns:
             Inventory data with listings (all statuses - filtering happens client-side)
@@ -264,9 +579,123 @@ class DiscogsClient:
             'page': page,
             'per_page': min(per_page, 100)
         }
+        if sort:
+            params['sort'] = sort
+            params['sort_order'] = sort_order or 'asc'
         
         return self._make_request('GET', endpoint, params=params)
     
+    async def get_user_inventory_async(self, username: str, page: int = 1, per_page: int = 100,
+                                       sort: str = None, sort_order: str = None) -> Dict[str, Any]:
+        """Async variant of get_user_inventory"""
+        params = {'page': page, 'per_page': min(per_page, 100)}
+        if sort:
+            params['sort'] = sort
+            params['sort_order'] = sort_order or 'asc'
+        return await self._make_request_async('GET', f"/users/{username}/inventory", params=params)
+    
+    def request_inventory_export(self) -> int:
+        """
+        Start an inventory export job for the authenticated user's inventory
+        
+        Returns:
+            Export id to poll with get_inventory_export
+        """
+        try:
+            response = self._request_with_retry('POST', "/inventory/export")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request failed: {e}")
+            raise DiscogsAPIError(f"Request failed: {e}")
+        if not response.ok:
+            self._parse_response(response)
+        
+        # Discogs answers with the new export's URL in the Location header
+        location = response.headers.get('Location', '')
+        export_id = location.rstrip('/').rsplit('/', 1)[-1]
+        if not export_id.isdigit():
+            raise DiscogsAPIError(f"Inventory export started but no export id was returned (Location: {location!r})")
+        return int(export_id)
+    
+    def get_inventory_export(self, export_id: int) -> Dict[str, Any]:
+        """
+        Get the status of an inventory export job
+        
+        Args:
+            export_id: Id returned by request_inventory_export
+            
+        Returns:
+            Export data; status is "success" once the CSV can be downloaded
+        """
+        return self._make_request('GET', f"/inventory/export/{export_id}")
+    
+    def iter_inventory_export(self, export_id: int) -> Iterator[Dict[str, str]]:
+        """
+        Download a finished inventory export, yielding CSV rows as they are parsed
+        
+        The file is streamed, so only one row is held in memory at a time.
+        
+        Args:
+            export_id: Id of an export whose status is "success"
+            
+        Returns:
+            Iterator of CSV rows (column name -> value)
+        """
+        try:
+            response = self._request_with_retry('GET', f"/inventory/export/{export_id}/download", stream=True)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request failed: {e}")
+            raise DiscogsAPIError(f"Request failed: {e}")
+        try:
+            if not response.ok:
+                self._parse_response(response)
+            response.raw.decode_content = True
+            rows = csv.DictReader(io.TextIOWrapper(response.raw, encoding='utf-8-sig', newline=''))
+            yield from rows
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Inventory export download failed: {e}")
+            raise DiscogsAPIError(f"Inventory export download failed: {e}")
+        finally:
+            response.close()
+    
+    def upload_inventory_changes(self, csv_data: bytes, filename: str = "price-changes.csv") -> int:
+        """
+        Upload an inventory change CSV (listing_id plus the columns to change)
+        
+        Args:
+            csv_data: CSV file contents
+            filename: File name shown in the seller's upload history
+            
+        Returns:
+            Upload id to poll with get_inventory_upload
+        """
+        try:
+            # Only a throttled (429) upload is retried - it was never accepted
+            response = self._request_with_retry('POST', "/inventory/upload/change",
+                                                files={'upload': (filename, csv_data, 'text/csv')})
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request failed: {e}")
+            raise DiscogsAPIError(f"Request failed: {e}")
+        if not response.ok:
+            self._parse_response(response)
+        
+        location = response.headers.get('Location', '')
+        upload_id = location.rstrip('/').rsplit('/', 1)[-1]
+        if not upload_id.isdigit():
+            raise DiscogsAPIError(f"Inventory upload accepted but no upload id was returned (Location: {location!r})")
+        return int(upload_id)
+    
+    def get_inventory_upload(self, upload_id: int) -> Dict[str, Any]:
+        """
+        Get the status of an inventory upload
+        
+        Args:
+            upload_id: Id returned by upload_inventory_changes
+            
+        Returns:
+            Upload data; status is "success" once the changes are applied
+        """
+        return self._make_request('GET', f"/inventory/upload/{upload_id}")
+    
     def get_price_suggestions(self, release_id: int) -> Dict[str, Any]:
         """
         Get Discogs' official price suggestions for a release by condition
@@ -309,7 +738,9 @@ class DiscogsClient:
     def update_listing_price(self, listing_id: int, price: float, 
                            currency: str = None, status: str = None) -> tuple[int, Dict[str, Any]]:
         """
-        Update a listing's price and optionally other fields with retry logic
+        Update a listing's price and optionally other fields
+        
+        Both the fetch and the POST go through the client's retry policy.
         
         This method fetches the current listing data first, then updates it with the new price
         while preserving all required fields (release_id, condition, etc.)
@@ -323,109 +754,81 @@ class DiscogsClient:
         Returns:
             Tuple of (http_status_code, response_metadata)
         """
-        max_retries = 3
-        attempt = 0
+        start = time.monotonic()
+        status_code, result = self._update_listing_price(listing_id, price, currency, status)
+        outcome = "success" if status_code in (200, 201, 204) else "failure"
+        DISCOGS_UPDATE_LISTING_SECONDS.observe(time.monotonic() - start, outcome=outcome)
+        return status_code, result
+    
+    def _update_listing_price(self, listing_id: int, price: float, 
+                              currency: str = None, status: str = None) -> tuple[int, Dict[str, Any]]:
+        """Fetch-then-POST listing update (see update_listing_price)"""
+        endpoint = f"/marketplace/listings/{listing_id}"
         
-        while True:
-            try:
-                # First, fetch the current listing data to get all required fields
-                logger.info(f"Fetching current listing data for listing {listing_id}")
-                current_listing = self.get_listing(listing_id)
-                
-                # Build the update data with all required fields
-                endpoint = f"/marketplace/listings/{listing_id}"
-                
-                # Extract required fields from current listing
-                data = {
-                    'release_id': current_listing.get('release', {}).get('id'),
-                    'condition': current_listing.get('condition'),
-                    'price': price,
-                    'status': status or current_listing.get('status', 'For Sale'),
-                    'currency': currency or current_listing.get('original_price', {}).get('curr_abbr', 'USD')
-                }
-                
-                # Add optional fields if they exist in the current listing
-                if current_listing.get('sleeve_condition'):
-                    data['sleeve_condition'] = current_listing.get('sleeve_condition')
-                if current_listing.get('comments'):
-                    data['comments'] = current_listing.get('comments')
-                if current_listing.get('allow_offers') is not None:
-                    data['allow_offers'] = current_listing.get('allow_offers')
-                if current_listing.get('external_id'):
-                    data['external_id'] = current_listing.get('external_id')
-                if current_listing.get('location'):
-                    data['location'] = current_listing.get('location')
-                if current_listing.get('weight'):
-                    data['weight'] = current_listing.get('weight')
-                if current_listing.get('format_quantity'):
-                    data['format_quantity'] = current_listing.get('format_quantity')
-                
-                logger.info(f"Updating listing {listing_id} with data: {data}")
-                
-                # Make the POST request to update the listing (Discogs uses POST for edits)
-                self._handle_rate_limit()  # Respect rate limiting
-                
-                # Try to get the listing first to ensure it exists
-                try:
-                    test_listing = self.session.get(f"{self.BASE_URL}{endpoint}")
-                    logger.info(f"Test GET listing response: {test_listing.status_code}")
-                except Exception as test_error:
-                    logger.error(f"Could not fetch listing for testing: {test_error}")
-                
-                response = self.session.post(f"{self.BASE_URL}{endpoint}", json=data)
-                
-                # Extract rate limit headers
-                rl_remaining = response.headers.get("X-Discogs-Ratelimit-Remaining")
-                rl_reset = response.headers.get("X-Discogs-Ratelimit-Reset")
-                
-                logger.info(f"Discogs API response: status={response.status_code}, headers={response.headers}")
-                logger.info(f"Response body: {response.text[:500] if response.text else '(empty)'}")
-                
-                # 200 OK, 201 Created, 204 No Content are all success codes
-                if response.status_code in (200, 201, 204):
-                    return response.status_code, {
-                        "ratelimit_remaining": rl_remaining,
-                        "ratelimit_reset": rl_reset,
-                        "data": response.json() if response.content and response.text else {}
-                    }
-                
-                if response.status_code == 429 and attempt < max_retries:
-                    # Exponential backoff with jitter
-                    sleep_time = (2 ** attempt) + (0.25 * attempt)
-                    if rl_reset and rl_reset.isdigit():
-                        sleep_time = max(sleep_time, float(rl_reset))
-                    logger.warning(f"Rate limit hit, retrying in {sleep_time:.2f}s (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(sleep_time)
-                    attempt += 1
-                    continue
-                
-                if 500 <= response.status_code < 600 and attempt < max_retries:
-                    sleep_time = (2 ** attempt) + (0.25 * attempt)
-                    logger.warning(f"Server error {response.status_code}, retrying in {sleep_time:.2f}s (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(sleep_time)
-                    attempt += 1
-                    continue
-                
-                # Hard failure or max retries exceeded
-                error_response = self._safe_json(response)
-                logger.error(f"Failed to update listing {listing_id}: status={response.status_code}, error={error_response}, text={response.text}")
+        try:
+            # First, fetch the current listing data to get all required fields
+            logger.info(f"Fetching current listing data for listing {listing_id}")
+            current_listing = self.get_listing(listing_id)
+            
+            # Extract required fields from current listing
+            data = {
+                'release_id': current_listing.get('release', {}).get('id'),
+                'condition': current_listing.get('condition'),
+                'price': price,
+                'status': status or current_listing.get('status', 'For Sale'),
+                'currency': currency or current_listing.get('original_price', {}).get('curr_abbr', 'USD')
+            }
+            
+            # Add optional fields if they exist in the current listing
+            if current_listing.get('sleeve_condition'):
+                data['sleeve_condition'] = current_listing.get('sleeve_condition')
+            if current_listing.get('comments'):
+                data['comments'] = current_listing.get('comments')
+            if current_listing.get('allow_offers') is not None:
+                data['allow_offers'] = current_listing.get('allow_offers')
+            if current_listing.get('external_id'):
+                data['external_id'] = current_listing.get('external_id')
+            if current_listing.get('location'):
+                data['location'] = current_listing.get('location')
+            if current_listing.get('weight'):
+                data['weight'] = current_listing.get('weight')
+            if current_listing.get('format_quantity'):
+                data['format_quantity'] = current_listing.get('format_quantity')
+            
+            logger.info(f"Updating listing {listing_id} with data: {data}")
+            
+            # POST the edit (Discogs uses POST for edits). Setting a price is idempotent,
+            # so the retry policy may repeat it after a dropped connection.
+            response = self._request_with_retry('POST', endpoint, idempotent=True, json=data)
+            
+            # Extract rate limit headers
+            rl_remaining = response.headers.get("X-Discogs-Ratelimit-Remaining")
+            rl_reset = response.headers.get("X-Discogs-Ratelimit-Reset")
+            
+            logger.info(f"Discogs API response: status={response.status_code}, headers={response.headers}")
+            logger.info(f"Response body: {response.text[:500] if response.text else '(empty)'}")
+            
+            # 200 OK, 201 Created, 204 No Content are all success codes
+            if response.status_code in (200, 201, 204):
                 return response.status_code, {
                     "ratelimit_remaining": rl_remaining,
                     "ratelimit_reset": rl_reset,
-                    "error": error_response,
-                    "text": response.text
+                    "data": response.json() if response.content and response.text else {}
                 }
-                
-            except Exception as e:
-                logger.error(f"Exception while updating listing {listing_id}: {e}", exc_info=True)
-                if attempt < max_retries:
-                    sleep_time = (2 ** attempt) + (0.25 * attempt)
-                    logger.warning(f"Request failed: {e}, retrying in {sleep_time:.2f}s (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(sleep_time)
-                    attempt += 1
-                    continue
-                else:
-                    return 0, {"error": str(e), "text": str(e)}
+            
+            # Hard failure or retries exhausted
+            error_response = self._safe_json(response)
+            logger.error(f"Failed to update listing {listing_id}: status={response.status_code}, error={error_response}, text={response.text}")
+            return response.status_code, {
+                "ratelimit_remaining": rl_remaining,
+                "ratelimit_reset": rl_reset,
+                "error": error_response,
+                "text": response.text
+            }
+            
+        except Exception as e:
+            logger.error(f"Exception while updating listing {listing_id}: {e}", exc_info=True)
+            return 0, {"error": str(e), "text": str(e)}
     
     @staticmethod
     def _safe_json(response) -> Dict[str, Any]:
@@ -501,6 +904,10 @@ class DiscogsClient:
         endpoint = f"/users/{username}"
         return self._make_request('GET', endpoint)
     
+    async def get_user_profile_async(self, username: str) -> Dict[str, Any]:
+        """Async variant of get_user_profile (does not block the event loop while backing off)"""
+        return await self._make_request_async('GET', f"/users/{username}")
+    
     def get_user_info(self) -> Dict[str, Any]:
         """
         Get authenticated user's information using the correct Discogs API endpoint
@@ -687,6 +1094,97 @@ class DiscogsClient:
         }
 
 
+# Live clients are reused across requests (see DiscogsClientPool)
+DISCOGS_CLIENT_POOL_SIZE = int(os.getenv("DISCOGS_CLIENT_POOL_SIZE", "256"))
+DISCOGS_CLIENT_IDLE_SECONDS = float(os.getenv("DISCOGS_CLIENT_IDLE_SECONDS", "900"))
+
+class DiscogsClientPool:
+    """
+    LRU-bounded registry of live clients keyed by access token
+    
+    Reusing a client keeps its OAuth session and keep-alive connections to
+    Discogs across requests, instead of a new session and TCP/TLS handshake
+    per request. Clients are keyed by credentials, account and lane (a client's
+    lane and retry policy are fixed), evicted when idle or least recently used,
+    and dropped explicitly when an account disconnects.
+    """
+    
+    def __init__(self, max_size: int = DISCOGS_CLIENT_POOL_SIZE,
+                 idle_seconds: float = DISCOGS_CLIENT_IDLE_SECONDS):
+        """
+        Args:
+            max_size: Clients kept at most (least recently used are evicted first)
+            idle_seconds: Clients unused for this long are evicted
+        """
+        self.max_size = max(1, max_size)
+        self.idle_seconds = idle_seconds
+        self._clients: "OrderedDict[tuple, DiscogsClient]" = OrderedDict()
+        self._last_used: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, consumer_key: str, consumer_secret: str, access_token: str = None,
+            access_token_secret: str = None, account_id: Any = None, lane: str = INTERACTIVE) -> DiscogsClient:
+        """
+        Get the live client for these credentials, creating it if needed
+        
+        Args:
+            Same as DiscogsClient (the pooled client uses its lane's default retry policy)
+            
+        Returns:
+            A DiscogsClient shared with other requests for the same account and lane
+        """
+        key = (consumer_key, access_token, access_token_secret, account_id, lane)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+            else:
+                client = DiscogsClient(consumer_key, consumer_secret, access_token, access_token_secret,
+                                       account_id=account_id, lane=lane)
+                self._clients[key] = client
+                self.misses += 1
+                while len(self._clients) > self.max_size:
+                    evicted, _ = self._clients.popitem(last=False)
+                    self._last_used.pop(evicted, None)
+            self._last_used[key] = now
+            return client
+    
+    def _evict_idle(self, now: float):
+        # Evicted clients are only dropped, not closed: a running analysis may still hold one
+        for key in [key for key, used in self._last_used.items() if now - used > self.idle_seconds]:
+            self._clients.pop(key, None)
+            self._last_used.pop(key, None)
+    
+    def invalidate(self, access_token: str) -> int:
+        """
+        Drop and close every client using an access token (e.g. on disconnect)
+        
+        Returns:
+            Number of clients removed
+        """
+        with self._lock:
+            keys = [key for key in self._clients if key[1] == access_token]
+            clients = [self._clients.pop(key) for key in keys]
+            for key in keys:
+                self._last_used.pop(key, None)
+        for client in clients:
+            client.session.close()
+        if clients:
+            logger.info(f"Closed {len(clients)} pooled Discogs client(s) for {clients[0].rate_limit_key}")
+        return len(clients)
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._clients), "hits": self.hits, "misses": self.misses}
+
+# Global client pool shared by every request in this process
+discogs_client_pool = DiscogsClientPool()
+
 class DiscogsOAuth:
     """
     Handle OAuth 1.0a flow for Discogs API
@@ -0,0 +1,176 @@
+"""
+Fair scheduler for Discogs API calls
+
+Every outgoing Discogs request holds one of a fixed number of in-flight slots
+while it is on the wire. Slots are handed out by priority and fairness:
+- interactive lane (auth, profile, single apply) is always served first and
+  has slots reserved that batch work can never occupy
+- batch lane (analysis, bulk apply) is shared across accounts with weighted
+  round-robin, so one large seller cannot starve the others
+
+Per-account request budgets are still enforced by the token buckets in
+discogs_client; this scheduler decides who gets to use the worker capacity.
+"""
+
+import os
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+DISCOGS_MAX_IN_FLIGHT = int(os.getenv("DISCOGS_MAX_IN_FLIGHT", "8"))
+DISCOGS_INTERACTIVE_SLOTS = int(os.getenv("DISCOGS_INTERACTIVE_SLOTS", "2"))
+
+class SchedulerTimeout(Exception):
+    """Raised when no in-flight slot becomes available in time"""
+    pass
+
+class _Waiter:
+    __slots__ = ("account_key", "lane", "granted")
+
+    def __init__(self, account_key: str, lane: str):
+        self.account_key = account_key
+        self.lane = lane
+        self.granted = False
+
+class FairScheduler:
+    """
+    Grants in-flight slots for Discogs calls by lane and account
+    """
+
+    def __init__(self, max_in_flight: int = DISCOGS_MAX_IN_FLIGHT,
+                 interactive_slots: int = DISCOGS_INTERACTIVE_SLOTS):
+        """
+        Args:
+            max_in_flight: Total concurrent Discogs requests allowed
+            interactive_slots: Slots only the interactive lane may use
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self.interactive_slots = min(max(0, interactive_slots), self.max_in_flight - 1)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._batch_in_flight = 0
+        self._interactive: Deque[_Waiter] = deque()
+        self._batch: Dict[str, Deque[_Waiter]] = {}
+        self._rotation: List[str] = []
+        self._weights: Dict[str, int] = {}
+        self._credits: Dict[str, int] = {}
+
+    def set_weight(self, account_key: str, weight: int):
+        """Give an account a larger (or smaller) share of batch capacity"""
+        with self._cond:
+            self._weights[account_key] = max(1, int(weight))
+
+    def _next_batch_waiter(self) -> Optional[_Waiter]:
+        """Weighted round-robin over accounts with queued batch calls"""
+        while self._rotation:
+            account_key = self._rotation[0]
+            queue = self._batch.get(account_key)
+            if not queue:
+                self._rotation.pop(0)
+                self._batch.pop(account_key, None)
+                self._credits.pop(account_key, None)
+                continue
+            credits = self._credits.get(account_key, 0)
+            if credits <= 0:
+                credits = self._weights.get(account_key, 1)
+            waiter = queue.popleft()
+            credits -= 1
+            self._credits[account_key] = credits
+            if credits <= 0 or not queue:
+                # Account used its turn - move it to the back of the rotation
+                self._rotation.append(self._rotation.pop(0))
+            return waiter
+        return None
+
+    def _dispatch(self):
+        """Grant free slots to waiters (caller holds the condition)"""
+        granted = False
+        while self._in_flight < self.max_in_flight:
+            if self._interactive:
+                waiter = self._interactive.popleft()
+            elif self._batch_in_flight < self.max_in_flight - self.interactive_slots:
+                waiter = self._next_batch_waiter()
+                if waiter is None:
+                    break
+                self._batch_in_flight += 1
+            else:
+                break
+            waiter.granted = True
+            self._in_flight += 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _cancel(self, waiter: _Waiter):
+        if waiter.lane == INTERACTIVE:
+            self._interactive.remove(waiter)
+        else:
+            self._batch[waiter.account_key].remove(waiter)
+
+    def acquire(self, account_key: str, lane: str = INTERACTIVE, timeout: float = 60.0) -> bool:
+        """
+        Wait for an in-flight slot
+
+        Returns:
+            True if a slot was granted, False on timeout
+        """
+        waiter = _Waiter(account_key, lane)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if lane == INTERACTIVE:
+                self._interactive.append(waiter)
+            else:
+                if account_key not in self._batch:
+                    self._batch[account_key] = deque()
+                    self._rotation.append(account_key)
+                self._batch[account_key].append(waiter)
+            self._dispatch()
+
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._cancel(waiter)
+                    logger.warning(f"Timed out waiting for a Discogs slot ({lane}, {account_key})")
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def release(self, lane: str = INTERACTIVE):
+        """Return a slot granted by acquire()"""
+        with self._cond:
+            self._in_flight -= 1
+            if lane != INTERACTIVE:
+                self._batch_in_flight -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, account_key: str, lane: str = INTERACTIVE, timeout: float = 60.0):
+        """Hold a slot for the duration of one request"""
+        if not self.acquire(account_key, lane, timeout):
+            raise SchedulerTimeout(f"No Discogs request slot available within {timeout} seconds")
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def stats(self) -> Dict[str, int]:
+        """Current scheduler occupancy"""
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "batch_in_flight": self._batch_in_flight,
+                "interactive_waiting": len(self._interactive),
+                "batch_waiting": sum(len(q) for q in self._batch.values()),
+                "batch_accounts_waiting": len(self._rotation)
+            }
+
+# Global scheduler shared by every DiscogsClient in this process
+discogs_scheduler = FairScheduler()
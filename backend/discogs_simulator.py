@@ -0,0 +1,479 @@
+"""
+Offline Discogs API simulator for WaxValue
+
+A local stand-in for the parts of the Discogs API WaxValue uses, so analysis and
+bulk apply can be benchmarked and load-tested without touching the real API:
+- GET  /oauth/identity
+- GET  /users/{username}
+- GET  /users/{username}/inventory
+- GET  /marketplace/price_suggestions/{release_id}
+- GET  /marketplace/listings/{listing_id}
+- POST /marketplace/listings/{listing_id}
+- POST /inventory/export, GET /inventory/export/{export_id}[/download]
+- POST /inventory/upload/change, GET /inventory/upload/{upload_id}
+
+Inventories are synthetic and deterministic per username (seeded). A username
+ending in a number sets its inventory size, e.g. "seller-10000" has 10,000
+listings; other usernames get SIM_INVENTORY_SIZE listings.
+
+The simulator adds latency, sends X-Discogs-Ratelimit headers, enforces a moving
+60-second rate limit per access token (429 with Retry-After) and injects random
+429/5xx faults. Faults and latency can be changed at runtime through /_sim/config.
+
+Inventory exports cover the seller the access token last asked about (or
+SIM_USERNAME), stay pending for SIM_EXPORT_SECONDS and then download as CSV.
+Change uploads are applied at once but stay pending for SIM_UPLOAD_SECONDS;
+upload_row_fault_rate drops random rows so reconciliation can be exercised.
+
+Run it and point the backend at it:
+    uvicorn discogs_simulator:app --port 9000
+    DISCOGS_API_BASE_URL=http://127.0.0.1:9000 python main.py
+"""
+
+import io
+import os
+import re
+import csv
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+SIM_SEED = int(os.getenv("SIM_SEED", "42"))
+SIM_USERNAME = os.getenv("SIM_USERNAME", "sim-seller")
+SIM_INVENTORY_SIZE = int(os.getenv("SIM_INVENTORY_SIZE", "500"))
+SIM_DUPLICATE_RATIO = float(os.getenv("SIM_DUPLICATE_RATIO", "0.2"))
+SIM_FOR_SALE_RATIO = float(os.getenv("SIM_FOR_SALE_RATIO", "0.9"))
+SIM_LATENCY_MS = float(os.getenv("SIM_LATENCY_MS", "80"))
+SIM_LATENCY_JITTER_MS = float(os.getenv("SIM_LATENCY_JITTER_MS", "40"))
+SIM_RATE_LIMIT = int(os.getenv("SIM_RATE_LIMIT", "60"))
+SIM_FAULT_429_RATE = float(os.getenv("SIM_FAULT_429_RATE", "0"))
+SIM_FAULT_5XX_RATE = float(os.getenv("SIM_FAULT_5XX_RATE", "0"))
+SIM_EXPORT_SECONDS = float(os.getenv("SIM_EXPORT_SECONDS", "3"))
+SIM_UPLOAD_SECONDS = float(os.getenv("SIM_UPLOAD_SECONDS", "3"))
+SIM_UPLOAD_ROW_FAULT_RATE = float(os.getenv("SIM_UPLOAD_ROW_FAULT_RATE", "0"))
+
+CONDITIONS = [
+    ("Mint (M)", 1.6),
+    ("Near Mint (NM or M-)", 1.3),
+    ("Very Good Plus (VG+)", 1.0),
+    ("Very Good (VG)", 0.7),
+    ("Good Plus (G+)", 0.5),
+    ("Good (G)", 0.35),
+    ("Fair (F)", 0.2),
+    ("Poor (P)", 0.1)
+]
+
+# Inventory sorts the simulator supports (the ones analysis requests)
+SORT_KEYS = {
+    "price": lambda listing: listing["price"]["value"],
+    "listed": lambda listing: listing["posted"]
+}
+
+# Column order of Discogs' inventory export CSV
+EXPORT_COLUMNS = [
+    "listing_id", "artist", "title", "label", "catno", "format", "release_id", "status", "price",
+    "listed", "comments", "media_condition", "sleeve_condition", "accept_offer", "external_id",
+    "weight", "format_quantity", "flat_shipping", "location"
+]
+
+_OAUTH_TOKEN = re.compile(r'oauth_token="([^"]+)"')
+_SIZE_SUFFIX = re.compile(r"(\d+)$")
+
+def _rng(*parts: Any) -> random.Random:
+    """Deterministic random source for one simulated object"""
+    digest = hashlib.sha256(":".join(str(p) for p in (SIM_SEED,) + parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+def release_base_price(release_id: int) -> float:
+    """Stable VG+ market price for a release"""
+    return round(_rng("release", release_id).lognormvariate(2.8, 0.6), 2)
+
+def export_row(listing: Dict[str, Any]) -> Dict[str, Any]:
+    """One inventory export CSV row for a listing"""
+    release = listing["release"]
+    return {
+        "listing_id": listing["id"],
+        "artist": release["artist"],
+        "title": release["title"],
+        "label": release["label"],
+        "catno": f"CAT-{release['id']}",
+        "format": release["format"],
+        "release_id": release["id"],
+        "status": listing["status"],
+        "price": listing["price"]["value"],
+        "listed": listing["posted"].replace("T", " ")[:19],
+        "comments": listing["comments"],
+        "media_condition": listing["condition"],
+        "sleeve_condition": listing["sleeve_condition"],
+        "accept_offer": "Y" if listing["allow_offers"] else "N",
+        "external_id": "",
+        "weight": 230,
+        "format_quantity": 1,
+        "flat_shipping": "",
+        "location": ""
+    }
+
+def inventory_size(username: str) -> int:
+    match = _SIZE_SUFFIX.search(username)
+    return int(match.group(1)) if match else SIM_INVENTORY_SIZE
+
+class SimulatedSeller:
+    """Synthetic inventory for one username"""
+
+    def __init__(self, username: str, size: int):
+        self.username = username
+        self.user_id = int(hashlib.sha256(username.encode("utf-8")).hexdigest()[:7], 16)
+        rng = _rng("seller", username)
+        unique_releases = max(1, int(size * (1 - SIM_DUPLICATE_RATIO)))
+        release_ids = [rng.randint(100_000, 30_000_000) for _ in range(unique_releases)]
+
+        self.listings: List[Dict[str, Any]] = []
+        for i in range(size):
+            # The first pass covers every release once, the rest are extra copies
+            release_id = release_ids[i] if i < unique_releases else rng.choice(release_ids)
+            condition, factor = rng.choice(CONDITIONS[:6])
+            value = round(release_base_price(release_id) * factor * rng.uniform(0.7, 1.4), 2)
+            listing_id = self.user_id * 1_000_000 + i
+            self.listings.append({
+                "id": listing_id,
+                "resource_url": f"/marketplace/listings/{listing_id}",
+                "status": "For Sale" if rng.random() < SIM_FOR_SALE_RATIO else rng.choice(["Sold", "Draft"]),
+                "price": {"value": value, "currency": "USD"},
+                "original_price": {"curr_abbr": "USD", "value": value},
+                "allow_offers": rng.random() < 0.5,
+                "condition": condition,
+                "sleeve_condition": rng.choice(CONDITIONS[:6])[0],
+                "comments": "",
+                "posted": "2024-01-01T00:00:00-07:00",
+                "release": {
+                    "id": release_id,
+                    "artist": f"Artist {release_id % 997}",
+                    "title": f"Record {release_id}",
+                    "label": f"Label {release_id % 131}",
+                    "format": "LP",
+                    "thumbnail": f"https://img.example.invalid/{release_id}.jpg",
+                    "images": [{"type": "primary", "uri": f"https://img.example.invalid/{release_id}.jpg",
+                                "uri150": f"https://img.example.invalid/{release_id}-150.jpg"}]
+                }
+            })
+        self.by_id = {listing["id"]: listing for listing in self.listings}
+
+    def sorted_listings(self, sort: Optional[str], sort_order: str = "asc") -> List[Dict[str, Any]]:
+        """Listings in the order of the inventory endpoint's sort/sort_order (price and listed)"""
+        key = SORT_KEYS.get(sort)
+        if key is None:
+            return self.listings
+        # Sorted per request: edited prices change the order
+        return sorted(self.listings, key=key, reverse=sort_order == "desc")
+
+    @property
+    def num_for_sale(self) -> int:
+        return sum(1 for listing in self.listings if listing["status"] == "For Sale")
+
+class SimulatorState:
+    """Sellers, runtime config, rate-limit windows and request counters"""
+
+    def __init__(self):
+        self.config = {
+            "latency_ms": SIM_LATENCY_MS,
+            "latency_jitter_ms": SIM_LATENCY_JITTER_MS,
+            "rate_limit": SIM_RATE_LIMIT,
+            "fault_429_rate": SIM_FAULT_429_RATE,
+            "fault_5xx_rate": SIM_FAULT_5XX_RATE,
+            "upload_row_fault_rate": SIM_UPLOAD_ROW_FAULT_RATE
+        }
+        self.sellers: Dict[str, SimulatedSeller] = {}
+        self.windows: Dict[str, Deque[float]] = {}
+        # Access token -> the seller it last asked about, standing in for "the authenticated user"
+        self.identities: Dict[str, str] = {}
+        self.exports: Dict[int, Dict[str, Any]] = {}
+        self.uploads: Dict[int, Dict[str, Any]] = {}
+        self.counters: Dict[str, int] = {}
+        self.fault_rng = random.Random(SIM_SEED)
+
+    def seller(self, username: str) -> SimulatedSeller:
+        seller = self.sellers.get(username)
+        if seller is None:
+            seller = self.sellers[username] = SimulatedSeller(username, inventory_size(username))
+            logger.info(f"Generated {len(seller.listings)} listings for {username}")
+        return seller
+
+    def find_listing(self, listing_id: int) -> Optional[Dict[str, Any]]:
+        for seller in self.sellers.values():
+            listing = seller.by_id.get(listing_id)
+            if listing is not None:
+                return listing
+        return None
+
+    def count(self, key: str):
+        self.counters[key] = self.counters.get(key, 0) + 1
+
+    def take(self, client_key: str) -> Dict[str, int]:
+        """Record a request in the client's moving 60s window; returns the rate-limit state"""
+        now = time.monotonic()
+        window = self.windows.setdefault(client_key, deque())
+        while window and now - window[0] >= 60:
+            window.popleft()
+        limit = int(self.config["rate_limit"])
+        allowed = len(window) < limit
+        if allowed:
+            window.append(now)
+        return {
+            "allowed": allowed,
+            "limit": limit,
+            "used": len(window),
+            "remaining": max(0, limit - len(window)),
+            "retry_after": 0 if allowed else max(1, int(60 - (now - window[0])) + 1)
+        }
+
+state = SimulatorState()
+app = FastAPI(title="Discogs API simulator")
+
+def _client_key(request: Request) -> str:
+    match = _OAUTH_TOKEN.search(request.headers.get("authorization", ""))
+    if match:
+        return f"token:{match.group(1)}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+@app.middleware("http")
+async def simulate_network(request: Request, call_next):
+    """Latency, rate limiting and fault injection for every API call"""
+    if request.url.path.startswith("/_sim"):
+        return await call_next(request)
+
+    config = state.config
+    latency = max(0.0, config["latency_ms"] + random.uniform(-1, 1) * config["latency_jitter_ms"]) / 1000
+    if latency:
+        await asyncio.sleep(latency)
+
+    limits = state.take(_client_key(request))
+    headers = {
+        "X-Discogs-Ratelimit": str(limits["limit"]),
+        "X-Discogs-Ratelimit-Used": str(limits["used"]),
+        "X-Discogs-Ratelimit-Remaining": str(limits["remaining"])
+    }
+
+    if not limits["allowed"]:
+        state.count("429_rate_limit")
+        headers["Retry-After"] = str(limits["retry_after"])
+        return JSONResponse({"message": "You are making requests too quickly."}, status_code=429, headers=headers)
+    if state.fault_rng.random() < config["fault_429_rate"]:
+        state.count("429_injected")
+        headers["Retry-After"] = "1"
+        return JSONResponse({"message": "You are making requests too quickly."}, status_code=429, headers=headers)
+    if state.fault_rng.random() < config["fault_5xx_rate"]:
+        state.count("5xx_injected")
+        status = state.fault_rng.choice([500, 502, 503])
+        return JSONResponse({"message": "Simulated server error"}, status_code=status, headers=headers)
+
+    response = await call_next(request)
+    state.count(str(response.status_code))
+    for key, value in headers.items():
+        response.headers[key] = value
+    return response
+
+@app.get("/oauth/identity")
+async def identity():
+    seller = state.seller(SIM_USERNAME)
+    return {
+        "id": seller.user_id,
+        "username": seller.username,
+        "resource_url": f"/users/{seller.username}",
+        "consumer_name": "WaxValue"
+    }
+
+@app.get("/users/{username}")
+async def user_profile(username: str, request: Request):
+    state.identities[_client_key(request)] = username
+    seller = state.seller(username)
+    return {
+        "id": seller.user_id,
+        "username": username,
+        "resource_url": f"/users/{username}",
+        "name": username,
+        "realname": f"Simulated {username}",
+        "home_page": "",
+        "location": "Offline",
+        "avatar_url": f"https://img.example.invalid/avatars/{seller.user_id}.png",
+        "num_for_sale": seller.num_for_sale,
+        "num_listing": len(seller.listings),
+        "num_collection": 0,
+        "num_wantlist": 0
+    }
+
+@app.get("/users/{username}/inventory")
+async def user_inventory(username: str, request: Request, page: int = 1, per_page: int = 50,
+                         sort: Optional[str] = None, sort_order: str = "asc"):
+    state.identities[_client_key(request)] = username
+    seller = state.seller(username)
+    per_page = max(1, min(per_page, 100))
+    total = len(seller.listings)
+    pages = max(1, (total + per_page - 1) // per_page)
+    start = (page - 1) * per_page
+    return {
+        "pagination": {"page": page, "pages": pages, "per_page": per_page, "items": total, "urls": {}},
+        "listings": seller.sorted_listings(sort, sort_order)[start:start + per_page]
+    }
+
+@app.get("/marketplace/price_suggestions/{release_id}")
+async def price_suggestions(release_id: int):
+    base = release_base_price(release_id)
+    return {condition: {"currency": "USD", "value": round(base * factor, 2)} for condition, factor in CONDITIONS}
+
+@app.get("/marketplace/listings/{listing_id}")
+async def get_listing(listing_id: int):
+    listing = state.find_listing(listing_id)
+    if listing is None:
+        return JSONResponse({"message": "Listing not found."}, status_code=404)
+    return listing
+
+@app.post("/marketplace/listings/{listing_id}")
+async def edit_listing(listing_id: int, request: Request):
+    listing = state.find_listing(listing_id)
+    if listing is None:
+        return JSONResponse({"message": "Listing not found."}, status_code=404)
+    data = await request.json()
+    if "price" in data:
+        value = round(float(data["price"]), 2)
+        listing["price"] = {"value": value, "currency": data.get("currency", listing["price"]["currency"])}
+        listing["original_price"] = {"curr_abbr": listing["price"]["currency"], "value": value}
+    if data.get("status"):
+        listing["status"] = data["status"]
+    return Response(status_code=204)
+
+@app.post("/inventory/export")
+async def request_export(request: Request):
+    username = state.identities.get(_client_key(request), SIM_USERNAME)
+    export_id = len(state.exports) + 1
+    state.exports[export_id] = {"username": username, "created": time.time()}
+    return Response(status_code=200, headers={"Location": f"{request.base_url}inventory/export/{export_id}"})
+
+def _export_status(export_id: int, request: Request) -> Optional[Dict[str, Any]]:
+    export = state.exports.get(export_id)
+    if export is None:
+        return None
+    finished = time.time() - export["created"] >= SIM_EXPORT_SECONDS
+    created_ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(export["created"]))
+    return {
+        "id": export_id,
+        "status": "success" if finished else "pending",
+        "created_ts": created_ts,
+        "finished_ts": created_ts if finished else None,
+        "url": f"{request.base_url}inventory/export/{export_id}",
+        "download_url": f"{request.base_url}inventory/export/{export_id}/download" if finished else None,
+        "filename": f"{export['username']}-inventory-{export_id}.csv"
+    }
+
+@app.get("/inventory/export/{export_id}")
+async def get_export(export_id: int, request: Request):
+    export = _export_status(export_id, request)
+    if export is None:
+        return JSONResponse({"message": "Export not found."}, status_code=404)
+    return export
+
+@app.get("/inventory/export/{export_id}/download")
+async def download_export(export_id: int, request: Request):
+    export = _export_status(export_id, request)
+    if export is None or export["status"] != "success":
+        return JSONResponse({"message": "Export not found."}, status_code=404)
+    seller = state.seller(state.exports[export_id]["username"])
+
+    def rows() -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for i, listing in enumerate(seller.listings, 1):
+            writer.writerow(export_row(listing))
+            if i % 500 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return StreamingResponse(rows(), media_type="text/csv",
+                             headers={"Content-Disposition": f'attachment; filename="{export["filename"]}"'})
+
+@app.post("/inventory/upload/change")
+async def upload_changes(request: Request):
+    form = await request.form()
+    upload = form.get("upload")
+    if upload is None or isinstance(upload, str):
+        return JSONResponse({"message": "Missing upload file."}, status_code=422)
+    text = (await upload.read()).decode("utf-8-sig")
+
+    changed = not_found = dropped = 0
+    for row in csv.DictReader(io.StringIO(text)):
+        listing = state.find_listing(int(row.get("listing_id") or 0))
+        if listing is None:
+            not_found += 1
+            continue
+        if state.fault_rng.random() < state.config["upload_row_fault_rate"]:
+            dropped += 1
+            continue
+        if row.get("price"):
+            value = round(float(row["price"]), 2)
+            listing["price"] = {"value": value, "currency": listing["price"]["currency"]}
+            listing["original_price"] = {"curr_abbr": listing["price"]["currency"], "value": value}
+        changed += 1
+
+    upload_id = len(state.uploads) + 1
+    state.uploads[upload_id] = {
+        "created": time.time(),
+        "filename": upload.filename,
+        "results": f"CSV file contains {changed} changed listing(s); {not_found + dropped} listing(s) had errors"
+    }
+    return Response(status_code=200, headers={"Location": f"{request.base_url}inventory/upload/{upload_id}"})
+
+@app.get("/inventory/upload/{upload_id}")
+async def get_upload(upload_id: int):
+    upload = state.uploads.get(upload_id)
+    if upload is None:
+        return JSONResponse({"message": "Upload not found."}, status_code=404)
+    finished = time.time() - upload["created"] >= SIM_UPLOAD_SECONDS
+    created_ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(upload["created"]))
+    return {
+        "id": upload_id,
+        "type": "change",
+        "status": "success" if finished else "pending",
+        "results": upload["results"] if finished else None,
+        "created_ts": created_ts,
+        "finished_ts": created_ts if finished else None,
+        "filename": upload["filename"]
+    }
+
+@app.get("/_sim/stats")
+async def sim_stats():
+    """Response counts by status and fault type"""
+    return {"counters": state.counters, "sellers": {u: len(s.listings) for u, s in state.sellers.items()}}
+
+@app.post("/_sim/config")
+async def sim_config(changes: Dict[str, float]):
+    """Change latency, rate limit or fault rates at runtime"""
+    for key, value in changes.items():
+        if key in state.config:
+            state.config[key] = value
+    return state.config
+
+@app.post("/_sim/reset")
+async def sim_reset():
+    """Forget rate-limit windows, counters and price edits"""
+    state.sellers.clear()
+    state.windows.clear()
+    state.counters.clear()
+    state.identities.clear()
+    state.exports.clear()
+    state.uploads.clear()
+    return {"status": "reset"}
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("SIM_PORT", "9000")))
@@ -0,0 +1,99 @@
+"""
+Per-route HTTP metrics for WaxValue
+
+A pure ASGI middleware (no BaseHTTPMiddleware, so streamed responses are not
+buffered or copied) that records, per method and route template
+(/inventory/apply/{listing_id}, never the raw URL with its ids and session_id):
+- request latency until the last body byte is sent
+- requests in flight, including open SSE streams (a stream that never ends,
+  e.g. a leaked connection, keeps its route's gauge up)
+- response body sizes
+- request counts by status code and errors (5xx or an exception)
+
+The metrics go into the global registry and are exported by /metrics.
+"""
+
+import time
+import logging
+from typing import Dict, Optional
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "<unmatched>"
+RESPONSE_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+REQUEST_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_ERRORS = Counter("http_request_errors_total", "HTTP requests answered with 5xx or failed with an exception",
+                      ("method", "route"))
+HTTP_REQUEST_SECONDS = Histogram("http_request_seconds", "HTTP request latency until the last response byte",
+                                 ("method", "route"), buckets=REQUEST_SECONDS_BUCKETS)
+HTTP_RESPONSE_BYTES = Histogram("http_response_bytes", "HTTP response body size", ("method", "route"),
+                                buckets=RESPONSE_SIZE_BUCKETS)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests (and open streams) in progress", ("method", "route"))
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route a request will be dispatched to"""
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    partial: Optional[str] = None
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+class HTTPMetricsMiddleware:
+    """
+    Records per-route latency, in-flight requests, response sizes and errors
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = {"method": scope["method"], "route": route_template(scope)}
+        start = time.perf_counter()
+        state: Dict[str, object] = {"status": None, "bytes": 0}
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(**labels)
+        failed = False
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            failed = True
+            logger.error(f"Request failed: {labels['method']} {labels['route']}: {e}", exc_info=True)
+            raise
+        finally:
+            HTTP_IN_FLIGHT.dec(**labels)
+            duration = time.perf_counter() - start
+            status = self._record(labels, state, failed, duration)
+            logger.debug(f"{labels['method']} {labels['route']} {status} {duration * 1000:.1f}ms {state['bytes']}B")
+
+    @staticmethod
+    def _record(labels: Dict[str, str], state: Dict[str, object], failed: bool, duration: float) -> int:
+        status = 500 if failed or state["status"] is None else state["status"]
+        HTTP_REQUESTS.inc(status=str(status), **labels)
+        if status >= 500:
+            HTTP_ERRORS.inc(**labels)
+        HTTP_REQUEST_SECONDS.observe(duration, **labels)
+        HTTP_RESPONSE_BYTES.observe(state["bytes"], **labels)
+        return status
@@ -0,0 +1,153 @@
+"""
+Inventory snapshots through the Discogs inventory export job
+
+Paging /users/{username}/inventory costs one rate token per 100 listings and
+stops at 50 pages. For large inventories an export costs a handful of calls
+whatever the size:
+- POST /inventory/export starts the job
+- GET /inventory/export/{id} is polled (with growing intervals) until it finishes
+- GET /inventory/export/{id}/download streams the CSV, which is parsed row by
+  row into the same slim listing records inventory pages are projected to
+
+Exports only cover the authenticated user's own inventory, and the CSV has no
+currency or release images: listings get the seller's currency and no image.
+"""
+
+import os
+import sys
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from discogs_client import DiscogsAPIError
+
+logger = logging.getLogger(__name__)
+
+# Inventories with more listings than this are fetched by export (0 disables exports)
+INVENTORY_EXPORT_THRESHOLD = int(os.getenv("INVENTORY_EXPORT_THRESHOLD", "2500"))
+INVENTORY_EXPORT_POLL_SECONDS = float(os.getenv("INVENTORY_EXPORT_POLL_SECONDS", "5"))
+INVENTORY_EXPORT_MAX_POLL_SECONDS = float(os.getenv("INVENTORY_EXPORT_MAX_POLL_SECONDS", "30"))
+INVENTORY_EXPORT_TIMEOUT = float(os.getenv("INVENTORY_EXPORT_TIMEOUT", "600"))
+
+def _int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _float(value: Optional[str]) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def listing_from_export_row(row: Dict[str, str], currency: str) -> Optional[Dict[str, Any]]:
+    """
+    Convert one inventory export CSV row into an inventory listing record
+
+    Args:
+        row: CSV row (listing_id, release_id, artist, title, price, media_condition, ...)
+        currency: The seller's currency (the CSV does not include it)
+
+    Returns:
+        Slim listing record (see listings.slim_listing), or None for unusable rows
+    """
+    listing_id = _int(row.get("listing_id"))
+    release_id = _int(row.get("release_id"))
+    if listing_id is None or release_id is None:
+        return None
+
+    return {
+        "id": listing_id,
+        "status": sys.intern(row.get("status") or ""),
+        "condition": sys.intern(row.get("media_condition") or ""),
+        "sleeve_condition": sys.intern(row.get("sleeve_condition") or ""),
+        "posted": row.get("listed", ""),
+        "price": {"value": _float(row.get("price")), "currency": sys.intern(currency)},
+        "release": {
+            "id": release_id,
+            "artist": row.get("artist") or "Unknown Artist",
+            "title": row.get("title") or "Unknown Title",
+            "label": row.get("label") or "Unknown Label"
+        }
+    }
+
+def parse_inventory_export(rows: Iterable[Dict[str, str]], currency: str) -> Iterator[Dict[str, Any]]:
+    """Map export CSV rows to listing records, skipping rows without listing/release ids"""
+    skipped = 0
+    for row in rows:
+        listing = listing_from_export_row(row, currency)
+        if listing is None:
+            skipped += 1
+            continue
+        yield listing
+    if skipped:
+        logger.warning(f"Skipped {skipped} inventory export rows without listing or release id")
+
+def wait_for_inventory_job(fetch_status: Callable[[], Dict[str, Any]], description: str,
+                           poll_seconds: float = INVENTORY_EXPORT_POLL_SECONDS,
+                           timeout: float = INVENTORY_EXPORT_TIMEOUT,
+                           on_poll: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """
+    Poll an inventory export or upload job until it finishes
+
+    Args:
+        fetch_status: Returns the job's current data (one API call)
+        description: Job name for logs and errors, e.g. "Inventory export 12"
+        poll_seconds: First poll interval (grows 1.5x per poll up to INVENTORY_EXPORT_MAX_POLL_SECONDS)
+        timeout: Seconds to wait before giving up
+        on_poll: Called after every poll (e.g. to renew an analysis job's lease)
+
+    Returns:
+        The finished job's data
+
+    Raises:
+        DiscogsAPIError: If the job fails or does not finish in time
+    """
+    deadline = time.monotonic() + timeout
+    delay = poll_seconds
+    while True:
+        job = fetch_status()
+        status = (job.get("status") or "").lower()
+        if on_poll is not None:
+            on_poll()
+        if status == "success":
+            return job
+        if status in ("failed", "error"):
+            raise DiscogsAPIError(f"{description} failed: {job.get('results') or job}")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DiscogsAPIError(f"{description} not finished after {timeout:.0f}s (status: {status})")
+        logger.info(f"{description} is {status or 'pending'}, checking again in {delay:.1f}s")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 1.5, INVENTORY_EXPORT_MAX_POLL_SECONDS)
+
+def iter_inventory_export(client, currency: str = "USD",
+                          on_poll: Optional[Callable[[], Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Snapshot the authenticated user's whole inventory through an export job,
+    yielding listings as the CSV download is parsed
+
+    Args:
+        client: Authenticated DiscogsClient
+        currency: The seller's currency, applied to every listing
+        on_poll: Called after every status poll
+
+    Returns:
+        Iterator over every listing in the inventory (all statuses)
+    """
+    export_id = client.request_inventory_export()
+    logger.info(f"Requested inventory export {export_id}")
+    wait_for_inventory_job(lambda: client.get_inventory_export(export_id), f"Inventory export {export_id}",
+                           on_poll=on_poll)
+    count = 0
+    for listing in parse_inventory_export(client.iter_inventory_export(export_id), currency):
+        count += 1
+        yield listing
+    logger.info(f"Inventory export {export_id}: parsed {count} listings")
+
+def fetch_inventory_export(client, currency: str = "USD",
+                           on_poll: Optional[Callable[[], Any]] = None) -> List[Dict[str, Any]]:
+    """Like iter_inventory_export, but returns the whole inventory as a list"""
+    return list(iter_inventory_export(client, currency, on_poll))
@@ -0,0 +1,144 @@
+"""
+Bulk price changes through the Discogs inventory upload
+
+Applying prices one listing at a time costs a GET and a POST per listing. For
+larger batches the approved prices are written to an inventory change CSV
+(listing_id, price) instead, which costs a handful of calls whatever the size:
+- POST /inventory/upload/change uploads the CSV (in chunks of INVENTORY_UPLOAD_MAX_ROWS)
+- GET /inventory/upload/{id} is polled until Discogs has processed it
+- an inventory export then confirms, listing by listing, that the new price
+  is live (the upload status only reports totals)
+
+Changes from chunks that failed, and listings the export shows without their
+new price, are handed back so the caller can apply just those one by one.
+"""
+
+import io
+import os
+import csv
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from inventory_export import wait_for_inventory_job, iter_inventory_export
+
+logger = logging.getLogger(__name__)
+
+# Batches with at least this many listings are applied by upload (0 disables uploads)
+BULK_UPLOAD_MIN_LISTINGS = int(os.getenv("BULK_UPLOAD_MIN_LISTINGS", "20"))
+INVENTORY_UPLOAD_MAX_ROWS = int(os.getenv("INVENTORY_UPLOAD_MAX_ROWS", "5000"))
+INVENTORY_UPLOAD_TIMEOUT = float(os.getenv("INVENTORY_UPLOAD_TIMEOUT", "600"))
+# Check each price against an inventory export once the upload is processed
+INVENTORY_UPLOAD_VERIFY = os.getenv("INVENTORY_UPLOAD_VERIFY", "true").lower() == "true"
+
+def build_price_change_csv(changes: Dict[int, float]) -> bytes:
+    """
+    Write an inventory change CSV
+
+    Args:
+        changes: listing id -> new price
+
+    Returns:
+        CSV bytes with listing_id and price columns
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["listing_id", "price"])
+    for listing_id, price in changes.items():
+        writer.writerow([listing_id, f"{float(price):.2f}"])
+    return buffer.getvalue().encode("utf-8")
+
+def _export_price(listing: Dict[str, Any]) -> float:
+    price = listing.get("price", {})
+    return float(price.get("value", 0) if isinstance(price, dict) else price or 0)
+
+def reconcile_price_changes(changes: Dict[int, float],
+                            inventory: Optional[Iterable[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], Dict[int, float]]:
+    """
+    Check uploaded prices against the inventory, listing by listing
+
+    Args:
+        changes: listing id -> requested price
+        inventory: Inventory listings read after the upload (consumed as it is
+                   iterated, only the changed listings' prices are kept), or None
+                   if it could not be read (every change is then reported unverified)
+
+    Returns:
+        Tuple of (results for the listings that have their new price, shaped like
+        the bulk apply results; changes whose listing is missing or still has a
+        different price)
+    """
+    if inventory is None:
+        return [{"listingId": listing_id, "success": True, "newPrice": price, "verified": False}
+                for listing_id, price in changes.items()], {}
+
+    live_prices = {}
+    for listing in inventory:
+        if listing["id"] in changes:
+            live_prices[listing["id"]] = _export_price(listing)
+
+    results, unconfirmed = [], {}
+    for listing_id, price in changes.items():
+        live_price = live_prices.get(listing_id)
+        if live_price is None:
+            logger.warning(f"Listing {listing_id} not found in inventory after upload")
+            unconfirmed[listing_id] = price
+        elif round(live_price, 2) != round(float(price), 2):
+            logger.warning(f"Discogs did not apply the new price for listing {listing_id} (still {live_price:.2f})")
+            unconfirmed[listing_id] = price
+        else:
+            results.append({"listingId": listing_id, "success": True, "newPrice": price, "verified": True})
+    return results, unconfirmed
+
+def apply_price_changes_by_upload(client, changes: Dict[int, float], currency: str = "USD",
+                                  verify: bool = INVENTORY_UPLOAD_VERIFY,
+                                  on_poll: Optional[Callable[[], Any]] = None) -> Tuple[List[Dict[str, Any]], Dict[int, float]]:
+    """
+    Apply new prices with inventory change uploads and reconcile them per listing
+
+    Each chunk of INVENTORY_UPLOAD_MAX_ROWS is uploaded and waited for on its own,
+    so a failed chunk does not undo the ones that went through: its changes are
+    handed back to the caller to apply another way, together with any listing the
+    verification export shows without its new price.
+
+    Args:
+        client: Authenticated DiscogsClient (the listings must be its user's)
+        changes: listing id -> new price
+        currency: The seller's currency (used when reading back the export)
+        verify: Confirm each price with an inventory export after the upload
+        on_poll: Called after every status poll
+
+    Returns:
+        Tuple of (one result per applied listing: {"listingId", "success", "newPrice",
+        "verified"}; changes that were not applied or not confirmed)
+    """
+    listing_ids = list(changes)
+    uploaded, failed = {}, {}
+    chunk_size = max(1, INVENTORY_UPLOAD_MAX_ROWS)
+    for start in range(0, len(listing_ids), chunk_size):
+        chunk = {listing_id: changes[listing_id] for listing_id in listing_ids[start:start + chunk_size]}
+        try:
+            upload_id = client.upload_inventory_changes(build_price_change_csv(chunk))
+            logger.info(f"Uploaded inventory changes {upload_id} ({len(chunk)} listings)")
+            upload = wait_for_inventory_job(lambda: client.get_inventory_upload(upload_id),
+                                            f"Inventory upload {upload_id}",
+                                            timeout=INVENTORY_UPLOAD_TIMEOUT, on_poll=on_poll)
+            logger.info(f"Inventory upload {upload_id} processed: {upload.get('results', '')}")
+            uploaded.update(chunk)
+        except Exception as e:
+            logger.warning(f"Inventory upload of {len(chunk)} price changes failed: {e}")
+            failed.update(chunk)
+
+    if not uploaded:
+        return [], failed
+
+    if verify:
+        try:
+            # The export is streamed; only the uploaded listings' prices are kept
+            inventory = iter_inventory_export(client, currency=currency, on_poll=on_poll)
+            results, unconfirmed = reconcile_price_changes(uploaded, inventory)
+            failed.update(unconfirmed)
+            return results, failed
+        except Exception as e:
+            logger.warning(f"Could not verify uploaded prices, reporting them unverified: {e}")
+    results, _ = reconcile_price_changes(uploaded, None)
+    return results, failed
@@ -0,0 +1,232 @@
+"""
+Cross-process analysis job registry for WaxValue
+
+Analysis runs are registered in a small SQLite database so that every uvicorn
+worker sees the same state:
+- at most one analysis per Discogs account holds the lease at a time
+- the running worker renews its lease with heartbeats while it makes progress
+- a crashed worker stops heartbeating and its lease expires on its own
+- any worker can look up the active job for an account and attach to it
+"""
+
+import os
+import socket
+import sqlite3
+import time
+import secrets
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_REGISTRY_DB = os.getenv("JOB_REGISTRY_DB", "waxvalue_jobs.db")
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+
+@dataclass
+class Job:
+    """A registered analysis job"""
+    account_key: str
+    job_id: str
+    session_id: str
+    owner: str
+    started_at: float
+    heartbeat_at: float
+    lease_expires: float
+    processed: int = 0
+    total: int = 0
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.started_at
+
+class JobRegistry:
+    """
+    SQLite-backed registry of running analysis jobs keyed by Discogs account
+    """
+
+    def __init__(self, db_path: str = JOB_REGISTRY_DB, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; writes that need atomicity use BEGIN IMMEDIATE explicitly
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    account_key TEXT PRIMARY KEY,
+                    job_id TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    heartbeat_at REAL NOT NULL,
+                    lease_expires REAL NOT NULL,
+                    processed INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Job:
+        return Job(**{key: row[key] for key in row.keys()})
+
+    def acquire(self, account_key: str, session_id: str) -> Optional[Job]:
+        """
+        Try to start a job for an account
+
+        Returns:
+            The new Job, or None if another job still holds a live lease
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM analysis_jobs WHERE account_key = ?", (account_key,)
+            ).fetchone()
+            if row is not None and row["lease_expires"] > now:
+                conn.execute("ROLLBACK")
+                return None
+            if row is not None:
+                logger.warning(f"Taking over expired analysis lease for {account_key} (owner {row['owner']})")
+
+            job = Job(
+                account_key=account_key,
+                job_id=secrets.token_hex(8),
+                session_id=session_id,
+                owner=self.owner,
+                started_at=now,
+                heartbeat_at=now,
+                lease_expires=now + self.lease_seconds
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_jobs "
+                "(account_key, job_id, session_id, owner, started_at, heartbeat_at, lease_expires, processed, total) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0)",
+                (job.account_key, job.job_id, job.session_id, job.owner,
+                 job.started_at, job.heartbeat_at, job.lease_expires)
+            )
+            conn.execute("COMMIT")
+            return job
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job: Job, processed: Optional[int] = None, total: Optional[int] = None,
+                  force: bool = False) -> bool:
+        """
+        Renew a job's lease and record its progress
+
+        Calls are throttled to one write per JOB_HEARTBEAT_SECONDS unless force is set,
+        so it is cheap to call once per processed item.
+
+        Returns:
+            False if the lease was lost to another worker, True otherwise
+        """
+        if processed is not None:
+            job.processed = processed
+        if total is not None:
+            job.total = total
+
+        now = time.time()
+        if not force and now - job.heartbeat_at < JOB_HEARTBEAT_SECONDS:
+            return True
+
+        job.heartbeat_at = now
+        job.lease_expires = now + self.lease_seconds
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE analysis_jobs SET heartbeat_at = ?, lease_expires = ?, processed = ?, total = ? "
+                "WHERE account_key = ? AND job_id = ?",
+                (job.heartbeat_at, job.lease_expires, job.processed, job.total, job.account_key, job.job_id)
+            )
+            if cursor.rowcount == 0:
+                logger.warning(f"Analysis job {job.job_id} lost its lease for {job.account_key}")
+                return False
+            return True
+        finally:
+            conn.close()
+
+    def release(self, job: Job):
+        """Remove a finished job (no-op if the lease was already taken over)"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM analysis_jobs WHERE account_key = ? AND job_id = ?",
+                (job.account_key, job.job_id)
+            )
+        finally:
+            conn.close()
+
+    def get_active(self, account_key: str) -> Optional[Job]:
+        """Get the job currently holding a live lease for an account"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT * FROM analysis_jobs WHERE account_key = ? AND lease_expires > ?",
+                (account_key, time.time())
+            ).fetchone()
+            return self._row_to_job(row) if row is not None else None
+        finally:
+            conn.close()
+
+    def is_active(self, job: Job) -> bool:
+        """Check whether a specific job still holds its lease"""
+        active = self.get_active(job.account_key)
+        return active is not None and active.job_id == job.job_id
+
+class LeaseHandoff:
+    """
+    Hands a lease taken by a request handler over to the run that streams it
+
+    A streaming body may never start (the client disconnects before the first
+    chunk), and then nothing inside it can release the lease. The run calls
+    start() before doing any work and releases the lease itself once started;
+    the response calls abandon() when it is done. Whichever comes first wins:
+    an abandoned lease is released at once and a run that starts afterwards
+    does nothing.
+    """
+
+    def __init__(self, registry: JobRegistry, job: Job):
+        self.registry = registry
+        self.job = job
+        self._lock = threading.Lock()
+        self._started = False
+        self._abandoned = False
+
+    def start(self) -> bool:
+        """Claim the lease for the run; False if the response was already abandoned"""
+        with self._lock:
+            if self._abandoned:
+                return False
+            self._started = True
+            return True
+
+    def abandon(self):
+        """Release the lease unless the run started (the run then releases it)"""
+        with self._lock:
+            if self._started or self._abandoned:
+                return
+            self._abandoned = True
+        logger.info(f"Analysis job {self.job.job_id} never started, releasing its lease")
+        self.registry.release(self.job)
+
+# Global job registry instance
+job_registry = JobRegistry()
@@ -0,0 +1,56 @@
+"""
+Slim inventory listing records for analysis
+
+A raw Discogs inventory listing carries the whole release object (images,
+stats, URLs), the seller block, shipping details and resource URLs, but
+analysis only reads a handful of fields. Inventory pages are projected into
+slim records as soon as they are parsed, so the raw JSON can be freed instead
+of being held for the whole run.
+
+Slim records keep the raw listing's shape (plain dicts, same keys) so pricing,
+prefetch ordering and the analysis endpoints read them unchanged.
+"""
+
+import sys
+from typing import Any, Dict, Iterable, List
+
+from pricing import release_image_url
+
+# Fields analysis reads from a listing and from its release
+LISTING_FIELDS = ("id", "status", "condition", "sleeve_condition", "posted")
+RELEASE_FIELDS = ("id", "artist", "title", "label")
+
+def _intern(value: Any) -> Any:
+    """Share repeated strings (statuses, conditions, currencies) between records"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def slim_listing(listing: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Project a raw Discogs listing onto the fields analysis uses
+
+    Args:
+        listing: Listing from the inventory endpoint
+
+    Returns:
+        Listing dict with LISTING_FIELDS, price (value/currency) and a release
+        with RELEASE_FIELDS plus its display image as thumbnail
+    """
+    slim = {field: _intern(listing[field]) for field in LISTING_FIELDS if field in listing}
+
+    price = listing.get("price")
+    if isinstance(price, dict):
+        slim["price"] = {"value": price.get("value", 0), "currency": _intern(price.get("currency"))}
+    elif price is not None:
+        slim["price"] = price
+
+    release = listing.get("release") or {}
+    slim_release = {field: release[field] for field in RELEASE_FIELDS if field in release}
+    image_url = release_image_url(release)
+    if image_url:
+        slim_release["thumbnail"] = image_url
+    slim["release"] = slim_release
+    return slim
+
+def slim_listings(listings: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Project a page of raw listings"""
+    return [slim_listing(listing) for listing in listings]
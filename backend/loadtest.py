@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Load test for the Discogs client against discogs_simulator
+
+Runs the analysis workload (profile, inventory pagination, one price suggestion
+per unique release) for several simulated sellers at once, optionally followed
+by price edits, through the real DiscogsClient stack: token buckets, fair
+scheduler, retry policy and circuit breakers. Prints a JSON summary and exits
+non-zero when errors or throughput cross the given thresholds, so it can gate CI.
+
+Usage:
+    uvicorn discogs_simulator:app --port 9000 &
+    DISCOGS_API_BASE_URL=http://127.0.0.1:9000 python loadtest.py --sellers 4 --size 500
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+# Keep load-test rate buckets out of the working directory
+os.environ.setdefault("DISCOGS_RATE_LIMIT_DIR", tempfile.mkdtemp(prefix="waxvalue-loadtest-"))
+
+from discogs_client import DiscogsClient, DISCOGS_API_BASE_URL
+from discogs_scheduler import BATCH, discogs_scheduler
+from metrics import REGISTRY
+from serialization import dumps_str
+
+def run_seller(index: int, size: int, apply_count: int) -> Dict[str, Any]:
+    """Analyse (and optionally reprice) one simulated seller's inventory"""
+    username = f"loadtest{index}-{size}"
+    client = DiscogsClient(
+        consumer_key="loadtest",
+        consumer_secret="loadtest",
+        access_token=f"loadtest-token-{index}",
+        access_token_secret="loadtest",
+        account_id=f"loadtest{index}",
+        lane=BATCH
+    )
+    start = time.monotonic()
+    priced = 0
+    failures = 0
+    try:
+        client.get_user_profile(username)
+        listings = []
+        page, pages = 1, 1
+        while page <= pages:
+            data = client.get_user_inventory(username, page=page, per_page=100)
+            listings.extend(data.get("listings", []))
+            pages = data.get("pagination", {}).get("pages", 1)
+            page += 1
+
+        for_sale = [listing for listing in listings if listing.get("status") == "For Sale"]
+        suggestions: Dict[int, Dict[str, Any]] = {}
+        for listing in for_sale:
+            release_id = listing["release"]["id"]
+            if release_id not in suggestions:
+                try:
+                    suggestions[release_id] = client.get_price_suggestions(release_id)
+                except Exception:
+                    failures += 1
+                    suggestions[release_id] = {}
+            if suggestions[release_id]:
+                priced += 1
+
+        for listing in for_sale[:apply_count]:
+            status_code, _ = client.update_listing_price(listing["id"], listing["price"]["value"])
+            if status_code not in (200, 201, 204):
+                failures += 1
+    except Exception as e:
+        return {"seller": username, "error": str(e), "seconds": round(time.monotonic() - start, 2),
+                "requests": client.stats.snapshot()}
+
+    return {
+        "seller": username,
+        "listings": len(listings),
+        "forSale": len(for_sale),
+        "uniqueReleases": len(suggestions),
+        "priced": priced,
+        "failures": failures,
+        "seconds": round(time.monotonic() - start, 2),
+        "requests": client.stats.snapshot()
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test the Discogs client against the simulator")
+    parser.add_argument("--sellers", type=int, default=3, help="Concurrent simulated sellers")
+    parser.add_argument("--size", type=int, default=300, help="Listings per seller")
+    parser.add_argument("--apply", type=int, default=0, help="Price edits per seller after analysis")
+    parser.add_argument("--max-failures", type=int, default=0, help="Allowed failed calls across all sellers")
+    parser.add_argument("--min-throughput", type=float, default=0.0,
+                        help="Minimum listings priced per second across all sellers")
+    args = parser.parse_args()
+
+    if DISCOGS_API_BASE_URL.startswith("https://api.discogs.com"):
+        print("Refusing to load-test the real Discogs API - set DISCOGS_API_BASE_URL to the simulator", file=sys.stderr)
+        return 2
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.sellers) as pool:
+        results = list(pool.map(lambda i: run_seller(i, args.size, args.apply), range(args.sellers)))
+    elapsed = time.monotonic() - start
+
+    priced = sum(r.get("priced", 0) for r in results)
+    failures = sum(r.get("failures", 0) for r in results) + sum(1 for r in results if "error" in r)
+    summary = {
+        "baseUrl": DISCOGS_API_BASE_URL,
+        "seconds": round(elapsed, 2),
+        "priced": priced,
+        "throughput": round(priced / elapsed, 2) if elapsed else 0.0,
+        "failures": failures,
+        "sellers": results,
+        "scheduler": discogs_scheduler.stats(),
+        "metrics": REGISTRY.snapshot("discogs_")
+    }
+
+    print(dumps_str(summary))
+
+    if failures > args.max_failures:
+        print(f"FAIL: {failures} failures (max {args.max_failures})", file=sys.stderr)
+        return 1
+    if summary["throughput"] < args.min_throughput:
+        print(f"FAIL: throughput {summary['throughput']}/s below {args.min_throughput}/s", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import os
+import asyncio
 import secrets
 import logging
 import time
@@ -9,8 +10,10 @@ from typing import Dict, Any, Optional, List
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 from discogs_client import DiscogsOAuth, DiscogsClient
+from batch_executor import BatchCapacityError, batch_executor
 
 # Load environment variables
 load_dotenv()
@@ -197,6 +200,10 @@ def require_discogs_auth(user: User):
     if not user.accessToken or not user.accessTokenSecret:
         raise HTTPException(status_code=400, detail="Discogs account not connected")
 
+def batch_capacity_exception(error: BatchCapacityError) -> HTTPException:
+    """503 for a batch run turned away by admission control"""
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+
 def get_current_user(session_id: str) -> Optional[User]:
     """Get current user from session"""
     logger.info(f"Getting user for session: {session_id[:10]}...")
@@ -283,7 +290,7 @@ async def setup_auth(setup_data: dict = None, session_id: str = None):
         oauth = DiscogsOAuth(consumer_key, consumer_secret)
         frontend_url = os.getenv("FRONTEND_URL", "https://waxvalue.com")
         callback_url = f"{frontend_url}/auth/callback"
-        request_token, request_token_secret = oauth.get_request_token(callback_url)
+        request_token, request_token_secret = await asyncio.to_thread(oauth.get_request_token, callback_url)
         auth_url = oauth.get_authorize_url(request_token)
         
         # If session_id is provided, store tokens in session for later retrieval
@@ -311,10 +318,8 @@ async def setup_auth(setup_data: dict = None, session_id: str = None):
                 })
             
             # Store OAuth request tokens in session for verification
-            session = session_manager.get_session(session_id)
-            session["_oauth_request_token"] = request_token
-            session["_oauth_request_token_secret"] = request_token_secret
-            session_manager.set_session(session_id, session)  # Save to file
+            session_manager.update_session_data(session_id, "_oauth_request_token", request_token)
+            session_manager.update_session_data(session_id, "_oauth_request_token_secret", request_token_secret)
             logger.info(f"Stored OAuth tokens in session {session_id[:10]}...")
         
         logger.info(f"OAuth setup complete, returning auth URL")
@@ -377,8 +382,8 @@ async def verify_auth(verification: dict, session_id: str = None):
     
     try:
         oauth = DiscogsOAuth(consumer_key, consumer_secret)
-        access_token, access_token_secret = oauth.get_access_token(
-            request_token, request_token_secret, verifier_code
+        access_token, access_token_secret = await asyncio.to_thread(
+            oauth.get_access_token, request_token, request_token_secret, verifier_code
         )
         
         # Create authenticated client to get user info
@@ -386,7 +391,7 @@ async def verify_auth(verification: dict, session_id: str = None):
                               access_token, access_token_secret)
         
         try:
-            user_info = client.get_user_info()
+            user_info = await asyncio.to_thread(client.get_user_info)
             logger.info(f"🔍 user_info from Discogs: {user_info.keys()}")
             logger.info(f"🔍 avatar_url in user_info: {user_info.get('avatar_url')}")
         except Exception as e:
@@ -417,14 +422,12 @@ async def verify_auth(verification: dict, session_id: str = None):
                 "suggestions": []
             })
         
-        session = session_manager.get_session(session_id)
-        user_data = session["user"]
+        session = dict(session_manager.get_session(session_id))
+        user_data = dict(session["user"])
         
         # Clean up temporary OAuth request tokens from session
-        if "_oauth_request_token" in session:
-            del session["_oauth_request_token"]
-        if "_oauth_request_token_secret" in session:
-            del session["_oauth_request_token_secret"]
+        session.pop("_oauth_request_token", None)
+        session.pop("_oauth_request_token_secret", None)
         
         # Update user with Discogs info
         user_data.update({
@@ -470,7 +473,7 @@ async def disconnect_auth(session_id: str = None):
     
     # Remove Discogs data from user session
     session = session_manager.get_session(session_id)
-    user_data = session["user"]
+    user_data = dict(session["user"])
     
     user_data.update({
         "discogsUserId": None,
@@ -504,7 +507,7 @@ async def get_inventory_count(session_id: str = None):
         
         # Get instant count from user profile (single API call, no guessing needed!)
         try:
-            user_profile = client.get_user_profile(user.username)
+            user_profile = await client.get_user_profile_async(user.username)
             total_for_sale = user_profile.get('num_for_sale', 0)
             total_listings = user_profile.get('num_listing', 0)  # Total inventory (all statuses)
             
@@ -546,7 +549,7 @@ async def get_dashboard_summary(session_id: str = None):
         
         # Get instant count from user profile (single API call, no guessing needed!)
         try:
-            user_profile = client.get_user_profile(user.username)
+            user_profile = await client.get_user_profile_async(user.username)
             total_listings = user_profile.get('num_for_sale', 0)
             logger.info(f"Dashboard summary: {total_listings} For Sale items (from profile)")
         except Exception as e:
@@ -604,7 +607,13 @@ async def get_suggestions_stream(session_id: str = None):
             yield f"data: {json.dumps({'type': 'error', 'error': 'Analysis already in progress'})}\n\n"
         return StreamingResponse(already_running(), media_type="text/plain")
     
-    async def generate_suggestions():
+    # Analysis runs on the dedicated batch executor, within its admission limit
+    try:
+        ticket = batch_executor.admit("analysis")
+    except BatchCapacityError as e:
+        raise batch_capacity_exception(e)
+    
+    def generate_suggestions():
         # Set lock to prevent concurrent analysis
         analysis_lock[session_id] = True
         logger.info(f"Started analysis for session {session_id[:10]}... (lock acquired)")
@@ -891,7 +900,9 @@ async def get_suggestions_stream(session_id: str = None):
                 del analysis_lock[session_id]
                 logger.info(f"Analysis completed for session {session_id[:10]}... (lock released)")
     
-    return StreamingResponse(generate_suggestions(), media_type="text/plain")
+    # The ticket is also released if the response ends before its body starts
+    return StreamingResponse(batch_executor.iterate(generate_suggestions(), ticket), media_type="text/plain",
+                             background=BackgroundTask(ticket.release))
 
 @app.get("/inventory/suggestions")
 async def get_suggestions(session_id: str = None):
@@ -899,22 +910,28 @@ async def get_suggestions(session_id: str = None):
     user = require_auth(session_id)
     require_discogs_auth(user)
     
+    # Check if we have cached suggestions in the session first
+    session = session_manager.get_session(session_id)
+    cached_suggestions = session.get("suggestions", [])
+    
+    if cached_suggestions:
+        logger.info(f"Returning {len(cached_suggestions)} cached suggestions from session")
+        return {
+            "suggestions": cached_suggestions,
+            "total": len(cached_suggestions),
+            "totalItems": len(cached_suggestions),
+            "message": f"Found {len(cached_suggestions)} pricing suggestions (cached)"
+        }
+    
+    logger.info("No cached suggestions, running fresh analysis...")
+    try:
+        return await batch_executor.run("analysis", run_suggestions_analysis, user, session_id)
+    except BatchCapacityError as e:
+        raise batch_capacity_exception(e)
+
+def run_suggestions_analysis(user: User, session_id: str) -> Dict[str, Any]:
+    """Run a full (non-streaming) analysis and store its suggestions; blocking, run on the batch executor"""
     try:
-        # Check if we have cached suggestions in the session first
-        session = session_manager.get_session(session_id)
-        cached_suggestions = session.get("suggestions", [])
-        
-        if cached_suggestions:
-            logger.info(f"Returning {len(cached_suggestions)} cached suggestions from session")
-            return {
-                "suggestions": cached_suggestions,
-                "total": len(cached_suggestions),
-                "totalItems": len(cached_suggestions),
-                "message": f"Found {len(cached_suggestions)} pricing suggestions (cached)"
-            }
-        
-        logger.info("No cached suggestions, running fresh analysis...")
-        
         # Initialize Discogs client
         consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
         consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
@@ -1189,7 +1206,10 @@ async def create_strategy(strategy_data: dict, session_id: str = None):
         isActive=False
     )
     
-    session["strategies"].append(strategy.dict())
+    # Copy before changing: the cached session is only written through update_session_data
+    strategies = list(session.get("strategies", []))
+    strategies.append(strategy.dict())
+    session_manager.update_session_data(session_id, "strategies", strategies)
     
     return {
         "strategy": strategy.dict(),
@@ -1210,10 +1230,10 @@ async def update_settings(settings: dict, session_id: str = None):
     user = require_auth(session_id)
     session = session_manager.get_session(session_id)
     
-    session["settings"].update(settings)
-    session_manager.update_session_data(session_id, "settings", session["settings"])
+    updated_settings = {**session.get("settings", {}), **settings}
+    session_manager.update_session_data(session_id, "settings", updated_settings)
     return {
-        "settings": session["settings"],
+        "settings": updated_settings,
         "message": "Settings updated successfully"
     }
 
@@ -1240,27 +1260,24 @@ async def update_item_strategy(strategy_data: dict, session_id: str = None):
     if not listing_id:
         raise HTTPException(status_code=400, detail="listingId is required")
     
-    # Initialize item strategies if not exists
-    if "itemStrategies" not in session:
-        session["itemStrategies"] = {}
+    item_strategies = dict(session.get("itemStrategies", {}))
     
     # Update item strategy
     if strategy_id:
         # Find the strategy details
-        strategy = next((s for s in session["strategies"] if s["id"] == strategy_id), None)
+        strategy = next((s for s in session.get("strategies", []) if s["id"] == strategy_id), None)
         if not strategy:
             raise HTTPException(status_code=404, detail="Strategy not found")
         
-        session["itemStrategies"][str(listing_id)] = strategy
+        item_strategies[str(listing_id)] = strategy
         message = f'Applied "{strategy["name"]}" strategy to item {listing_id}'
     else:
         # Remove strategy assignment (use global strategy)
-        if str(listing_id) in session["itemStrategies"]:
-            del session["itemStrategies"][str(listing_id)]
+        item_strategies.pop(str(listing_id), None)
         message = f'Removed strategy assignment for item {listing_id} - using global strategy'
     
     # Save updated session
-    session_manager.update_session_data(session_id, "itemStrategies", session["itemStrategies"])
+    session_manager.update_session_data(session_id, "itemStrategies", item_strategies)
     
     # If a strategy was applied, recalculate the suggested price for this item
     if strategy_id:
@@ -1272,12 +1289,13 @@ async def recalculate_item_price(session_id: str, listing_id: int, strategy: dic
     """Recalculate suggested price for an item based on its assigned strategy"""
     try:
         session = session_manager.get_session(session_id)
-        suggestions = session.get("suggestions", [])
+        suggestions = list(session.get("suggestions", []))
         
         # Find the suggestion for this listing
-        suggestion = next((s for s in suggestions if s.get("listingId") == listing_id), None)
-        if not suggestion:
+        index = next((i for i, s in enumerate(suggestions) if s.get("listingId") == listing_id), None)
+        if index is None:
             return
+        suggestion = suggestions[index] = dict(suggestions[index])
         
         # Get the original Discogs suggested price (we'll need to fetch this again)
         # For now, let's apply the strategy adjustments to the current suggested price
@@ -1322,12 +1340,12 @@ async def adjust_suggested_price(request: dict, session_id: str = None):
         raise HTTPException(status_code=400, detail="listingId and newSuggestedPrice are required")
     
     # Find the suggestion in the session and update it
-    suggestions = session.get("suggestions", [])
+    suggestions = list(session.get("suggestions", []))
     suggestion_found = False
     
-    for suggestion in suggestions:
+    for index, suggestion in enumerate(suggestions):
         if suggestion.get("listingId") == listing_id:
-            suggestion["suggestedPrice"] = new_suggested_price
+            suggestions[index] = {**suggestion, "suggestedPrice": new_suggested_price}
             suggestion_found = True
             break
     
@@ -1368,7 +1386,8 @@ async def apply_price_suggestion(listing_id: int, listing_data: dict, session_id
         logger.info(f"User: {user.username}, Access Token: {user.accessToken[:10]}...")
         
         try:
-            status_code, result = client.update_listing_price(listing_id, new_price)
+            # Retries and token waits sleep; keep them off the event loop
+            status_code, result = await asyncio.to_thread(client.update_listing_price, listing_id, new_price)
             logger.info(f"Discogs API response: status={status_code}, result={result}")
         except Exception as update_error:
             logger.error(f"Exception during update_listing_price: {update_error}", exc_info=True)
@@ -1424,6 +1443,49 @@ async def apply_price_suggestion(listing_id: int, listing_data: dict, session_id
         logger.error(f"Failed to apply price suggestion: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to update listing: {str(e)}")
 
+def apply_suggested_prices(client: DiscogsClient, listing_ids: List[int],
+                           suggestions: List[Dict[str, Any]]) -> tuple:
+    """
+    Apply the suggested price of each listing on Discogs (blocking, run on the batch executor)
+    
+    Returns:
+        Tuple of (per-listing results, suggestions left after removing the applied ones)
+    """
+    results = []
+    
+    for listing_id in listing_ids:
+        try:
+            # Find the suggestion for this listing
+            suggestion = next((s for s in suggestions if s.get("listingId") == listing_id), None)
+            if not suggestion:
+                results.append({"listingId": listing_id, "success": False, "error": "Suggestion not found"})
+                continue
+            
+            new_price = suggestion.get("suggestedPrice")
+            if not new_price:
+                results.append({"listingId": listing_id, "success": False, "error": "No suggested price"})
+                continue
+            
+            # Update the listing on Discogs
+            logger.info(f"Bulk apply: Attempting to update listing {listing_id} with price {new_price}")
+            status_code, result = client.update_listing_price(listing_id, new_price)
+            
+            logger.info(f"Bulk apply: Discogs API response for listing {listing_id}: status={status_code}, result={result}")
+            
+            if status_code in [200, 201]:
+                results.append({"listingId": listing_id, "success": True, "newPrice": new_price})
+                
+                # Remove this suggestion from the session since it's been applied
+                suggestions = [s for s in suggestions if s.get("listingId") != listing_id]
+            else:
+                results.append({"listingId": listing_id, "success": False, "error": "Failed to update listing"})
+                
+        except Exception as e:
+            logger.error(f"Error applying price for listing {listing_id}: {e}")
+            results.append({"listingId": listing_id, "success": False, "error": str(e)})
+    
+    return results, suggestions
+
 @app.post("/inventory/bulk-apply")
 async def bulk_apply_price_suggestions(request: dict, session_id: str = None):
     """Apply price suggestions to multiple listings"""
@@ -1446,49 +1508,14 @@ async def bulk_apply_price_suggestions(request: dict, session_id: str = None):
             access_token_secret=user.accessTokenSecret
         )
         
-        results = []
-        successful_updates = 0
-        errors = 0
-        
         # Get current suggestions from session
         session = session_manager.get_session(session_id)
         suggestions = session.get("suggestions", [])
         
-        for listing_id in listing_ids:
-            try:
-                # Find the suggestion for this listing
-                suggestion = next((s for s in suggestions if s.get("listingId") == listing_id), None)
-                if not suggestion:
-                    results.append({"listingId": listing_id, "success": False, "error": "Suggestion not found"})
-                    errors += 1
-                    continue
-                
-                new_price = suggestion.get("suggestedPrice")
-                if not new_price:
-                    results.append({"listingId": listing_id, "success": False, "error": "No suggested price"})
-                    errors += 1
-                    continue
-                
-                # Update the listing on Discogs
-                logger.info(f"Bulk apply: Attempting to update listing {listing_id} with price {new_price}")
-                status_code, result = client.update_listing_price(listing_id, new_price)
-                
-                logger.info(f"Bulk apply: Discogs API response for listing {listing_id}: status={status_code}, result={result}")
-                
-                if status_code in [200, 201]:
-                    results.append({"listingId": listing_id, "success": True, "newPrice": new_price})
-                    successful_updates += 1
-                    
-                    # Remove this suggestion from the session since it's been applied
-                    suggestions = [s for s in suggestions if s.get("listingId") != listing_id]
-                else:
-                    results.append({"listingId": listing_id, "success": False, "error": "Failed to update listing"})
-                    errors += 1
-                    
-            except Exception as e:
-                logger.error(f"Error applying price for listing {listing_id}: {e}")
-                results.append({"listingId": listing_id, "success": False, "error": str(e)})
-                errors += 1
+        # The Discogs calls run on the dedicated batch executor
+        results, suggestions = await batch_executor.run("bulk_apply", apply_suggested_prices, client, listing_ids, suggestions)
+        successful_updates = sum(1 for result in results if result["success"])
+        errors = len(results) - successful_updates
         
         # Update session with remaining suggestions
         session_manager.update_session_data(session_id, "suggestions", suggestions)
@@ -1518,6 +1545,8 @@ async def bulk_apply_price_suggestions(request: dict, session_id: str = None):
             "results": results
         }
         
+    except BatchCapacityError as e:
+        raise batch_capacity_exception(e)
     except Exception as e:
         logger.error(f"Failed to bulk apply price suggestions: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to apply price suggestions: {str(e)}")
@@ -1575,7 +1604,7 @@ async def get_user_profile(session_id: str = None):
         
         # Get user profile from Discogs
         logger.info(f"Fetching profile for user: {user.username}")
-        profile = client.get_user_info()
+        profile = await asyncio.to_thread(client.get_user_info)
         logger.info(f"Received profile data: {profile}")
         logger.info(f"Available profile fields: {list(profile.keys()) if isinstance(profile, dict) else 'Not a dict'}")
         
@@ -3,14 +3,26 @@
 import os
 import secrets
 import logging
-import time
+import asyncio
 from datetime import datetime
-from typing import Dict, Any, Optional, List
-from fastapi import FastAPI, HTTPException
+from typing import Callable, Dict, Any, Iterator, Optional, List
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTasks
 from dotenv import load_dotenv
-from discogs_client import DiscogsOAuth, DiscogsClient
+from discogs_client import DiscogsOAuth, DiscogsClient, discogs_client_pool
+from circuit_breaker import circuit_states
+from discogs_scheduler import BATCH, INTERACTIVE, discogs_scheduler
+from batch_executor import BatchCapacityError, batch_executor
+from inventory_export import INVENTORY_EXPORT_THRESHOLD, iter_inventory_export
+from listings import slim_listings
+from inventory_upload import BULK_UPLOAD_MIN_LISTINGS, apply_price_changes_by_upload
+from metrics import REGISTRY
+from http_metrics import HTTPMetricsMiddleware
+from serialization import FastJSONResponse
+from sse import encode_data, EventBatcher, StreamCursor, StreamOptions
 
 # Load environment variables
 load_dotenv()
@@ -19,65 +31,109 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global lock to prevent concurrent analysis
-# Format: {session_id: {'locked': True, 'start_time': timestamp}}
-analysis_lock = {}
-
-def get_user_inventory_all_pages(client: DiscogsClient, username: str, first_page_data: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-    """Fetch all pages of user inventory"""
-    all_listings = []
+def iter_user_inventory_pages(client: DiscogsClient, username: str, first_page_data: Dict[str, Any] = None,
+                              on_export_poll: Optional[Callable[[], Any]] = None,
+                              sort: Optional[Dict[str, str]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield the user's inventory page by page as slim listing records (see listings.py)
+    
+    Inventories with more than INVENTORY_EXPORT_THRESHOLD listings are read
+    from a Discogs inventory export instead (a few calls whatever the size) and
+    yielded in chunks of 100 as the CSV is parsed, falling back to pagination
+    if the export fails before its first row. `on_export_poll` is called while
+    waiting for the export. `sort` ({"sort", "sort_order"}) is passed to every
+    page request, so the order holds across pages (exports come unsorted).
+    
+    Errors end the iteration early rather than failing the caller: whatever was
+    yielded before the error is kept.
+    """
+    per_page = 100  # Maximum per page from Discogs API
+    fetched = 0
+    sort = sort or {}
     
     try:
-        # Use provided first page data if available to avoid duplicate fetch
-        if first_page_data:
-            page_listings = first_page_data.get("listings", [])
-            all_listings.extend(page_listings)
-            logger.info(f"Page 1: Using provided data, {len(page_listings)} listings")
-            pagination = first_page_data.get("pagination", {})
-            total_pages = pagination.get("pages", 1)
-            start_page = 2  # Start from page 2 since we have page 1
-        else:
-            start_page = 1
-            total_pages = None
+        # The first page tells us the inventory size
+        if not first_page_data:
+            logger.info(f"Fetching inventory page 1 for user {username}")
+            first_page_data = client.get_user_inventory(username, page=1, per_page=per_page, **sort)
+        page_listings = first_page_data.get("listings", [])
+        pagination = first_page_data.get("pagination", {})
+        
+        total_listings = pagination.get("items", 0)
+        if INVENTORY_EXPORT_THRESHOLD and total_listings > INVENTORY_EXPORT_THRESHOLD:
+            logger.info(f"{total_listings} listings is above {INVENTORY_EXPORT_THRESHOLD}, using an inventory export")
+            currency = next((listing["price"].get("currency") for listing in page_listings
+                             if isinstance(listing.get("price"), dict)), None) or "USD"
+            try:
+                chunk = []
+                for listing in iter_inventory_export(client, currency=currency, on_poll=on_export_poll):
+                    chunk.append(listing)
+                    if len(chunk) == per_page:
+                        fetched += len(chunk)
+                        yield chunk
+                        chunk = []
+                if chunk:
+                    fetched += len(chunk)
+                    yield chunk
+                return
+            except Exception as e:
+                if fetched:
+                    raise
+                logger.warning(f"Inventory export failed, falling back to pagination: {e}")
+        
+        # Keep only the fields analysis reads; the raw page is dropped on the next iteration
+        page = slim_listings(page_listings)
+        fetched += len(page)
+        logger.info(f"Page 1: {len(page)} listings")
+        yield page
+        if not page or pagination.get("pages", 1) <= 1:
+            return
         
-        page = start_page
-        per_page = 100  # Maximum per page from Discogs API
+        page_number = 2  # Start from page 2 since we have page 1
         
         while True:
-            logger.info(f"Fetching inventory page {page} for user {username}")
-            inventory = client.get_user_inventory(username, page=page, per_page=per_page)
+            logger.info(f"Fetching inventory page {page_number} for user {username}")
+            inventory = client.get_user_inventory(username, page=page_number, per_page=per_page, **sort)
             page_listings = inventory.get("listings", [])
             
             if not page_listings:
-                logger.info(f"No more listings on page {page}, stopping pagination")
+                logger.info(f"No more listings on page {page_number}, stopping pagination")
                 break
-                
-            all_listings.extend(page_listings)
-            logger.info(f"Page {page}: Fetched {len(page_listings)} listings, total so far: {len(all_listings)}")
+            
+            page = slim_listings(page_listings)
+            fetched += len(page)
+            logger.info(f"Page {page_number}: Fetched {len(page)} listings, total so far: {fetched}")
+            yield page
             
             # Check if we've reached the last page
             pagination = inventory.get("pagination", {})
             total_pages = pagination.get("pages", 1)
-            if page >= total_pages:
+            if page_number >= total_pages:
                 logger.info(f"Reached last page ({total_pages})")
                 break
                 
-            page += 1
+            page_number += 1
             
             # Safety limit to prevent infinite loops
-            if page > 50:  # Max 5000 items
+            if page_number > 50:  # Max 5000 items
                 logger.warning(f"Reached safety limit of 50 pages, stopping pagination")
                 break
     
     except Exception as e:
         logger.error(f"Error fetching inventory pages: {e}")
-        # Return what we have so far rather than failing completely
-        logger.info(f"Returning {len(all_listings)} listings fetched before error")
-    
+        # Keep what we have so far rather than failing completely
+        logger.info(f"Returning {fetched} listings fetched before error")
+
+def get_user_inventory_all_pages(client: DiscogsClient, username: str, first_page_data: Dict[str, Any] = None,
+                                 on_export_poll: Optional[Callable[[], Any]] = None) -> List[Dict[str, Any]]:
+    """Fetch the whole inventory as slim listing records (see iter_user_inventory_pages)"""
+    all_listings = []
+    for page in iter_user_inventory_pages(client, username, first_page_data, on_export_poll):
+        all_listings.extend(page)
     return all_listings
 
 # Initialize FastAPI app
-app = FastAPI(title="WaxValue Backend", version="1.0.0")
+app = FastAPI(title="WaxValue Backend", version="1.0.0", default_response_class=FastJSONResponse)
 
 # CORS middleware - use environment variable for frontend URL
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -100,20 +156,16 @@ async def global_exception_handler(request, exc):
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
     return {"detail": f"Internal server error: {str(exc)}"}
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request, call_next):
-    logger.info(f"Request: {request.method} {request.url}")
-    try:
-        response = await call_next(request)
-        logger.info(f"Response: {response.status_code}")
-        return response
-    except Exception as e:
-        logger.error(f"Request failed: {e}", exc_info=True)
-        raise
+# Per-route latency, in-flight, size and error metrics (exported by /metrics); added last so it wraps CORS too
+app.add_middleware(HTTPMetricsMiddleware)
 
-# Import persistent session manager
+# Import persistent session manager and the cross-process job registry
 from session_manager import session_manager
+from job_registry import Job, LeaseHandoff, job_registry
+from run_log_store import run_log_store
+from run_profiler import RunProfiler
+from pricing import build_suggestion
+from prefetch import PriceSuggestionPrefetcher, inventory_sort, iter_release_groups, resolve_order
 
 # Pydantic models
 class User(BaseModel):
@@ -133,6 +185,7 @@ class UserSettings(BaseModel):
     priceChangeThreshold: float = 10.0
     maxPriceIncrease: float = 50.0
     minPriceDecrease: float = -25.0
+    analysisOrder: Optional[str] = None
 
 class Strategy(BaseModel):
     id: str
@@ -156,6 +209,7 @@ class PriceSuggestion(BaseModel):
     title: str
     label: str
     imageUrl: str
+    currency: str = "USD"
 
 # Default strategies
 DEFAULT_STRATEGIES = [
@@ -204,6 +258,71 @@ def require_discogs_auth(user: User):
     if not user.accessToken or not user.accessTokenSecret:
         raise HTTPException(status_code=400, detail="Discogs account not connected")
 
+def discogs_client_for(user: User, lane: str = INTERACTIVE) -> DiscogsClient:
+    """Pooled Discogs client for an authenticated user"""
+    return discogs_client_pool.get(
+        os.getenv("DISCOGS_CONSUMER_KEY"), os.getenv("DISCOGS_CONSUMER_SECRET"),
+        user.accessToken, user.accessTokenSecret, account_id=user.discogsUserId, lane=lane)
+
+def batch_capacity_exception(error: BatchCapacityError) -> HTTPException:
+    """503 for a batch run turned away by admission control"""
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+
+def seller_currency(session: Dict[str, Any], suggestions: List[Dict[str, Any]]) -> str:
+    """The seller's currency: from their listings' suggestions, else from their settings"""
+    currency = next((s["currency"] for s in suggestions if s.get("currency")), None)
+    return currency or session.get("settings", {}).get("currency") or "USD"
+
+def analysis_account_key(user: User) -> str:
+    """Key identifying the Discogs account an analysis runs for"""
+    return f"discogs:{user.discogsUserId or user.username}"
+
+def remember_profile_counts(session_id: str, user_profile: Dict[str, Any]):
+    """Cache the inventory counts from a fresh profile for use while Discogs is unavailable"""
+    session_manager.update_session_data(session_id, "profile_cache", {
+        "num_for_sale": user_profile.get("num_for_sale", 0),
+        "num_listing": user_profile.get("num_listing", 0),
+        "cachedAt": datetime.now().isoformat()
+    })
+
+def cached_profile_counts(session_id: str) -> Optional[Dict[str, Any]]:
+    """Last cached profile counts for a session, if any"""
+    session = session_manager.get_session(session_id) or {}
+    return session.get("profile_cache")
+
+def import_session_logs(user: User, session_id: str):
+    """
+    Move log entries still kept in the session (from before run logs had tables) into the run log store
+    
+    The entries are claimed (removed from the session atomically) before they are stored, so
+    concurrent callers - any thread or worker - import them once. Blocking: call off the event loop.
+    """
+    session = session_manager.get_session(session_id) or {}
+    if not session.get("logs"):
+        return
+    logs = session_manager.pop_session_data(session_id, "logs")
+    if not logs:
+        return
+    try:
+        count = run_log_store.import_session_logs(user, logs)
+    except Exception:
+        # Nothing was stored (the import is one transaction): give the entries back for the next attempt
+        session_manager.update_session_data(session_id, "logs", logs)
+        raise
+    logger.info(f"Moved {count} log entries from session {session_id[:10]}... to the run log store")
+
+def record_run_log(user: User, session_id: str, entry: Dict[str, Any], items: Optional[List[Dict[str, Any]]] = None):
+    """
+    Store a run log entry; failures are logged, not raised (the run itself already happened)
+    
+    Blocking database I/O: async handlers call it through asyncio.to_thread.
+    """
+    try:
+        import_session_logs(user, session_id)
+        run_log_store.record(user, entry, items)
+    except Exception as e:
+        logger.error(f"Failed to store {entry.get('action', 'analysis')} run log: {e}")
+
 def get_current_user(session_id: str) -> Optional[User]:
     """Get current user from session"""
     logger.info(f"Getting user for session: {session_id[:10]}...")
@@ -266,7 +385,6 @@ async def login(credentials: dict, session_id: str = None):
         "user": user.model_dump(),
         "settings": UserSettings().model_dump(),
         "strategies": [s.model_dump() for s in DEFAULT_STRATEGIES],
-        "logs": [],
         "suggestions": []
     }
     session_manager.set_session(session_id, session_data)
@@ -290,7 +408,7 @@ async def setup_auth(setup_data: dict = None, session_id: str = None):
         oauth = DiscogsOAuth(consumer_key, consumer_secret)
         # Use environment variable for callback URL
         callback_url = f"{FRONTEND_URL}/auth/callback"
-        request_token, request_token_secret = oauth.get_request_token(callback_url)
+        request_token, request_token_secret = await asyncio.to_thread(oauth.get_request_token, callback_url)
         auth_url = oauth.get_authorize_url(request_token)
         
         # If session_id is provided, store tokens in session for later retrieval
@@ -313,15 +431,12 @@ async def setup_auth(setup_data: dict = None, session_id: str = None):
                         "maxPriceIncrease": 50.0,
                         "minPriceDecrease": -25.0
                     },
-                    "logs": [],
                     "suggestions": []
                 })
             
             # Store OAuth request tokens in session for verification
-            session = session_manager.get_session(session_id)
-            session["_oauth_request_token"] = request_token
-            session["_oauth_request_token_secret"] = request_token_secret
-            session_manager.set_session(session_id, session)  # Save to file
+            session_manager.update_session_data(session_id, "_oauth_request_token", request_token)
+            session_manager.update_session_data(session_id, "_oauth_request_token_secret", request_token_secret)
             logger.info(f"Stored OAuth tokens in session {session_id[:10]}...")
         
         logger.info(f"OAuth setup complete, returning auth URL")
@@ -384,8 +499,8 @@ async def verify_auth(verification: dict, session_id: str = None):
     
     try:
         oauth = DiscogsOAuth(consumer_key, consumer_secret)
-        access_token, access_token_secret = oauth.get_access_token(
-            request_token, request_token_secret, verifier_code
+        access_token, access_token_secret = await asyncio.to_thread(
+            oauth.get_access_token, request_token, request_token_secret, verifier_code
         )
         
         # Create authenticated client to get user info
@@ -393,7 +508,7 @@ async def verify_auth(verification: dict, session_id: str = None):
                               access_token, access_token_secret)
         
         try:
-            user_info = client.get_user_info()
+            user_info = await asyncio.to_thread(client.get_user_info)
             logger.info(f"🔍 user_info from Discogs: {user_info.keys()}")
             logger.info(f"🔍 avatar_url in user_info: {user_info.get('avatar_url')}")
         except Exception as e:
@@ -420,18 +535,15 @@ async def verify_auth(verification: dict, session_id: str = None):
                     "maxPriceIncrease": 50.0,
                     "minPriceDecrease": -25.0
                 },
-                "logs": [],
                 "suggestions": []
             })
         
-        session = session_manager.get_session(session_id)
-        user_data = session["user"]
+        session = dict(session_manager.get_session(session_id))
+        user_data = dict(session["user"])
         
         # Clean up temporary OAuth request tokens from session
-        if "_oauth_request_token" in session:
-            del session["_oauth_request_token"]
-        if "_oauth_request_token_secret" in session:
-            del session["_oauth_request_token_secret"]
+        session.pop("_oauth_request_token", None)
+        session.pop("_oauth_request_token_secret", None)
         
         # Update user with Discogs info
         user_data.update({
@@ -448,8 +560,8 @@ async def verify_auth(verification: dict, session_id: str = None):
         # Save session with cleaned up tokens
         session_manager.set_session(session_id, session)
         
-        # Save updated session data
-        session_manager.update_session_data(session_id, "user", user_data)
+        # Save updated session data (durably: losing the tokens means authorizing again)
+        session_manager.update_session_data(session_id, "user", user_data, durable=True)
         
         # Debug logging
         logger.info(f"Updated user_data: {user_data}")
@@ -477,7 +589,11 @@ async def disconnect_auth(session_id: str = None):
     
     # Remove Discogs data from user session
     session = session_manager.get_session(session_id)
-    user_data = session["user"]
+    user_data = dict(session["user"])
+    
+    # Close the account's pooled clients so its credentials are not reused
+    if user_data.get("accessToken"):
+        discogs_client_pool.invalidate(user_data["accessToken"])
     
     user_data.update({
         "discogsUserId": None,
@@ -499,19 +615,12 @@ async def get_inventory_count(session_id: str = None):
     
     try:
         # Initialize Discogs client
-        consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
-        consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
-        
-        client = DiscogsClient(
-            consumer_key=consumer_key,
-            consumer_secret=consumer_secret,
-            access_token=user.accessToken,
-            access_token_secret=user.accessTokenSecret
-        )
+        client = discogs_client_for(user)
         
         # Get instant count from user profile (single API call, no pagination needed)
         try:
-            user_profile = client.get_user_profile(user.username)
+            user_profile = await client.get_user_profile_async(user.username)
+            remember_profile_counts(session_id, user_profile)
             total_for_sale = user_profile.get('num_for_sale', 0)
             total_listings = user_profile.get('num_listing', 0)  # Total inventory (all statuses)
             
@@ -524,6 +633,14 @@ async def get_inventory_count(session_id: str = None):
                 
         except Exception as e:
             logger.error(f"Error fetching inventory count: {e}")
+            cached = cached_profile_counts(session_id)
+            if cached:
+                logger.info(f"Using cached inventory count from {cached.get('cachedAt')}")
+                return {
+                    "totalForSale": cached.get("num_for_sale", 0),
+                    "totalListings": cached.get("num_listing", 0),
+                    "cached": True
+                }
             return {
                 "totalForSale": 0,
                 "totalListings": 0
@@ -541,26 +658,28 @@ async def get_dashboard_summary(session_id: str = None):
     
     try:
         # Initialize Discogs client
-        consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
-        consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
-        
-        client = DiscogsClient(
-            consumer_key=consumer_key,
-            consumer_secret=consumer_secret,
-            access_token=user.accessToken,
-            access_token_secret=user.accessTokenSecret
-        )
+        client = discogs_client_for(user)
         
         # Get user inventory count (For Sale items only) - use instant profile call
+        cached = None
+        total_listings = None
         try:
-            user_profile = client.get_user_profile(user.username)
+            user_profile = await client.get_user_profile_async(user.username)
+            remember_profile_counts(session_id, user_profile)
             total_listings = user_profile.get('num_for_sale', 0)
             logger.info(f"Dashboard summary: {total_listings} For Sale items (from profile)")
         except Exception as e:
             logger.error(f"Error fetching profile for dashboard: {e}")
+            cached = cached_profile_counts(session_id)
+        
+        if cached:
+            # Discogs is unavailable - serve the last known count instead of waiting on it
+            total_listings = cached.get("num_for_sale", 0)
+            logger.info(f"Dashboard summary: using cached count {total_listings} from {cached.get('cachedAt')}")
+        elif total_listings is None:
             # Fallback to pagination count if profile fails
             try:
-                inventory = client.get_user_inventory(user.username, per_page=1)
+                inventory = await client.get_user_inventory_async(user.username, per_page=1)
                 basic_count = inventory.get("pagination", {}).get("items", 0)
                 total_listings = basic_count
                 logger.info(f"Using fallback count: {total_listings} items")
@@ -573,11 +692,11 @@ async def get_dashboard_summary(session_id: str = None):
             session = session_manager.get_session(session_id)
             logger.info(f"Session data keys: {list(session.keys()) if session else 'No session'}")
             
-            logs = session.get("logs", [])
-            latest_log = logs[-1] if logs else None
+            await asyncio.to_thread(import_session_logs, user, session_id)
+            latest_log = await asyncio.to_thread(run_log_store.latest, user)
             suggestions = session.get("suggestions", [])
             
-            logger.info(f"Dashboard summary: {len(logs)} logs, {len(suggestions)} suggestions")
+            logger.info(f"Dashboard summary: {len(suggestions)} suggestions, last run {latest_log['runDate'] if latest_log else 'never'}")
         except Exception as e:
             logger.error(f"Error accessing session data: {e}")
             latest_log = None
@@ -594,7 +713,8 @@ async def get_dashboard_summary(session_id: str = None):
             "suggestedUpdates": len(suggestions),
             "averageDelta": average_delta,
             "lastRunDate": latest_log["runDate"] if latest_log else None,
-            "isRunning": False
+            "isRunning": False,
+            "isCached": cached is not None
         }
 
     except Exception as e:
@@ -603,17 +723,36 @@ async def get_dashboard_summary(session_id: str = None):
 
 # Inventory endpoints
 @app.get("/inventory/suggestions/stream")
-async def get_suggestions_stream(session_id: str = None):
-    """Get pricing suggestions for user's inventory with streaming progress updates"""
+async def get_suggestions_stream(session_id: str = None, batch: Optional[int] = None,
+                                 progress_ms: Optional[int] = None, progress_items: Optional[int] = None,
+                                 order: Optional[str] = None,
+                                 last_event_id: Optional[str] = Header(None)):
+    """
+    Get pricing suggestions for user's inventory with streaming progress updates
+    
+    Progress events are throttled and suggestions are sent in `suggestions` batches.
+    Clients can tune this with `batch` (suggestions per frame, 1 = one `suggestion`
+    event per item), `progress_ms` and `progress_items` (progress throttle).
+    
+    `order` sets which listings are priced first: `duplicated` (default),
+    `price_desc`, `stale` or `recent`. Without it the user's `analysisOrder`
+    setting is used. `duplicated` ranks releases over the whole inventory, so
+    pricing starts once every inventory page has been read.
+    
+    Every event carries an `id:` resume token. Clients reconnecting with
+    `Last-Event-ID` only receive suggestions they have not seen, and the final
+    `complete` event carries totals only.
+    """
     from fastapi.responses import StreamingResponse
-    import json
     import asyncio
     
     user = require_auth(session_id)
     require_discogs_auth(user)
+    stream_options = StreamOptions.from_query(batch, progress_ms, progress_items)
     
     # Check for existing complete cached data
     session = session_manager.get_session(session_id)
+    analysis_order = resolve_order(order or session.get("settings", {}).get("analysisOrder"))
     cached_suggestions = session.get("suggestions", [])
     analysis_complete = session.get("analysis_complete", None)
     
@@ -621,17 +760,10 @@ async def get_suggestions_stream(session_id: str = None):
     if cached_suggestions and analysis_complete is None:
         logger.info(f"Found {len(cached_suggestions)} cached suggestions without completion flag - verifying...")
         try:
-            consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
-            consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
-            
-            client = DiscogsClient(
-                consumer_key=consumer_key,
-                consumer_secret=consumer_secret,
-                access_token=user.accessToken,
-                access_token_secret=user.accessTokenSecret
-            )
+            # Initialize Discogs client
+            client = discogs_client_for(user)
             
-            user_profile = client.get_user_profile(user.username)
+            user_profile = await client.get_user_profile_async(user.username)
             expected_count = user_profile.get('num_for_sale', 0)
             
             if len(cached_suggestions) == expected_count:
@@ -648,108 +780,149 @@ async def get_suggestions_stream(session_id: str = None):
     # If we have complete cached data, return it via streaming format
     if cached_suggestions and analysis_complete:
         logger.info(f"Returning {len(cached_suggestions)} complete cached suggestions via streaming")
+        cursor = StreamCursor.resume(session.get("analysis_run_id") or "cached", last_event_id)
         
         async def stream_cached():
+            batcher = EventBatcher(stream_options, cursor)
+            
             # Send instant total
-            yield f"data: {json.dumps({'type': 'total', 'total': len(cached_suggestions)})}\n\n"
+            yield batcher.event('total', {'total': len(cached_suggestions)})
             
-            # Send completion with all suggestions
-            yield f"data: {json.dumps({'type': 'complete', 'suggestions': cached_suggestions, 'totalItems': len(cached_suggestions)})}\n\n"
+            # Send only the suggestions this client has not received yet
+            for suggestion in cached_suggestions[cursor.delivered:]:
+                for frame in batcher.add_suggestion(suggestion):
+                    yield frame
+            for frame in batcher.flush():
+                yield frame
+            
+            yield batcher.event('complete', {'totalItems': len(cached_suggestions), 'suggestionCount': len(cached_suggestions)})
         
         return StreamingResponse(stream_cached(), media_type="text/event-stream")
     
-    # Check if analysis is already running for this session (with timeout)
-    LOCK_TIMEOUT = 600  # 10 minutes
-    current_time = time.time()
-    
-    if session_id in analysis_lock:
-        lock_data = analysis_lock[session_id]
-        lock_age = current_time - lock_data.get('start_time', current_time)
-        
-        if lock_age < LOCK_TIMEOUT:
-            # Lock is still valid - stream current progress from session data
-            logger.warning(f"Analysis already running for session {session_id[:10]}... (running for {int(lock_age)}s) - will stream current progress")
+    # Only one analysis per Discogs account may run at once, across all worker processes
+    account_key = analysis_account_key(user)
+    job = job_registry.acquire(account_key, session_id)
+    active_job = None if job else job_registry.get_active(account_key)
+    
+    if active_job:
+        # Another run holds the lease - attach to it and stream its progress from session data
+        source_session_id = active_job.session_id
+        logger.warning(f"Analysis already running for {account_key} (job {active_job.job_id} on {active_job.owner}, running for {int(active_job.age)}s) - will stream current progress")
+        
+        async def stream_current_progress():
+            # Get current suggestions from session to show progress (may be written by another worker)
+            session_data = await asyncio.to_thread(session_manager.reload_session, source_session_id) or {}
+            session_suggestions = session_data.get("suggestions", [])
+            session_total = session_data.get("inventory_count", 0) or active_job.total
             
-            async def stream_current_progress():
-                # Get current suggestions from session to show progress
-                session_data = session_manager.get_session(session_id) or {}
-                session_suggestions = session_data.get("suggestions", [])
-                session_total = session_data.get("inventory_count", 0)
-                
-                # Send total if we have it
-                if session_total > 0:
-                    yield f"data: {json.dumps({'type': 'total', 'total': session_total})}\n\n"
-                
-                # Send current progress
-                current_count = len(session_suggestions)
-                if current_count > 0 and session_total > 0:
-                    yield f"data: {json.dumps({'type': 'progress', 'current': current_count, 'total': session_total})}\n\n"
-                
-                # Stream existing suggestions so far
-                for suggestion in session_suggestions:
-                    yield f"data: {json.dumps({'type': 'suggestion', 'suggestion': suggestion})}\n\n"
-                
-                # Keep connection open and poll for updates until analysis completes
-                while session_id in analysis_lock:
-                    await asyncio.sleep(2)
-                    # Check if analysis completed
-                    session_data = session_manager.get_session(session_id) or {}
-                    updated_suggestions = session_data.get("suggestions", [])
-                    if len(updated_suggestions) > current_count:
-                        # New suggestions added - stream them
-                        for suggestion in updated_suggestions[current_count:]:
-                            yield f"data: {json.dumps({'type': 'suggestion', 'suggestion': suggestion})}\n\n"
-                        current_count = len(updated_suggestions)
-                        yield f"data: {json.dumps({'type': 'progress', 'current': current_count, 'total': session_total})}\n\n"
-                
-                # Analysis complete - send final event
-                final_session = session_manager.get_session(session_id) or {}
-                final_suggestions = final_session.get("suggestions", [])
-                yield f"data: {json.dumps({'type': 'complete', 'suggestions': final_suggestions, 'totalItems': len(final_suggestions)})}\n\n"
+            cursor = StreamCursor.resume(session_data.get("analysis_run_id") or "running", last_event_id)
+            batcher = EventBatcher(stream_options, cursor)
             
-            return StreamingResponse(stream_current_progress(), media_type="text/event-stream")
-        else:
-            # Lock expired, clear it
-            logger.warning(f"Analysis lock expired for session {session_id[:10]}... (age: {int(lock_age)}s), clearing stale lock")
-            del analysis_lock[session_id]
+            # Send total if we have it
+            if session_total > 0:
+                yield batcher.event('total', {'total': session_total})
+            
+            # Send current progress
+            current_count = len(session_suggestions)
+            if current_count > 0 and session_total > 0:
+                yield batcher.event('progress', {'current': current_count, 'total': session_total})
+            
+            # Stream suggestions saved so far that this client has not received
+            for suggestion in session_suggestions[cursor.delivered:]:
+                for frame in batcher.add_suggestion(suggestion):
+                    yield frame
+            for frame in batcher.flush():
+                yield frame
+            
+            # Keep connection open and poll for updates until the job releases its lease
+            while await asyncio.to_thread(job_registry.is_active, active_job):
+                await asyncio.sleep(2)
+                session_data = await asyncio.to_thread(session_manager.reload_session, source_session_id) or {}
+                updated_suggestions = session_data.get("suggestions", [])
+                if len(updated_suggestions) > cursor.delivered:
+                    # New suggestions added - stream them
+                    for suggestion in updated_suggestions[cursor.delivered:]:
+                        for frame in batcher.add_suggestion(suggestion):
+                            yield frame
+                    current_count = len(updated_suggestions)
+                    for frame in batcher.progress({'current': current_count, 'total': session_total}):
+                        yield frame
+                    for frame in batcher.flush():
+                        yield frame
+            
+            # Analysis complete - send anything saved after the last poll, then totals
+            final_session = await asyncio.to_thread(session_manager.reload_session, source_session_id) or {}
+            final_suggestions = final_session.get("suggestions", [])
+            for suggestion in final_suggestions[cursor.delivered:]:
+                for frame in batcher.add_suggestion(suggestion):
+                    yield frame
+            for frame in batcher.flush():
+                yield frame
+            
+            # Run was started from another session of the same account - keep a copy of its results
+            if source_session_id != session_id and final_session.get("analysis_complete"):
+                for key in ("suggestions", "analysis_complete", "analysis_run_id", "inventory_count"):
+                    session_manager.update_session_data(session_id, key, final_session.get(key))
+            
+            yield batcher.event('complete', {'totalItems': session_total or len(final_suggestions), 'suggestionCount': len(final_suggestions)})
+        
+        return StreamingResponse(stream_current_progress(), media_type="text/event-stream")
+    
+    if job is None:
+        # The previous run finished between the two registry checks
+        job = job_registry.acquire(account_key, session_id)
+        if job is None:
+            raise HTTPException(status_code=409, detail="Analysis already in progress")
+    
+    # Analysis runs on the dedicated batch executor, within its admission limit
+    try:
+        ticket = batch_executor.admit("analysis")
+    except BatchCapacityError as e:
+        job_registry.release(job)
+        raise batch_capacity_exception(e)
+    
+    # The lease is released by the run once it starts, or by the response if it never does
+    handoff = LeaseHandoff(job_registry, job)
     
     def generate_suggestions():
-        # Set lock to prevent concurrent analysis
-        analysis_lock[session_id] = {'locked': True, 'start_time': time.time()}
+        if not handoff.start():
+            return
+        
         # Reset analysis_complete flag to indicate fresh analysis
         session_manager.update_session_data(session_id, "analysis_complete", False)
-        logger.info(f"Started analysis for session {session_id[:10]}... (lock acquired)")
+        
+        # New run - resume tokens from previous runs no longer apply
+        run_id = secrets.token_hex(4)
+        session_manager.update_session_data(session_id, "analysis_run_id", run_id)
+        batcher = EventBatcher(stream_options, StreamCursor(run_id))
+        profiler = None
+        logger.info(f"Started analysis for session {session_id[:10]}... (job {job.job_id} acquired for {account_key})")
         
         try:
             # Initialize Discogs client
-            consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
-            consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
-            
-            client = DiscogsClient(
-                consumer_key=consumer_key,
-                consumer_secret=consumer_secret,
-                access_token=user.accessToken,
-                access_token_secret=user.accessTokenSecret
-            )
+            # A per-run view of the pooled client, so the profile only counts this run's requests
+            client = discogs_client_for(user, BATCH).with_run_stats()
+            profiler = RunProfiler(client)
             
             # Use the stored username from the session (avoid extra API call)
             username = user.username
             logger.info(f"Using stored username: {username}")
             
             if not username:
-                yield f"data: {json.dumps({'error': 'Could not get user username'})}\n\n"
+                yield encode_data({'error': 'Could not get user username'})
                 return
             
             # Get user profile to get instant "For Sale" count
             # Use direct profile endpoint instead of get_user_info() to avoid 2 API calls
             logger.info("Getting user profile for instant count...")
             try:
-                user_profile = client.get_user_profile(username)
+                with profiler.phase("profile"):
+                    user_profile = client.get_user_profile(username)
                 instant_for_sale_count = user_profile.get('num_for_sale', 0)
                 logger.info(f"User profile shows {instant_for_sale_count} For Sale items")
                 
                 # Send instant count immediately (no API delay!)
-                yield f"data: {json.dumps({'type': 'total', 'total': instant_for_sale_count})}\n\n"
+                yield batcher.event('total', {'total': instant_for_sale_count})
                 logger.info(f"Sent instant For Sale count: {instant_for_sale_count}")
             except Exception as profile_error:
                 logger.warning(f"Could not get instant count from profile: {profile_error}")
@@ -757,254 +930,261 @@ async def get_suggestions_stream(session_id: str = None):
             
             # Use the instant count from Discogs profile API (no guessing needed!)
             total_items = instant_for_sale_count
+            session_manager.update_session_data(session_id, "inventory_count", total_items)
             logger.info(f"Using instant count from Discogs profile: {total_items} For Sale items")
             
-            # Now fetch inventory pages for detailed analysis
+            # Analysis is a pipeline over inventory pages: each page is filtered to For Sale
+            # listings and grouped by release as soon as it downloads, and the prefetcher
+            # reads pages only a bounded window ahead of pricing. The first suggestions
+            # stream out while later pages are still downloading (except in "duplicated"
+            # order, which needs every page to count each release's listings).
             logger.info("Fetching inventory pages...")
-            yield f"data: {json.dumps({'type': 'status', 'message': 'Fetching inventory details...'})}\n\n"
+            yield batcher.event('status', {'message': f'Processing {total_items} items...'})
             
-            first_page = client.get_user_inventory(username, page=1, per_page=100)
-            first_page_listings = first_page.get("listings", [])
+            inventory_counts = {"listings": 0, "for_sale": 0}
             
-            # Now fetch remaining pages (reusing first page data)
-            all_listings = get_user_inventory_all_pages(client, username, first_page_data=first_page)
-            
-            # Filter to only include items that are "For Sale"
-            for_sale_listings = [listing for listing in all_listings if listing.get("status") == "For Sale"]
-            
-            logger.info(f"Fetched {len(all_listings)} total listings from Discogs")
-            logger.info(f"Filtered to {len(for_sale_listings)} For Sale items")
-            
-            # Use the instant count from profile (no calculation needed)
-            logger.info(f"Using instant count from Discogs profile: {total_items} For Sale items")
+            # Discogs sorts the pages for orders it can sort by, so priority holds across pages
+            sort = inventory_sort(analysis_order)
             
-            # Cache for price suggestions by release_id to avoid duplicate API calls
-            # This significantly speeds up analysis when you have multiple copies of the same release
-            price_cache = {}
-            cache_hits = 0
+            def for_sale_pages():
+                first_page = client.get_user_inventory(username, page=1, per_page=100, **sort)
+                pages = iter_user_inventory_pages(
+                    client, username, first_page_data=first_page, sort=sort,
+                    # Large inventories come from an export job; keep the lease alive while it runs
+                    on_export_poll=lambda: job_registry.heartbeat(job, processed=processed, total=total_items, force=True))
+                # Listings are slim records from here on; don't keep the raw page alive
+                del first_page
+                for page in pages:
+                    for_sale = [listing for listing in page if listing.get("status") == "For Sale"]
+                    inventory_counts["listings"] += len(page)
+                    inventory_counts["for_sale"] += len(for_sale)
+                    yield for_sale
             
+            processed = 0
             suggestions = []
             
-            # Process all for-sale items
-            items_to_process = for_sale_listings
-            logger.info(f"Processing {total_items} For Sale items...")
+            logger.info(f"Processing {total_items} For Sale items (order: {analysis_order})...")
             
-            yield f"data: {json.dumps({'type': 'status', 'message': f'Processing {total_items} items...'})}\n\n"
-            
-            for i, listing in enumerate(items_to_process):
-                # Double-check status (should already be filtered, but just in case)
-                if listing.get("status") != "For Sale":
-                    logger.warning(f"Skipping listing {listing.get('id')} with status: {listing.get('status')}")
-                    continue
-                    
-                listing_id = listing["id"]
-                release_id = listing["release"]["id"]
-                
-                # Send progress update
-                progress_data = {
-                    'type': 'progress',
-                    'current': i + 1,
-                    'total': total_items,
-                    'percentage': round(((i + 1) / total_items) * 100, 1)
-                }
-                yield f"data: {json.dumps(progress_data)}\n\n"
-                
-                # Log progress every 5 items
-                if (i + 1) % 5 == 0 or i == 0:
-                    logger.info(f"Processing item {i+1}/{len(items_to_process)}: listing {listing_id}, release {release_id}")
-                
-                # Rate limiting is now handled by the token bucket in DiscogsClient
-                # No artificial delay needed - the rate limiter handles it
-                
-                try:
-                    # Handle price as dict with 'value' field from Discogs API
-                    price_data = listing.get("price", {})
-                    if isinstance(price_data, dict):
-                        current_price = float(price_data.get("value", 0))
-                    else:
-                        current_price = float(price_data or 0)
-                    
-                    # Get price suggestions from Discogs (with caching)
-                    if release_id in price_cache:
-                        price_suggestions = price_cache[release_id]
-                        cache_hits += 1
-                        logger.debug(f"Cache HIT for release {release_id} (saved API call #{cache_hits})")
-                    else:
-                        price_suggestions = client.get_price_suggestions(release_id)
-                        price_cache[release_id] = price_suggestions
-                        logger.debug(f"Cache MISS - fetched price suggestions for release {release_id}")
-                    
-                    stats = {}
-                    
-                    # The Discogs API returns price suggestions by condition (M, VG+, etc.)
-                    # We need to find the condition that matches our listing
-                    if price_suggestions and isinstance(price_suggestions, dict):
-                        # Get the listing condition to match against price suggestions
-                        listing_condition = listing.get("condition", "").upper()
+            release_groups = iter_release_groups(profiler.iterate(for_sale_pages(), "inventory"), analysis_order)
+            with PriceSuggestionPrefetcher(client, release_groups) as prefetcher:
+                for release_id, release_listings, price_suggestions, from_cache in profiler.iterate(prefetcher.results(), "price_fetch"):
+                    for position, listing in enumerate(release_listings):
+                        processed += 1
+                        listing_id = listing["id"]
                         
-                        # Try to find a matching condition in the price suggestions
-                        suggested_price = None
-                        condition_used = None
+                        # Renew the job lease (throttled) - stop if another worker took it over
+                        if not job_registry.heartbeat(job, processed=processed):
+                            yield batcher.event('error', {'error': 'Analysis lease lost to another worker'})
+                            return
                         
-                        # Common condition mappings
-                        condition_mappings = {
-                            "MINT (M)": ["M", "Mint"],
-                            "NEAR MINT (NM OR M-)": ["NM", "Near Mint"],
-                            "VERY GOOD PLUS (VG+)": ["VG+", "Very Good Plus"],
-                            "VERY GOOD (VG)": ["VG", "Very Good"],
-                            "GOOD PLUS (G+)": ["G+", "Good Plus"],
-                            "GOOD (G)": ["G", "Good"],
-                            "FAIR (F)": ["F", "Fair"],
-                            "POOR (P)": ["P", "Poor"]
+                        # Send progress update (throttled by the batcher); the profile count
+                        # can lag the inventory, so never report more than 100%
+                        progress_total = max(total_items, processed)
+                        progress_data = {
+                            'current': processed,
+                            'total': progress_total,
+                            'percentage': round((processed / progress_total) * 100, 1)
                         }
+                        for frame in batcher.progress(progress_data):
+                            yield frame
                         
-                        # Try to find matching condition
-                        for condition_key, search_terms in condition_mappings.items():
-                            if any(term in listing_condition for term in search_terms):
-                                # Look for this condition in price suggestions
-                                for condition, price_data in price_suggestions.items():
-                                    if any(term in condition.upper() for term in search_terms):
-                                        if isinstance(price_data, dict) and "value" in price_data:
-                                            suggested_price = float(price_data["value"])
-                                            condition_used = condition
-                                            break
-                                break
+                        # Log progress every 5 items
+                        if processed % 5 == 0 or processed == 1:
+                            logger.info(f"Processing item {processed}/{progress_total}: listing {listing_id}, release {release_id}")
                         
-                        # If no specific condition match, try to use any available suggestion
-                        if suggested_price is None and price_suggestions:
-                            for condition, price_data in price_suggestions.items():
-                                if isinstance(price_data, dict) and "value" in price_data:
-                                    suggested_price = float(price_data["value"])
-                                    condition_used = condition
-                                    break
+                        if price_suggestions is None:
+                            continue
                         
-                        if suggested_price is not None:
-                            # Determine status
-                            if suggested_price > current_price * 1.1:
-                                status = "underpriced"
-                            elif suggested_price < current_price * 0.9:
-                                status = "overpriced"
-                            else:
-                                status = "fairly_priced"
-                            
-                            # Extract release information
-                            release_info = listing.get("release", {})
-                            artist = release_info.get("artist", "Unknown Artist")
-                            title = release_info.get("title", "Unknown Title")
-                            
-                            # Get label information
-                            label = release_info.get("label", "Unknown Label")
+                        with profiler.phase("compute"):
+                            profiler.record_item(cache_hit=from_cache or position > 0)
+                            try:
+                                # Match the listing's condition against Discogs' suggestions by condition
+                                fields = build_suggestion(listing, price_suggestions)
+                                if fields is not None:
+                                    # Validated and dumped once; the same dict is saved and streamed
+                                    suggestion = PriceSuggestion(**fields).dict()
+                                    suggestions.append(suggestion)
+                                    
+                                    # Save incrementally every 10 suggestions so users can see partial results if they navigate away
+                                    if len(suggestions) % 10 == 0:
+                                        with profiler.phase("persist"):
+                                            session_manager.update_session_data(session_id, "suggestions", list(suggestions))
+                                        logger.debug(f"Incrementally saved {len(suggestions)} suggestions to session")
+                                    
+                                    # Queue suggestion for the next batch frame
+                                    for frame in batcher.add_suggestion(suggestion):
+                                        yield frame
                             
-                            # Get image URL
-                            images = release_info.get("images", [])
-                            primary_image = next((img for img in images if img.get("type") == "primary"), None)
-                            if primary_image:
-                                image_url = primary_image.get("uri150", primary_image.get("uri", ""))
-                            else:
-                                image_url = release_info.get("thumbnail", "")
-                            
-                            # Format condition properly
-                            media_condition = listing.get("condition", "Not Graded")
-                            sleeve_condition = listing.get("sleeve_condition", "Not Graded")
-                            
-                            # Convert full condition names to short codes
-                            def get_condition_short_code(condition):
-                                condition_mapping = {
-                                    'Mint (M)': 'M',
-                                    'Near Mint (NM or M-)': 'NM',
-                                    'Very Good Plus (VG+)': 'VG+',
-                                    'Very Good (VG)': 'VG',
-                                    'Good Plus (G+)': 'G+',
-                                    'Good (G)': 'G',
-                                    'Fair (F)': 'F',
-                                    'Poor (P)': 'P'
-                                }
-                                return condition_mapping.get(condition, condition)
-                            
-                            media_short = get_condition_short_code(media_condition)
-                            sleeve_short = get_condition_short_code(sleeve_condition)
-                            condition_display = f"Media: {media_short}, Sleeve: {sleeve_short}"
-                            
-                            # Simplify basis
-                            basis_simple = condition_used.split("(")[-1].replace(")", "").strip() if "(" in condition_used else condition_used
-                            
-                            # Get currency from listing or default to USD
-                            raw_currency = listing.get("currency", "USD")
-                            supported_currencies = ["USD", "GBP", "EUR", "CAD", "AUD", "JPY", "CHF", "MXN", "BRL", "NZD", "SEK", "ZAR"]
-                            currency = raw_currency if raw_currency in supported_currencies else "USD"
-                            
-                            if raw_currency not in supported_currencies:
-                                logger.warning(f"Unsupported currency '{raw_currency}' for listing {listing_id}, defaulting to USD")
-                            
-                            suggestion = PriceSuggestion(
-                                listingId=listing_id,
-                                releaseId=release_id,
-                                currentPrice=current_price,
-                                suggestedPrice=round(suggested_price, 2),
-                                originalSuggestedPrice=round(suggested_price, 2),
-                                currency=currency,
-                                basis=basis_simple,
-                                status=status,
-                                strategy="Conservative",
-                                condition=condition_display,
-                                artist=artist,
-                                title=title,
-                                label=label,
-                                imageUrl=image_url
-                            )
-                            suggestions.append(suggestion)
-                            
-                            # Save incrementally every 10 suggestions so users can see partial results if they navigate away
-                            if len(suggestions) % 10 == 0:
-                                session_manager.update_session_data(session_id, "suggestions", [s.dict() for s in suggestions])
-                                logger.debug(f"Incrementally saved {len(suggestions)} suggestions to session")
-                            
-                            # Send individual suggestion
-                            yield f"data: {json.dumps({'type': 'suggestion', 'suggestion': suggestion.dict()})}\n\n"
-                
-                except Exception as e:
-                    logger.error(f"Error processing listing {listing_id}: {e}")
-                    continue
+                            except Exception as e:
+                                logger.error(f"Error processing listing {listing_id}: {e}")
+                                continue
+            
+            for frame in batcher.flush():
+                yield frame
+            
+            logger.info(f"Fetched {inventory_counts['listings']} total listings from Discogs, {inventory_counts['for_sale']} For Sale")
             
             # Log cache efficiency
-            total_api_calls = total_items - cache_hits
-            logger.info(f"Analysis complete: {total_items} items processed, {cache_hits} cache hits, {total_api_calls} API calls made")
-            if cache_hits > 0:
-                logger.info(f"Cache saved {cache_hits} API calls ({round((cache_hits/total_items)*100, 1)}% reduction)")
+            cache_hits = processed - prefetcher.fetches
+            logger.info(f"Analysis complete: {processed} items processed, {cache_hits} cache hits, {prefetcher.fetches} price suggestion calls")
+            if cache_hits > 0 and processed:
+                logger.info(f"Release grouping saved {cache_hits} API calls ({round((cache_hits/processed)*100, 1)}% reduction)")
             
             # Save suggestions to session for persistence
-            session_manager.update_session_data(session_id, "suggestions", [s.dict() for s in suggestions])
-            session_manager.update_session_data(session_id, "analysis_complete", True)
+            with profiler.phase("persist"):
+                session_manager.update_session_data(session_id, "suggestions", suggestions)
+                session_manager.update_session_data(session_id, "analysis_complete", True)
             logger.info(f"Saved {len(suggestions)} suggestions to session")
             
-            # Add log entry for this run
+            # Add log entry for this run (durationSeconds/runConfig mirror the RunLog model columns)
             from datetime import datetime
-            log_entry = {
-                "runDate": datetime.now().isoformat(),
-                "suggestionsFound": len(suggestions),
-                "totalListings": total_items,
-                "status": "completed"
-            }
-            session = session_manager.get_session(session_id)
-            if session:
-                logs = session.get("logs", [])
-                logs.append(log_entry)
-                session_manager.update_session_data(session_id, "logs", logs)
+            with profiler.phase("persist"):
+                run_profile = profiler.finish()
+                log_entry = {
+                    "runDate": datetime.now().isoformat(),
+                    "suggestionsFound": len(suggestions),
+                    "totalListings": total_items,
+                    "status": "completed",
+                    "durationSeconds": run_profile["durationSeconds"],
+                    "runConfig": {"order": analysis_order, "profile": run_profile["profile"]}
+                }
+                record_run_log(user, session_id, log_entry)
                 logger.info(f"Added log entry for run completed at {log_entry['runDate']}")
             
-            # Send completion
-            yield f"data: {json.dumps({'type': 'complete', 'suggestions': [s.dict() for s in suggestions], 'totalItems': total_items})}\n\n"
+            # Send completion (totals only - suggestions were already streamed)
+            yield batcher.event('complete', {'totalItems': total_items, 'suggestionCount': len(suggestions)})
             
         except Exception as e:
             logger.error(f"Error in streaming suggestions: {e}")
-            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            yield batcher.event('error', {'error': str(e)})
         finally:
-            # Release lock
-            if session_id in analysis_lock:
-                del analysis_lock[session_id]
-                logger.info(f"Analysis completed for session {session_id[:10]}... (lock released)")
+            if profiler is not None:
+                run_profile = profiler.finish()
+                logger.info(f"Analysis profile for job {job.job_id}: {run_profile['durationSeconds']}s, {run_profile['profile']}")
+            # Workers attached to this run re-read the session file once the lease is released
+            session_manager.flush([session_id])
+            # Release the job lease so other workers can start or stop attaching
+            job_registry.release(job)
+            logger.info(f"Analysis completed for session {session_id[:10]}... (job {job.job_id} released)")
+    
+    # Runs once the response is over, even if its body never started
+    background = BackgroundTasks()
+    background.add_task(handoff.abandon)
+    background.add_task(ticket.release)
+    return StreamingResponse(batch_executor.iterate(generate_suggestions(), ticket), media_type="text/event-stream",
+                             background=background)
+
+def run_leased_suggestions_analysis(user: User, session_id: str, handoff: LeaseHandoff) -> Dict[str, Any]:
+    """Run the analysis under the account's job lease and release it when done (see LeaseHandoff)"""
+    if not handoff.start():
+        raise HTTPException(status_code=409, detail="Analysis request was abandoned before it started")
+    try:
+        return run_suggestions_analysis(user, session_id, handoff.job)
+    finally:
+        job_registry.release(handoff.job)
+
+def run_suggestions_analysis(user: User, session_id: str, job: Job) -> Dict[str, Any]:
+    """Run a full (non-streaming) analysis and store its suggestions; blocking, run on the batch executor"""
+    # Initialize Discogs client
+    client = discogs_client_for(user, BATCH)
+    
+    # Use the stored username from the session (avoid extra API call)
+    username = user.username
+    logger.info(f"Using stored username: {username}")
+    
+    if not username:
+        raise HTTPException(status_code=400, detail="Could not get user username")
+    
+    # Get user's inventory - fetch ALL pages for complete processing
+    logger.info("Fetching all inventory pages for suggestions...")
+    try:
+        all_listings = get_user_inventory_all_pages(
+            client, username, on_export_poll=lambda: job_registry.heartbeat(job, force=True))
+        
+        # Filter to only include items that are "For Sale"
+        for_sale_listings = [listing for listing in all_listings if listing.get("status") == "For Sale"]
+        
+        logger.info(f"Fetched {len(all_listings)} total listings from Discogs")
+        logger.info(f"Filtered to {len(for_sale_listings)} For Sale items")
+    except Exception as e:
+        logger.error(f"Error fetching inventory for suggestions: {e}")
+        for_sale_listings = []
+    
+    suggestions = []
+    
+    # Cache for price suggestions by release_id
+    price_cache = {}
+    cache_hits = 0
+    
+    # Process all for-sale items
+    items_to_process = for_sale_listings
+    total_items = len(items_to_process)
+    logger.info(f"Processing {total_items} For Sale items...")
+    job_registry.heartbeat(job, processed=0, total=total_items, force=True)
+    
+    for i, listing in enumerate(items_to_process):
+        # Renew the job lease (throttled) - stop if another worker took it over
+        if not job_registry.heartbeat(job, processed=i + 1):
+            raise HTTPException(status_code=409, detail="Analysis lease lost to another worker")
+        
+        # Double-check status (should already be filtered, but just in case)
+        if listing.get("status") != "For Sale":
+            logger.warning(f"Skipping listing {listing.get('id')} with status: {listing.get('status')}")
+            continue
+            
+        listing_id = listing["id"]
+        release_id = listing["release"]["id"]
+        # Log progress every 5 items
+        if (i + 1) % 5 == 0 or i == 0:
+            logger.info(f"Processing item {i+1}/{len(items_to_process)}: listing {listing_id}, release {release_id}")
+        
+        # Rate limiting is now handled by the token bucket in DiscogsClient
+        # No artificial delay needed
+        
+        try:
+            # Get price suggestions from Discogs (with caching)
+            if release_id in price_cache:
+                price_suggestions = price_cache[release_id]
+                cache_hits += 1
+            else:
+                price_suggestions = client.get_price_suggestions(release_id)
+                price_cache[release_id] = price_suggestions
+            
+            # Match the listing's condition against Discogs' suggestions by condition
+            fields = build_suggestion(listing, price_suggestions)
+            if fields is not None:
+                suggestion = PriceSuggestion(**fields)
+                suggestions.append(suggestion)
+                logger.info(f"Added suggestion for listing {listing_id}: ${suggestion.currentPrice} -> ${suggestion.suggestedPrice} ({suggestion.status})")
+            
+        except Exception as e:
+            logger.error(f"Error processing listing {listing_id}: {e}")
+            continue
+        
+        # If no price suggestions available, skip this item
+        if not price_suggestions or not isinstance(price_suggestions, dict):
+            logger.info(f"No price suggestions available for release {release_id}, skipping")
+            continue
+    
+    # Store suggestions in session
+    session_manager.update_session_data(session_id, "suggestions", [s.model_dump() for s in suggestions])
+    
+    # Add log entry for this run
+    from datetime import datetime
+    log_entry = {
+        "runDate": datetime.now().isoformat(),
+        "suggestionsFound": len(suggestions),
+        "totalListings": len(for_sale_listings),
+        "status": "completed"
+    }
+    record_run_log(user, session_id, log_entry)
     
-    return StreamingResponse(generate_suggestions(), media_type="text/event-stream")
+    return {
+        "suggestions": [s.model_dump() for s in suggestions],
+        "total": len(suggestions),
+        "totalItems": total_items,
+        "message": f"Found {len(suggestions)} pricing suggestions"
+    }
 
 @app.get("/inventory/suggestions")
 async def get_suggestions(session_id: str = None):
@@ -1024,17 +1204,9 @@ async def get_suggestions(session_id: str = None):
             logger.info(f"Found {len(cached_suggestions)} cached suggestions without completion flag - verifying...")
             try:
                 # Initialize Discogs client
-                consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
-                consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
-                
-                client = DiscogsClient(
-                    consumer_key=consumer_key,
-                    consumer_secret=consumer_secret,
-                    access_token=user.accessToken,
-                    access_token_secret=user.accessTokenSecret
-                )
+                client = discogs_client_for(user)
                 
-                user_profile = client.get_user_profile(user.username)
+                user_profile = await client.get_user_profile_async(user.username)
                 expected_count = user_profile.get('num_for_sale', 0)
                 
                 # If cached count matches expected count, mark as complete
@@ -1065,242 +1237,23 @@ async def get_suggestions(session_id: str = None):
         
         logger.info("No cached suggestions, running fresh analysis...")
         
-        # Initialize Discogs client
-        consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
-        consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
-        
-        client = DiscogsClient(
-            consumer_key=consumer_key,
-            consumer_secret=consumer_secret,
-            access_token=user.accessToken,
-            access_token_secret=user.accessTokenSecret
-        )
-        
-        # Use the stored username from the session (avoid extra API call)
-        username = user.username
-        logger.info(f"Using stored username: {username}")
-        
-        if not username:
-            raise HTTPException(status_code=400, detail="Could not get user username")
+        # Only one analysis per Discogs account may run at once, across all worker processes
+        job = await asyncio.to_thread(job_registry.acquire, analysis_account_key(user), session_id)
+        if job is None:
+            raise HTTPException(status_code=409, detail="Analysis already in progress")
         
-        # Get user's inventory - fetch ALL pages for complete processing
-        logger.info("Fetching all inventory pages for suggestions...")
+        # The analysis itself runs on the dedicated batch executor. It releases the lease once it
+        # has started; if it never does (no capacity, client gone), the lease is released here.
+        handoff = LeaseHandoff(job_registry, job)
         try:
-            all_listings = get_user_inventory_all_pages(client, username)
-            
-            # Filter to only include items that are "For Sale"
-            for_sale_listings = [listing for listing in all_listings if listing.get("status") == "For Sale"]
-            
-            logger.info(f"Fetched {len(all_listings)} total listings from Discogs")
-            logger.info(f"Filtered to {len(for_sale_listings)} For Sale items")
-        except Exception as e:
-            logger.error(f"Error fetching inventory for suggestions: {e}")
-            for_sale_listings = []
-        
-        suggestions = []
-        
-        # Cache for price suggestions by release_id
-        price_cache = {}
-        cache_hits = 0
-        
-        # Process all for-sale items
-        items_to_process = for_sale_listings
-        total_items = len(items_to_process)
-        logger.info(f"Processing {total_items} For Sale items...")
-        
-        for i, listing in enumerate(items_to_process):
-            # Double-check status (should already be filtered, but just in case)
-            if listing.get("status") != "For Sale":
-                logger.warning(f"Skipping listing {listing.get('id')} with status: {listing.get('status')}")
-                continue
-                
-            listing_id = listing["id"]
-            release_id = listing["release"]["id"]
-            # Log progress every 5 items
-            if (i + 1) % 5 == 0 or i == 0:
-                logger.info(f"Processing item {i+1}/{len(items_to_process)}: listing {listing_id}, release {release_id}")
-            
-            # Rate limiting is now handled by the token bucket in DiscogsClient
-            # No artificial delay needed
-            
-            try:
-                # Handle price as dict with 'value' field from Discogs API
-                price_data = listing.get("price", {})
-                if isinstance(price_data, dict):
-                    current_price = float(price_data.get("value", 0))
-                else:
-                    current_price = float(price_data or 0)
-                    
-                # Get price suggestions from Discogs (with caching)
-                if release_id in price_cache:
-                    price_suggestions = price_cache[release_id]
-                    cache_hits += 1
-                else:
-                    price_suggestions = client.get_price_suggestions(release_id)
-                    price_cache[release_id] = price_suggestions
-                    
-                stats = {}
-                
-                # Debug: Log the actual response structure
-                logger.info(f"Price suggestions for release {release_id}: {price_suggestions}")
-                
-                # The Discogs API returns price suggestions by condition (M, VG+, etc.)
-                # We need to find the condition that matches our listing
-                if price_suggestions and isinstance(price_suggestions, dict):
-                    # Get the listing condition to match against price suggestions
-                    listing_condition = listing.get("condition", "").upper()
-                    
-                    # Try to find a matching condition in the price suggestions
-                    suggested_price = None
-                    condition_used = None
-                    
-                    # Common condition mappings
-                    condition_mappings = {
-                        "MINT (M)": ["M", "Mint"],
-                        "NEAR MINT (NM OR M-)": ["NM", "Near Mint"],
-                        "VERY GOOD PLUS (VG+)": ["VG+", "Very Good Plus"],
-                        "VERY GOOD (VG)": ["VG", "Very Good"],
-                        "GOOD PLUS (G+)": ["G+", "Good Plus"],
-                        "GOOD (G)": ["G", "Good"],
-                        "FAIR (F)": ["F", "Fair"],
-                        "POOR (P)": ["P", "Poor"]
-                    }
-                    
-                    # Try to find matching condition
-                    for condition_key, search_terms in condition_mappings.items():
-                        if any(term in listing_condition for term in search_terms):
-                            # Look for this condition in price suggestions
-                            for condition, price_data in price_suggestions.items():
-                                if any(term in condition.upper() for term in search_terms):
-                                    if isinstance(price_data, dict) and "value" in price_data:
-                                        suggested_price = float(price_data["value"])
-                                        condition_used = condition
-                                        break
-                            break
-                    
-                    # If no specific condition match, try to use any available suggestion
-                    if suggested_price is None and price_suggestions:
-                        for condition, price_data in price_suggestions.items():
-                            if isinstance(price_data, dict) and "value" in price_data:
-                                suggested_price = float(price_data["value"])
-                                condition_used = condition
-                                break
-                    
-                    if suggested_price is not None:
-                        # Determine status
-                        if suggested_price > current_price * 1.1:
-                            status = "underpriced"
-                        elif suggested_price < current_price * 0.9:
-                            status = "overpriced"
-                        else:
-                            status = "fairly_priced"
-                        
-                        # Extract release information
-                        release_info = listing.get("release", {})
-                        logger.info(f"Release {release_id} full data: {release_info}")
-                        artist = release_info.get("artist", "Unknown Artist")
-                        title = release_info.get("title", "Unknown Title")
-                        
-                        # Get label information - Discogs returns label directly, not in labels array
-                        label = release_info.get("label", "Unknown Label")
-                        logger.info(f"Release {release_id} label: {label}")
-                        
-                        # Get image URL - try primary image first, then thumbnail
-                        images = release_info.get("images", [])
-                        logger.info(f"Release {release_id} images: {len(images)} available")
-                        primary_image = next((img for img in images if img.get("type") == "primary"), None)
-                        if primary_image:
-                            image_url = primary_image.get("uri150", primary_image.get("uri", ""))
-                            logger.info(f"Using primary image: {image_url}")
-                        else:
-                            image_url = release_info.get("thumbnail", "")
-                            logger.info(f"Using thumbnail: {image_url}")
-                        
-                        # Format condition properly (Media: VG+, Sleeve: G)
-                        # Discogs API uses 'condition' for media and 'sleeve_condition' for sleeve
-                        media_condition = listing.get("condition", "Not Graded")
-                        sleeve_condition = listing.get("sleeve_condition", "Not Graded")
-                        
-                        # Convert full condition names to short codes
-                        def get_condition_short_code(condition):
-                            condition_mapping = {
-                                'Mint (M)': 'M',
-                                'Near Mint (NM or M-)': 'NM',
-                                'Very Good Plus (VG+)': 'VG+',
-                                'Very Good (VG)': 'VG',
-                                'Good Plus (G+)': 'G+',
-                                'Good (G)': 'G',
-                                'Fair (F)': 'F',
-                                'Poor (P)': 'P'
-                            }
-                            return condition_mapping.get(condition, condition)
-                        
-                        media_short = get_condition_short_code(media_condition)
-                        sleeve_short = get_condition_short_code(sleeve_condition)
-                        condition_display = f"Media: {media_short}, Sleeve: {sleeve_short}"
-                        
-                        # Simplify basis (just the condition abbreviation)
-                        basis_simple = condition_used.split("(")[-1].replace(")", "").strip() if "(" in condition_used else condition_used
-                        
-                        # Get currency from listing or default to USD
-                        # Validate currency is supported by Discogs API
-                        raw_currency = listing.get("currency", "USD")
-                        supported_currencies = ["USD", "GBP", "EUR", "CAD", "AUD", "JPY", "CHF", "MXN", "BRL", "NZD", "SEK", "ZAR"]
-                        currency = raw_currency if raw_currency in supported_currencies else "USD"
-                        
-                        if raw_currency not in supported_currencies:
-                            logger.warning(f"Unsupported currency '{raw_currency}' for listing {listing_id}, defaulting to USD")
-                        
-                        suggestion = PriceSuggestion(
-                                listingId=listing_id,
-                                releaseId=release_id,
-                                currentPrice=current_price,
-                                suggestedPrice=round(suggested_price, 2),
-                                originalSuggestedPrice=round(suggested_price, 2),  # Store original for strategy calculations
-                                currency=currency,  # Include currency information
-                                basis=basis_simple,
-                                status=status,
-                                strategy="Conservative",
-                                condition=condition_display,
-                                artist=artist,
-                                title=title,
-                                label=label,
-                                imageUrl=image_url
-                            )
-                        suggestions.append(suggestion)
-                        logger.info(f"Added suggestion for listing {listing_id}: ${current_price} -> ${suggested_price} ({status})")
-                
-            except Exception as e:
-                logger.error(f"Error processing listing {listing_id}: {e}")
-                continue
-            
-            # If no price suggestions available, skip this item
-            if not price_suggestions or not isinstance(price_suggestions, dict):
-                logger.info(f"No price suggestions available for release {release_id}, skipping")
-                continue
-        
-        # Store suggestions in session
-        session_manager.update_session_data(session_id, "suggestions", [s.model_dump() for s in suggestions])
-        
-        # Add log entry for this run
-        from datetime import datetime
-        log_entry = {
-            "runDate": datetime.now().isoformat(),
-            "suggestionsFound": len(suggestions),
-            "totalListings": len(for_sale_listings),
-            "status": "completed"
-        }
-        session = session_manager.get_session(session_id)
-        session["logs"].append(log_entry)
-        session_manager.update_session_data(session_id, "logs", session["logs"])
-        
-        return {
-            "suggestions": [s.model_dump() for s in suggestions],
-            "total": len(suggestions),
-            "totalItems": total_items,
-            "message": f"Found {len(suggestions)} pricing suggestions"
-        }
+            return await batch_executor.run("analysis", run_leased_suggestions_analysis, user, session_id, handoff)
+        finally:
+            handoff.abandon()
         
+    except BatchCapacityError as e:
+        raise batch_capacity_exception(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting suggestions: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get suggestions: {str(e)}")
@@ -1339,7 +1292,10 @@ async def create_strategy(strategy_data: dict, session_id: str = None):
         isActive=False
     )
     
-    session["strategies"].append(strategy.dict())
+    # Copy before changing: the cached session is only written through update_session_data
+    strategies = list(session.get("strategies", []))
+    strategies.append(strategy.dict())
+    session_manager.update_session_data(session_id, "strategies", strategies)
     
     return {
         "strategy": strategy.dict(),
@@ -1360,10 +1316,10 @@ async def update_settings(settings: dict, session_id: str = None):
     user = require_auth(session_id)
     session = session_manager.get_session(session_id)
     
-    session["settings"].update(settings)
-    session_manager.update_session_data(session_id, "settings", session["settings"])
+    updated_settings = {**session.get("settings", {}), **settings}
+    session_manager.update_session_data(session_id, "settings", updated_settings)
     return {
-        "settings": session["settings"],
+        "settings": updated_settings,
         "message": "Settings updated successfully"
     }
 
@@ -1390,27 +1346,24 @@ async def update_item_strategy(strategy_data: dict, session_id: str = None):
     if not listing_id:
         raise HTTPException(status_code=400, detail="listingId is required")
     
-    # Initialize item strategies if not exists
-    if "itemStrategies" not in session:
-        session["itemStrategies"] = {}
+    item_strategies = dict(session.get("itemStrategies", {}))
     
     # Update item strategy
     if strategy_id:
         # Find the strategy details
-        strategy = next((s for s in session["strategies"] if s["id"] == strategy_id), None)
+        strategy = next((s for s in session.get("strategies", []) if s["id"] == strategy_id), None)
         if not strategy:
             raise HTTPException(status_code=404, detail="Strategy not found")
         
-        session["itemStrategies"][str(listing_id)] = strategy
+        item_strategies[str(listing_id)] = strategy
         message = f'Applied "{strategy["name"]}" strategy to item {listing_id}'
     else:
         # Remove strategy assignment (use global strategy)
-        if str(listing_id) in session["itemStrategies"]:
-            del session["itemStrategies"][str(listing_id)]
+        item_strategies.pop(str(listing_id), None)
         message = f'Removed strategy assignment for item {listing_id} - using global strategy'
     
     # Save updated session
-    session_manager.update_session_data(session_id, "itemStrategies", session["itemStrategies"])
+    session_manager.update_session_data(session_id, "itemStrategies", item_strategies)
     
     # If a strategy was applied, recalculate the suggested price for this item
     if strategy_id:
@@ -1422,12 +1375,13 @@ async def recalculate_item_price(session_id: str, listing_id: int, strategy: dic
     """Recalculate suggested price for an item based on its assigned strategy"""
     try:
         session = session_manager.get_session(session_id)
-        suggestions = session.get("suggestions", [])
+        suggestions = list(session.get("suggestions", []))
         
         # Find the suggestion for this listing
-        suggestion = next((s for s in suggestions if s.get("listingId") == listing_id), None)
-        if not suggestion:
+        index = next((i for i, s in enumerate(suggestions) if s.get("listingId") == listing_id), None)
+        if index is None:
             return
+        suggestion = suggestions[index] = dict(suggestions[index])
         
         # Get the original Discogs suggested price (we'll need to fetch this again)
         # For now, let's apply the strategy adjustments to the current suggested price
@@ -1472,12 +1426,12 @@ async def adjust_suggested_price(request: dict, session_id: str = None):
         raise HTTPException(status_code=400, detail="listingId and newSuggestedPrice are required")
     
     # Find the suggestion in the session and update it
-    suggestions = session.get("suggestions", [])
+    suggestions = list(session.get("suggestions", []))
     suggestion_found = False
     
-    for suggestion in suggestions:
+    for index, suggestion in enumerate(suggestions):
         if suggestion.get("listingId") == listing_id:
-            suggestion["suggestedPrice"] = new_suggested_price
+            suggestions[index] = {**suggestion, "suggestedPrice": new_suggested_price}
             suggestion_found = True
             break
     
@@ -1503,22 +1457,15 @@ async def apply_price_suggestion(listing_id: int, listing_data: dict, session_id
     
     try:
         # Initialize Discogs client
-        consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
-        consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
-        
-        client = DiscogsClient(
-            consumer_key=consumer_key,
-            consumer_secret=consumer_secret,
-            access_token=user.accessToken,
-            access_token_secret=user.accessTokenSecret
-        )
+        client = discogs_client_for(user)
         
         # Update the listing price
         logger.info(f"Attempting to update listing {listing_id} with price {new_price}")
         logger.info(f"User: {user.username}, Access Token: {user.accessToken[:10]}...")
         
         try:
-            status_code, result = client.update_listing_price(listing_id, new_price)
+            # Retries and token waits sleep; keep them off the event loop
+            status_code, result = await asyncio.to_thread(client.update_listing_price, listing_id, new_price)
             logger.info(f"Discogs API response: status={status_code}, result={result}")
         except Exception as update_error:
             logger.error(f"Exception during update_listing_price: {update_error}", exc_info=True)
@@ -1548,12 +1495,10 @@ async def apply_price_suggestion(listing_id: int, listing_data: dict, session_id
             raise HTTPException(status_code=500, detail=f"Discogs API error: {error_msg}")
         
         # Log the change
-        session = session_manager.get_session(session_id)
-        logs = session.get("logs", [])
+        session = session_manager.get_session(session_id) or {}
+        suggestion = next((s for s in session.get("suggestions", []) if s.get("listingId") == listing_id), {})
         
         log_entry = {
-            "id": f"apply_{listing_id}_{int(time.time())}",
-            "userId": user.id,
             "runDate": datetime.now().isoformat(),
             "status": "completed",
             "itemsScanned": 1,
@@ -1564,9 +1509,14 @@ async def apply_price_suggestion(listing_id: int, listing_data: dict, session_id
             "listingId": listing_id,
             "newPrice": new_price
         }
-        
-        logs.append(log_entry)
-        session_manager.update_session_data(session_id, "logs", logs)
+        await asyncio.to_thread(record_run_log, user, session_id, log_entry, [{
+            "listingId": listing_id,
+            "releaseId": suggestion.get("releaseId"),
+            "currentPrice": suggestion.get("currentPrice"),
+            "suggestedPrice": suggestion.get("suggestedPrice"),
+            "newPrice": new_price,
+            "decision": "applied"
+        }])
         
         return {"message": "Price updated successfully", "listing": result}
         
@@ -1574,82 +1524,128 @@ async def apply_price_suggestion(listing_id: int, listing_data: dict, session_id
         logger.error(f"Failed to apply price suggestion: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to update listing: {str(e)}")
 
-@app.post("/inventory/bulk-apply")
-async def bulk_apply_price_suggestions(request: dict, session_id: str = None):
-    """Apply price suggestions to multiple listings"""
-    user = require_auth(session_id)
-    require_discogs_auth(user)
-    
-    listing_ids = request.get("listingIds", [])
-    if not listing_ids:
-        raise HTTPException(status_code=400, detail="No listing IDs provided")
+def apply_price_changes(client: DiscogsClient, changes: Dict[int, float], currency: str = "USD",
+                        on_poll: Optional[Callable[[], Any]] = None,
+                        on_progress: Optional[Callable[[int], Any]] = None) -> tuple[List[Dict[str, Any]], str]:
+    """
+    Apply approved prices on Discogs (blocking, run on the batch executor)
+    
+    Args:
+        client: Authenticated DiscogsClient
+        changes: listing id -> new price
+        currency: The seller's currency
+        on_poll: Called while waiting on upload and export jobs
+        on_progress: Called with the number of listings handled so far
+        
+    Returns:
+        Tuple of (per-listing results, method used: "upload", "per_listing" or
+        "upload+per_listing" when some uploaded changes had to be applied one by one)
+    """
+    results = []
+    method = "per_listing"
+    
+    # Larger batches go out as inventory change uploads instead of a GET + POST per listing;
+    # only changes from failed chunks or without a confirmed price fall back to per-listing updates
+    if BULK_UPLOAD_MIN_LISTINGS and len(changes) >= BULK_UPLOAD_MIN_LISTINGS:
+        logger.info(f"Bulk apply: Uploading {len(changes)} price changes")
+        results, changes = apply_price_changes_by_upload(client, changes, currency, on_poll=on_poll)
+        if on_progress is not None:
+            on_progress(len(results))
+        if not changes:
+            return results, "upload"
+        method = "upload+per_listing" if results else "per_listing"
+        logger.warning(f"Bulk apply: {len(changes)} price changes were not applied by upload, updating them one by one")
+    
+    for listing_id, new_price in changes.items():
+        try:
+            # Update the listing on Discogs
+            logger.info(f"Bulk apply: Attempting to update listing {listing_id} with price {new_price}")
+            status_code, result = client.update_listing_price(listing_id, new_price)
+            
+            logger.info(f"Bulk apply: Discogs API response for listing {listing_id}: status={status_code}, result={result}")
+            
+            if status_code in [200, 201, 204]:
+                results.append({"listingId": listing_id, "success": True, "newPrice": new_price})
+            else:
+                error_msg = f"Discogs API returned {status_code}: {result}"
+                logger.error(f"Bulk apply failed for listing {listing_id}: {error_msg}")
+                results.append({"listingId": listing_id, "success": False, "error": error_msg})
+                
+        except Exception as e:
+            logger.error(f"Error applying price for listing {listing_id}: {e}")
+            results.append({"listingId": listing_id, "success": False, "error": str(e)})
+        if on_progress is not None:
+            on_progress(len(results))
     
+    return results, method
+
+def bulk_apply_account_key(user: User) -> str:
+    """Job registry key of an account's bulk apply (one at a time per account, like analysis)"""
+    return f"bulk_apply:{analysis_account_key(user)}"
+
+def run_bulk_apply(user: User, session_id: str, listing_ids: List[int], job: Job, state: Dict[str, Any]):
+    """
+    Apply suggested prices to listings as a background job (blocking, run on the batch executor)
+    
+    Progress goes to the job's registry row; the outcome is stored in the session under
+    "bulk_apply" for GET /inventory/bulk-apply/{job_id}. The session is written before the
+    lease is released, so a missing lease with a session still "running" means the worker died.
+    
+    Args:
+        user: Session user
+        session_id: Session the suggestions come from
+        listing_ids: Listings to apply
+        job: The bulk apply's job registry lease
+        state: The job's "running" state as stored in the session
+    """
     try:
-        # Initialize Discogs client
-        consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
-        consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
-        
-        client = DiscogsClient(
-            consumer_key=consumer_key,
-            consumer_secret=consumer_secret,
-            access_token=user.accessToken,
-            access_token_secret=user.accessTokenSecret
-        )
+        client = discogs_client_for(user, BATCH)
         
         results = []
-        successful_updates = 0
-        errors = 0
         
         # Get current suggestions from session
         session = session_manager.get_session(session_id)
         suggestions = session.get("suggestions", [])
+        suggestions_by_listing = {s.get("listingId"): s for s in suggestions}
         
+        # Resolve the approved price for each listing
+        changes = {}
         for listing_id in listing_ids:
-            try:
-                # Find the suggestion for this listing
-                suggestion = next((s for s in suggestions if s.get("listingId") == listing_id), None)
-                if not suggestion:
-                    results.append({"listingId": listing_id, "success": False, "error": "Suggestion not found"})
-                    errors += 1
-                    continue
-                
-                new_price = suggestion.get("suggestedPrice")
-                if not new_price:
-                    results.append({"listingId": listing_id, "success": False, "error": "No suggested price"})
-                    errors += 1
-                    continue
-                
-                # Update the listing on Discogs
-                logger.info(f"Bulk apply: Attempting to update listing {listing_id} with price {new_price}")
-                status_code, result = client.update_listing_price(listing_id, new_price)
-                
-                logger.info(f"Bulk apply: Discogs API response for listing {listing_id}: status={status_code}, result={result}")
-                
-                if status_code in [200, 201, 204]:
-                    results.append({"listingId": listing_id, "success": True, "newPrice": new_price})
-                    successful_updates += 1
-                    
-                    # Remove this suggestion from the session since it's been applied
-                    suggestions = [s for s in suggestions if s.get("listingId") != listing_id]
-                else:
-                    error_msg = f"Discogs API returned {status_code}: {result}"
-                    logger.error(f"Bulk apply failed for listing {listing_id}: {error_msg}")
-                    results.append({"listingId": listing_id, "success": False, "error": error_msg})
-                    errors += 1
-                    
-            except Exception as e:
-                logger.error(f"Error applying price for listing {listing_id}: {e}")
-                results.append({"listingId": listing_id, "success": False, "error": str(e)})
-                errors += 1
+            suggestion = suggestions_by_listing.get(listing_id)
+            if not suggestion:
+                results.append({"listingId": listing_id, "success": False, "error": "Suggestion not found"})
+                continue
+            
+            new_price = suggestion.get("suggestedPrice")
+            if not new_price:
+                results.append({"listingId": listing_id, "success": False, "error": "No suggested price"})
+                continue
+            
+            changes[listing_id] = new_price
+        
+        skipped = len(results)
+        job_registry.heartbeat(job, processed=skipped, total=len(listing_ids), force=True)
+        currency = seller_currency(session, [suggestions_by_listing[listing_id] for listing_id in changes])
+        change_results, method = apply_price_changes(
+            client, changes, currency,
+            on_poll=lambda: job_registry.heartbeat(job),
+            on_progress=lambda processed: job_registry.heartbeat(job, processed=skipped + processed)
+        )
+        results.extend(change_results)
+        
+        successful_updates = sum(1 for result in results if result["success"])
+        errors = len(results) - successful_updates
+        
+        # Remove applied suggestions from the session (re-read: it may have changed during the run)
+        applied = {result["listingId"] for result in results if result["success"]}
+        suggestions = (session_manager.get_session(session_id) or {}).get("suggestions", [])
+        suggestions = [s for s in suggestions if s.get("listingId") not in applied]
         
         # Update session with remaining suggestions
         session_manager.update_session_data(session_id, "suggestions", suggestions)
         
-        # Log the bulk operation
-        logs = session.get("logs", [])
+        # Log the bulk operation; per-listing results are stored as child rows of the run
         log_entry = {
-            "id": f"bulk_apply_{int(time.time())}",
-            "userId": user.id,
             "runDate": datetime.now().isoformat(),
             "status": "completed" if errors == 0 else "completed_with_errors",
             "itemsScanned": len(listing_ids),
@@ -1657,22 +1653,102 @@ async def bulk_apply_price_suggestions(request: dict, session_id: str = None):
             "errors": errors,
             "isDryRun": False,
             "action": "bulk_apply",
-            "results": results
+            "method": method
         }
+        items = []
+        for result in results:
+            suggestion = suggestions_by_listing.get(result["listingId"], {})
+            items.append({
+                **result,
+                "releaseId": suggestion.get("releaseId"),
+                "currentPrice": suggestion.get("currentPrice"),
+                "suggestedPrice": suggestion.get("suggestedPrice"),
+                "decision": "applied" if result["success"] else "failed"
+            })
+        record_run_log(user, session_id, log_entry, items)
         
-        logs.append(log_entry)
-        session_manager.update_session_data(session_id, "logs", logs)
-        
-        return {
-            "message": f"Bulk apply completed: {successful_updates} successful, {errors} errors",
-            "successful_updates": successful_updates,
-            "errors": errors,
-            "results": results
-        }
+        state = {**state, "status": "completed", "processed": len(results), "finishedAt": datetime.now().isoformat(),
+                 "result": {
+                     "message": f"Bulk apply completed: {successful_updates} successful, {errors} errors",
+                     "successful_updates": successful_updates,
+                     "errors": errors,
+                     "results": results
+                 }}
         
     except Exception as e:
         logger.error(f"Failed to bulk apply price suggestions: {e}")
+        state = {**state, "status": "failed", "processed": job.processed, "finishedAt": datetime.now().isoformat(),
+                 "error": f"Failed to apply price suggestions: {str(e)}"}
+    finally:
+        try:
+            session_manager.update_session_data(session_id, "bulk_apply", state, durable=True)
+        finally:
+            job_registry.release(job)
+
+@app.post("/inventory/bulk-apply", status_code=202)
+async def bulk_apply_price_suggestions(request: dict, session_id: str = None):
+    """
+    Start applying price suggestions to multiple listings
+    
+    The Discogs work (upload and export jobs can take many minutes) runs in the
+    background; poll GET /inventory/bulk-apply/{jobId} for progress and the result.
+    """
+    user = require_auth(session_id)
+    require_discogs_auth(user)
+    
+    listing_ids = request.get("listingIds", [])
+    if not listing_ids:
+        raise HTTPException(status_code=400, detail="No listing IDs provided")
+    
+    job = await asyncio.to_thread(job_registry.acquire, bulk_apply_account_key(user), session_id)
+    if job is None:
+        raise HTTPException(status_code=409, detail="A bulk apply is already running for this account")
+    
+    state = {
+        "jobId": job.job_id,
+        "status": "running",
+        "processed": 0,
+        "total": len(listing_ids),
+        "startedAt": datetime.now().isoformat()
+    }
+    try:
+        await asyncio.to_thread(session_manager.update_session_data, session_id, "bulk_apply", state, True)
+        # The Discogs calls run on the dedicated batch executor; the job releases its lease when it ends
+        batch_executor.submit("bulk_apply", run_bulk_apply, user, session_id, listing_ids, job, state)
+    except BatchCapacityError as e:
+        await asyncio.to_thread(job_registry.release, job)
+        raise batch_capacity_exception(e)
+    except Exception as e:
+        await asyncio.to_thread(job_registry.release, job)
+        logger.error(f"Failed to start bulk apply: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to apply price suggestions: {str(e)}")
+    
+    logger.info(f"Bulk apply {job.job_id} started for {len(listing_ids)} listings")
+    return state
+
+@app.get("/inventory/bulk-apply/{job_id}")
+async def get_bulk_apply_status(job_id: str, session_id: str = None):
+    """Progress of a bulk apply, and its result once it has finished"""
+    user = require_auth(session_id)
+    
+    state = (session_manager.get_session(session_id) or {}).get("bulk_apply")
+    if not state or state.get("jobId") != job_id:
+        raise HTTPException(status_code=404, detail="Bulk apply not found")
+    if state["status"] != "running":
+        return state
+    
+    active = await asyncio.to_thread(job_registry.get_active, bulk_apply_account_key(user))
+    if active is not None and active.job_id == job_id:
+        return {**state, "processed": active.processed, "total": active.total or state["total"]}
+    
+    # The lease is gone: the job either just finished (on another worker) or died with its worker
+    session = await asyncio.to_thread(session_manager.reload_session, session_id)
+    state = (session or {}).get("bulk_apply")
+    if not state or state.get("jobId") != job_id:
+        raise HTTPException(status_code=404, detail="Bulk apply not found")
+    if state["status"] == "running":
+        return {**state, "status": "failed", "error": "Bulk apply stopped before it finished"}
+    return state
 
 @app.post("/inventory/decline/{listing_id}")
 async def decline_price_suggestion(listing_id: int, session_id: str = None):
@@ -1681,12 +1757,10 @@ async def decline_price_suggestion(listing_id: int, session_id: str = None):
     
     try:
         # Log the decline
-        session = session_manager.get_session(session_id)
-        logs = session.get("logs", [])
+        session = session_manager.get_session(session_id) or {}
+        suggestion = next((s for s in session.get("suggestions", []) if s.get("listingId") == listing_id), {})
         
         log_entry = {
-            "id": f"decline_{listing_id}_{int(time.time())}",
-            "userId": user.id,
             "runDate": datetime.now().isoformat(),
             "status": "completed",
             "itemsScanned": 1,
@@ -1696,9 +1770,13 @@ async def decline_price_suggestion(listing_id: int, session_id: str = None):
             "action": "decline",
             "listingId": listing_id
         }
-        
-        logs.append(log_entry)
-        session_manager.update_session_data(session_id, "logs", logs)
+        await asyncio.to_thread(record_run_log, user, session_id, log_entry, [{
+            "listingId": listing_id,
+            "releaseId": suggestion.get("releaseId"),
+            "currentPrice": suggestion.get("currentPrice"),
+            "suggestedPrice": suggestion.get("suggestedPrice"),
+            "decision": "declined"
+        }])
         
         return {"message": "Price suggestion declined"}
         
@@ -1715,19 +1793,11 @@ async def get_user_profile(session_id: str = None):
     
     try:
         # Initialize Discogs client
-        consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
-        consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
-        
-        client = DiscogsClient(
-            consumer_key=consumer_key,
-            consumer_secret=consumer_secret,
-            access_token=user.accessToken,
-            access_token_secret=user.accessTokenSecret
-        )
+        client = discogs_client_for(user)
         
         # Get user profile from Discogs
         logger.info(f"Fetching profile for user: {user.username}")
-        profile = client.get_user_info()
+        profile = await asyncio.to_thread(client.get_user_info)
         logger.info(f"Received profile data: {profile}")
         logger.info(f"Available profile fields: {list(profile.keys()) if isinstance(profile, dict) else 'Not a dict'}")
         
@@ -1761,26 +1831,17 @@ async def refresh_avatar(session_id: str = None):
     
     try:
         # Initialize Discogs client
-        consumer_key = os.getenv("DISCOGS_CONSUMER_KEY")
-        consumer_secret = os.getenv("DISCOGS_CONSUMER_SECRET")
-        
-        client = DiscogsClient(
-            consumer_key=consumer_key,
-            consumer_secret=consumer_secret,
-            access_token=user.accessToken,
-            access_token_secret=user.accessTokenSecret
-        )
+        client = discogs_client_for(user)
         
         # Get user profile from Discogs (includes avatar_url)
         logger.info(f"Refreshing avatar for user: {user.username}")
-        profile = client.get_user_info()
+        profile = await asyncio.to_thread(client.get_user_info)
         avatar_url = profile.get("avatar_url")
         
         if avatar_url:
             # Update session with avatar
             session = session_manager.get_session(session_id)
-            user_data = session["user"]
-            user_data["avatar"] = avatar_url
+            user_data = {**session["user"], "avatar": avatar_url}
             session_manager.update_session_data(session_id, "user", user_data)
             
             logger.info(f"Avatar updated for user {user.username}: {avatar_url}")
@@ -1800,11 +1861,54 @@ async def refresh_avatar(session_id: str = None):
         raise HTTPException(status_code=500, detail=f"Failed to refresh avatar: {str(e)}")
 
 @app.get("/logs")
-async def get_logs(session_id: str = None):
-    """Get run logs"""
+async def get_logs(session_id: str = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Get run logs, newest first, one page at a time (pass nextCursor back as cursor for the next page)"""
     user = require_auth(session_id)
-    session = session_manager.get_session(session_id)
-    return session["logs"]
+    await asyncio.to_thread(import_session_logs, user, session_id)
+    try:
+        return await asyncio.to_thread(run_log_store.list_runs, user, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/logs/{run_id}/items")
+async def get_log_items(run_id: int, session_id: str = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Get the per-listing results of one run, one page at a time"""
+    user = require_auth(session_id)
+    try:
+        page = await asyncio.to_thread(run_log_store.list_items, user, run_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return page
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics for this worker process"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/discogs")
+async def get_discogs_stats():
+    """In-process Discogs request stats (latency, retries, token waits, scheduler occupancy, batch runs, client pool)"""
+    return {
+        "metrics": REGISTRY.snapshot("discogs_"),
+        "scheduler": discogs_scheduler.stats(),
+        "circuits": circuit_states(),
+        "batch": batch_executor.stats(),
+        "clients": discogs_client_pool.stats(),
+        "sessions": session_manager.stats()
+    }
+
+@app.on_event("startup")
+def start_run_log_sweeper():
+    """Delete run logs past each user's retention in the background"""
+    run_log_store.start_sweeper()
+
+@app.on_event("shutdown")
+def flush_sessions_on_shutdown():
+    """Write sessions still waiting for a deferred flush before the worker exits"""
+    run_log_store.stop_sweeper()
+    session_manager.close()
 
 if __name__ == "__main__":
     import uvicorn
@@ -16,11 +16,12 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./waxvalue.db")
 
 # Create engine
 if DATABASE_URL.startswith("sqlite"):
-    # SQLite specific configuration
+    # SQLite specific configuration; a single shared connection only for in-memory databases,
+    # file databases get a connection per thread (run logs are written from worker threads)
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
+        poolclass=StaticPool if ":memory:" in DATABASE_URL else None,
         echo=False  # Set to True for SQL query logging
     )
 else:
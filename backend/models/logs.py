@@ -2,7 +2,7 @@
 Logging and audit models for WaxValue
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -10,12 +10,14 @@ from .database import Base
 class RunLog(Base):
     """Log of pricing simulation runs"""
     __tablename__ = "run_logs"
+    # Cursor-paginated history reads: WHERE user_id = ? AND id < ? ORDER BY id DESC
+    __table_args__ = (Index("ix_run_logs_user_id_id", "user_id", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     # Run metadata
-    run_date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    run_date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
     is_dry_run = Column(Boolean, default=True, nullable=False)
     
     # Run statistics
@@ -25,7 +27,7 @@ class RunLog(Base):
     errors = Column(Integer, default=0, nullable=False)
     
     # Run status
-    status = Column(String(20), default="completed", nullable=False)  # completed, failed, partial
+    status = Column(String(30), default="completed", nullable=False)  # completed, completed_with_errors, failed, partial
     error_message = Column(Text, nullable=True)
     
     # Strategy used
@@ -49,6 +51,7 @@ class RunLog(Base):
 class ListingSnapshot(Base):
     """Snapshot of individual listing changes during a run"""
     __tablename__ = "listing_snapshots"
+    __table_args__ = (Index("ix_listing_snapshots_run_log_id_id", "run_log_id", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     run_log_id = Column(Integer, ForeignKey("run_logs.id"), nullable=False, index=True)
@@ -59,13 +62,13 @@ class ListingSnapshot(Base):
     release_id = Column(Integer, nullable=True)  # Discogs release ID
     
     # Price information
-    before_price = Column(Integer, nullable=False)  # Price in cents
+    before_price = Column(Integer, nullable=True)  # Price in cents (if known)
     after_price = Column(Integer, nullable=True)  # Price in cents (if applied)
-    suggested_price = Column(Integer, nullable=False)  # Price in cents
+    suggested_price = Column(Integer, nullable=True)  # Price in cents (if known)
     
     # Decision and reasoning
-    decision = Column(String(20), nullable=False)  # applied, declined, skipped, flagged
-    confidence = Column(String(10), nullable=False)  # high, medium, low
+    decision = Column(String(20), nullable=False)  # applied, failed, declined, skipped, flagged
+    confidence = Column(String(10), nullable=True)  # high, medium, low
     reasoning = Column(Text, nullable=True)
     
     # Market data (stored as JSON)
@@ -2,7 +2,7 @@
 User and authentication models for WaxValue
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -45,7 +45,7 @@ class UserSettings(Base):
     __tablename__ = "user_settings"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     # Currency and localization
     currency = Column(String(3), default="USD", nullable=False)
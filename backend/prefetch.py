@@ -0,0 +1,240 @@
+"""
+Price-suggestion prefetch stage for inventory analysis
+
+Analysis used to fetch price suggestions lazily inside the per-listing loop, so
+every network wait stalled pricing and progress events. Instead:
+- listings are grouped by release, and each release is fetched once (an LRU
+  cache covers duplicates that turn up on later inventory pages)
+- releases are fetched in a configurable priority order (ANALYSIS_ORDERS): by
+  default the releases that price the most listings go first, so the first API
+  tokens spent unlock the most listings
+- a small thread pool keeps several fetches in flight; the client's token
+  bucket and fair scheduler still decide how fast they actually go out
+- release groups are pulled from inventory pages as they download, a bounded
+  window ahead of pricing, so the first suggestions do not wait for the last page;
+  orders Discogs can sort by (price, listing date) are requested sorted, so the
+  priority holds across pages (see inventory_sort). "duplicated" can only count a
+  release's listings once every page is in, so it reads the whole inventory first
+- results are handed to the compute stage as they land, not in request order
+"""
+
+import os
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_PREFETCH_WORKERS = int(os.getenv("ANALYSIS_PREFETCH_WORKERS", "4"))
+# Releases submitted ahead of pricing; bounds how far inventory reading runs ahead
+ANALYSIS_PREFETCH_WINDOW = int(os.getenv("ANALYSIS_PREFETCH_WINDOW", "32"))
+# Releases whose suggestions are kept for duplicates on later pages
+ANALYSIS_PRICE_CACHE_SIZE = int(os.getenv("ANALYSIS_PRICE_CACHE_SIZE", "2000"))
+
+# Analysis orderings:
+# - duplicated: releases with the most listings first (most listings priced per API call)
+# - price_desc: highest current price first (most money at stake)
+# - stale: oldest listings first (longest since they were priced)
+# - recent: newest listings first
+ANALYSIS_ORDERS = ("duplicated", "price_desc", "stale", "recent")
+ANALYSIS_ORDER = os.getenv("ANALYSIS_ORDER", "duplicated")
+
+ReleaseGroup = Tuple[Any, List[Dict[str, Any]]]
+
+def _listing_price(listing: Dict[str, Any]) -> float:
+    price = listing.get("price", {})
+    try:
+        return float(price.get("value", 0) if isinstance(price, dict) else price or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _listing_posted(listing: Dict[str, Any]) -> float:
+    """Timestamp the listing was posted (0 if missing or unparseable)"""
+    try:
+        return datetime.fromisoformat(listing["posted"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+# order -> (sort key for a listing, descending); a release group ranks by its best listing
+_ORDER_KEYS = {
+    "price_desc": (_listing_price, True),
+    "stale": (_listing_posted, False),
+    "recent": (_listing_posted, True)
+}
+
+# order -> (sort, sort_order) for the inventory endpoint, which sorts across all pages
+_INVENTORY_SORTS = {
+    "price_desc": ("price", "desc"),
+    "stale": ("listed", "asc"),
+    "recent": ("listed", "desc")
+}
+
+def inventory_sort(order: str) -> Dict[str, str]:
+    """
+    Inventory request parameters that make Discogs return pages in `order`
+
+    Returns:
+        {"sort", "sort_order"} for get_user_inventory, or {} for "duplicated",
+        which needs release counts over the whole inventory and has no server-side sort
+    """
+    sort = _INVENTORY_SORTS.get(order)
+    return {"sort": sort[0], "sort_order": sort[1]} if sort else {}
+
+def resolve_order(order: Optional[str]) -> str:
+    """Validate an analysis order, falling back to ANALYSIS_ORDER"""
+    if order in ANALYSIS_ORDERS:
+        return order
+    if order:
+        logger.warning(f"Unknown analysis order '{order}', using {ANALYSIS_ORDER}")
+    return ANALYSIS_ORDER if ANALYSIS_ORDER in ANALYSIS_ORDERS else "duplicated"
+
+def group_listings_by_release(listings: List[Dict[str, Any]], order: str = "duplicated") -> List[ReleaseGroup]:
+    """
+    Group listings by release id in analysis priority order
+
+    Args:
+        listings: For-sale inventory listings
+        order: One of ANALYSIS_ORDERS
+
+    Returns:
+        (release_id, listings) pairs, highest priority first. Ties keep inventory order.
+    """
+    groups: "OrderedDict[Any, List[Dict[str, Any]]]" = OrderedDict()
+    for listing in listings:
+        groups.setdefault(listing["release"]["id"], []).append(listing)
+
+    if order not in _ORDER_KEYS:
+        return sorted(groups.items(), key=lambda group: len(group[1]), reverse=True)
+
+    key, descending = _ORDER_KEYS[order]
+    ranked = []
+    for release_id, release_listings in groups.items():
+        release_listings.sort(key=key, reverse=descending)
+        ranked.append((key(release_listings[0]), release_id, release_listings))
+    ranked.sort(key=lambda item: item[0], reverse=descending)
+    return [(release_id, release_listings) for _, release_id, release_listings in ranked]
+
+def iter_release_groups(pages: Iterable[List[Dict[str, Any]]], order: str = "duplicated") -> Iterator[ReleaseGroup]:
+    """
+    Group inventory pages by release in analysis priority order
+
+    Orders Discogs can sort by (inventory_sort) rank each page once it has been
+    fetched, without waiting for the rest of the inventory; the pages come
+    sorted, so the order holds across them. Inventory exports cannot be sorted,
+    so there these orders only rank within each page.
+
+    "duplicated" ranks releases by their listing count over the whole inventory,
+    so every page is read and the release index built before the first group is
+    yielded (and so before any price fetch is scheduled).
+    """
+    if order in _INVENTORY_SORTS:
+        for page in pages:
+            yield from group_listings_by_release(page, order)
+        return
+    yield from group_listings_by_release([listing for page in pages for listing in page], order)
+
+class PriceSuggestionPrefetcher:
+    """
+    Fetches price suggestions for release groups concurrently
+
+    Release groups are pulled from their source lazily, keeping at most
+    `window` releases in flight, so the source (e.g. inventory pages still
+    downloading) is only read as fast as pricing keeps up. Suggestions are
+    remembered in a bounded LRU cache so a release seen again on a later
+    page is not fetched twice.
+
+    Use as a context manager so pending fetches are cancelled when the consumer
+    stops early (client disconnect, lost job lease, error).
+    """
+
+    def __init__(self, client, release_groups: Iterable[ReleaseGroup],
+                 workers: int = ANALYSIS_PREFETCH_WORKERS, window: int = ANALYSIS_PREFETCH_WINDOW,
+                 cache_size: int = ANALYSIS_PRICE_CACHE_SIZE):
+        """
+        Args:
+            client: DiscogsClient used for the fetches (shared by the worker threads)
+            release_groups: (release_id, listings) pairs in fetch order, e.g. from
+                            group_listings_by_release or iter_release_groups
+            workers: Fetches kept running at once
+            window: Releases submitted ahead of the consumer (at least `workers`)
+            cache_size: Releases whose suggestions are remembered for later pages
+        """
+        self.client = client
+        self.release_groups = release_groups
+        self.workers = max(1, workers)
+        self.window = max(self.workers, window)
+        self.cache_size = max(0, cache_size)
+        self.cache: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self.fetches = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self) -> "PriceSuggestionPrefetcher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Cancel fetches that have not started; running ones finish in the background"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _remember(self, release_id: Any, price_suggestions: Dict[str, Any]):
+        if self.cache_size:
+            self.cache[release_id] = price_suggestions
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def results(self) -> Iterator[Tuple[Any, List[Dict[str, Any]], Optional[Dict[str, Any]], bool]]:
+        """
+        Yield (release_id, listings, price_suggestions, from_cache) as data becomes available
+
+        price_suggestions is None when the fetch failed (the error is logged).
+        from_cache is True when the group needed no fetch of its own (the release
+        was cached or already in flight for an earlier group).
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+        source = iter(self.release_groups)
+        in_flight: Dict[Future, Any] = {}
+        # release_id -> [listings that fetched it, listings that joined while it was in flight]
+        waiting: Dict[Any, List[List[Dict[str, Any]]]] = {}
+        exhausted = False
+
+        while True:
+            # Top up the window; the executor's queue is FIFO, so submission order is fetch priority
+            while not exhausted and len(in_flight) < self.window:
+                try:
+                    release_id, listings = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if release_id in self.cache:
+                    self.cache.move_to_end(release_id)
+                    yield release_id, listings, self.cache[release_id], True
+                elif release_id in waiting:
+                    waiting[release_id][1].extend(listings)
+                else:
+                    future = self._executor.submit(self.client.get_price_suggestions, release_id)
+                    self.fetches += 1
+                    in_flight[future] = release_id
+                    waiting[release_id] = [listings, []]
+
+            if not in_flight:
+                return
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                release_id = in_flight.pop(future)
+                listings, joined = waiting.pop(release_id)
+                try:
+                    price_suggestions = future.result()
+                    self._remember(release_id, price_suggestions)
+                except Exception as e:
+                    logger.error(f"Error fetching price suggestions for release {release_id}: {e}")
+                    price_suggestions = None
+                yield release_id, listings, price_suggestions, False
+                if joined:
+                    yield release_id, joined, price_suggestions, True
@@ -0,0 +1,160 @@
+"""
+Per-listing pricing logic for WaxValue
+
+Turns one inventory listing plus Discogs' price suggestions for its release into
+the fields of a PriceSuggestion: condition matching, status classification,
+display formatting and currency validation. Shared by the streaming and the
+non-streaming analysis endpoints and by the benchmarks.
+"""
+
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Listing condition -> terms used to find the matching price suggestion
+CONDITION_MAPPINGS = {
+    "MINT (M)": ["M", "Mint"],
+    "NEAR MINT (NM OR M-)": ["NM", "Near Mint"],
+    "VERY GOOD PLUS (VG+)": ["VG+", "Very Good Plus"],
+    "VERY GOOD (VG)": ["VG", "Very Good"],
+    "GOOD PLUS (G+)": ["G+", "Good Plus"],
+    "GOOD (G)": ["G", "Good"],
+    "FAIR (F)": ["F", "Fair"],
+    "POOR (P)": ["P", "Poor"]
+}
+
+CONDITION_SHORT_CODES = {
+    'Mint (M)': 'M',
+    'Near Mint (NM or M-)': 'NM',
+    'Very Good Plus (VG+)': 'VG+',
+    'Very Good (VG)': 'VG',
+    'Good Plus (G+)': 'G+',
+    'Good (G)': 'G',
+    'Fair (F)': 'F',
+    'Poor (P)': 'P'
+}
+
+SUPPORTED_CURRENCIES = ["USD", "GBP", "EUR", "CAD", "AUD", "JPY", "CHF", "MXN", "BRL", "NZD", "SEK", "ZAR"]
+
+def listing_price(listing: Dict[str, Any]) -> float:
+    """Current price of a listing (Discogs returns a dict with a 'value' field)"""
+    price_data = listing.get("price", {})
+    if isinstance(price_data, dict):
+        return float(price_data.get("value", 0))
+    return float(price_data or 0)
+
+def match_condition_price(price_suggestions: Dict[str, Any],
+                          listing_condition: str) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Find the suggested price for a listing's condition
+
+    Args:
+        price_suggestions: Discogs price suggestions keyed by condition
+        listing_condition: The listing's media condition
+
+    Returns:
+        Tuple of (suggested_price, condition_used), or (None, None) if no suggestion has a value
+    """
+    listing_condition = listing_condition.upper()
+    suggested_price = None
+    condition_used = None
+
+    # Try to find matching condition
+    for condition_key, search_terms in CONDITION_MAPPINGS.items():
+        if any(term in listing_condition for term in search_terms):
+            # Look for this condition in price suggestions
+            for condition, price_data in price_suggestions.items():
+                if any(term in condition.upper() for term in search_terms):
+                    if isinstance(price_data, dict) and "value" in price_data:
+                        suggested_price = float(price_data["value"])
+                        condition_used = condition
+                        break
+            break
+
+    # If no specific condition match, try to use any available suggestion
+    if suggested_price is None:
+        for condition, price_data in price_suggestions.items():
+            if isinstance(price_data, dict) and "value" in price_data:
+                suggested_price = float(price_data["value"])
+                condition_used = condition
+                break
+
+    return suggested_price, condition_used
+
+def classify_status(suggested_price: float, current_price: float) -> str:
+    """Compare the suggested price with the current one (10% tolerance band)"""
+    if suggested_price > current_price * 1.1:
+        return "underpriced"
+    if suggested_price < current_price * 0.9:
+        return "overpriced"
+    return "fairly_priced"
+
+def condition_short_code(condition: str) -> str:
+    """Convert a full condition name to its short code (e.g. VG+)"""
+    return CONDITION_SHORT_CODES.get(condition, condition)
+
+def listing_currency(listing: Dict[str, Any]) -> str:
+    """Listing currency, falling back to USD when Discogs doesn't support it"""
+    # Discogs (and slim listings) carry the currency on the price
+    price = listing.get("price")
+    raw_currency = (price.get("currency") if isinstance(price, dict) else None) or listing.get("currency", "USD")
+    if raw_currency in SUPPORTED_CURRENCIES:
+        return raw_currency
+    logger.warning(f"Unsupported currency '{raw_currency}' for listing {listing.get('id')}, defaulting to USD")
+    return "USD"
+
+def release_image_url(release_info: Dict[str, Any]) -> str:
+    """Primary image (150px if available), else the thumbnail"""
+    images = release_info.get("images", [])
+    primary_image = next((img for img in images if img.get("type") == "primary"), None)
+    if primary_image:
+        return primary_image.get("uri150", primary_image.get("uri", ""))
+    return release_info.get("thumbnail", "")
+
+def build_suggestion(listing: Dict[str, Any], price_suggestions: Any,
+                     strategy: str = "Conservative") -> Optional[Dict[str, Any]]:
+    """
+    Build the PriceSuggestion fields for one listing
+
+    Args:
+        listing: Inventory listing from Discogs
+        price_suggestions: Discogs price suggestions for the listing's release
+        strategy: Strategy name recorded on the suggestion
+
+    Returns:
+        Dict of PriceSuggestion fields, or None if there is no usable suggestion
+    """
+    if not price_suggestions or not isinstance(price_suggestions, dict):
+        return None
+
+    suggested_price, condition_used = match_condition_price(price_suggestions, listing.get("condition", ""))
+    if suggested_price is None:
+        return None
+
+    current_price = listing_price(listing)
+    release_info = listing.get("release", {})
+
+    # Format condition properly (Media: VG+, Sleeve: G)
+    media_short = condition_short_code(listing.get("condition", "Not Graded"))
+    sleeve_short = condition_short_code(listing.get("sleeve_condition", "Not Graded"))
+
+    # Simplify basis (just the condition abbreviation)
+    basis_simple = condition_used.split("(")[-1].replace(")", "").strip() if "(" in condition_used else condition_used
+
+    return {
+        "listingId": listing["id"],
+        "releaseId": release_info.get("id"),
+        "currentPrice": current_price,
+        "suggestedPrice": round(suggested_price, 2),
+        "originalSuggestedPrice": round(suggested_price, 2),  # Store original for strategy calculations
+        "currency": listing_currency(listing),
+        "basis": basis_simple,
+        "status": classify_status(suggested_price, current_price),
+        "strategy": strategy,
+        "condition": f"Media: {media_short}, Sleeve: {sleeve_short}",
+        "artist": release_info.get("artist", "Unknown Artist"),
+        "title": release_info.get("title", "Unknown Title"),
+        "label": release_info.get("label", "Unknown Label"),
+        "imageUrl": release_image_url(release_info)
+    }
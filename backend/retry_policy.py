@@ -0,0 +1,235 @@
+"""
+Retry policy for Discogs API calls
+
+One policy object decides, for every client method, whether and when a failed
+request is retried:
+- 429, 500, 502, 503 and 504 responses and connection errors/timeouts are retried
+- delays use exponential backoff with full jitter, and honour Retry-After
+- every call has a deadline; a retry that cannot finish before it is not attempted
+- a per-account retry budget caps retries to a fraction of normal traffic, so an
+  outage does not multiply the load on Discogs
+- no single sleep is longer than max_delay or than the call's remaining
+  deadline: a longer Retry-After is waited out in capped steps while the
+  deadline leaves time for another attempt
+
+run() is for synchronous callers (analysis and bulk apply threads), run_async()
+awaits between attempts so async endpoints never block the event loop.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DISCOGS_RETRY_MAX_ATTEMPTS = int(os.getenv("DISCOGS_RETRY_MAX_ATTEMPTS", "4"))
+DISCOGS_RETRY_BASE_DELAY = float(os.getenv("DISCOGS_RETRY_BASE_DELAY", "0.5"))
+DISCOGS_RETRY_MAX_DELAY = float(os.getenv("DISCOGS_RETRY_MAX_DELAY", "30"))
+DISCOGS_INTERACTIVE_DEADLINE = float(os.getenv("DISCOGS_INTERACTIVE_DEADLINE", "20"))
+DISCOGS_BATCH_DEADLINE = float(os.getenv("DISCOGS_BATCH_DEADLINE", "120"))
+DISCOGS_RETRY_BUDGET_RATIO = float(os.getenv("DISCOGS_RETRY_BUDGET_RATIO", "0.2"))
+DISCOGS_RETRY_BUDGET_MIN = float(os.getenv("DISCOGS_RETRY_BUDGET_MIN", "10"))
+# Time a retried attempt needs at least; no retry is planned that would leave less
+DISCOGS_RETRY_MIN_ATTEMPT_SECONDS = float(os.getenv("DISCOGS_RETRY_MIN_ATTEMPT_SECONDS", "1"))
+
+RETRYABLE_STATUS = {429: "429", 500: "5xx", 502: "5xx", 503: "5xx", 504: "5xx"}
+
+# Errors where the request may or may not have reached Discogs
+RETRYABLE_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+class RetryBudget:
+    """
+    Limits retries to a fraction of first attempts
+
+    Every call deposits `ratio` tokens and every retry withdraws one. The
+    balance never drops below zero and never grows above `minimum + ratio * 100`,
+    so a quiet account keeps a small allowance for occasional retries.
+    """
+
+    def __init__(self, ratio: float = DISCOGS_RETRY_BUDGET_RATIO, minimum: float = DISCOGS_RETRY_BUDGET_MIN):
+        self.ratio = ratio
+        self.cap = minimum + ratio * 100
+        self.balance = minimum
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.balance = min(self.cap, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+_retry_budgets: Dict[str, RetryBudget] = {}
+_retry_budgets_lock = threading.Lock()
+
+def get_retry_budget(key: str) -> RetryBudget:
+    """Get the shared retry budget for a Discogs account (keyed like the rate limiters)"""
+    with _retry_budgets_lock:
+        budget = _retry_budgets.get(key)
+        if budget is None:
+            budget = _retry_budgets[key] = RetryBudget()
+        return budget
+
+def parse_retry_after(response) -> Optional[float]:
+    """Retry-After in seconds, if the response carries a numeric one"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """
+    Bounded retry policy with jittered exponential backoff and a per-call deadline
+    """
+
+    def __init__(self, max_attempts: int = DISCOGS_RETRY_MAX_ATTEMPTS,
+                 base_delay: float = DISCOGS_RETRY_BASE_DELAY,
+                 max_delay: float = DISCOGS_RETRY_MAX_DELAY,
+                 deadline: float = DISCOGS_INTERACTIVE_DEADLINE,
+                 min_attempt_seconds: float = DISCOGS_RETRY_MIN_ATTEMPT_SECONDS):
+        """
+        Args:
+            max_attempts: Total attempts per call, including the first
+            base_delay: Backoff before the first retry (doubles each retry, before jitter)
+            max_delay: Longest single sleep; a longer Retry-After is slept in steps of this
+            deadline: Seconds a call may take in total, including sleeps
+            min_attempt_seconds: Deadline a retried attempt must still have after its sleep
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.min_attempt_seconds = min_attempt_seconds
+
+    def retry_reason(self, response=None, error: Optional[BaseException] = None,
+                     idempotent: bool = True) -> Optional[str]:
+        """
+        Classify a failed attempt
+
+        Non-idempotent requests are only retried when Discogs certainly did not
+        act on them (429, or a connection that was never established).
+
+        Returns:
+            Metric label for the retry reason, or None if the result is final
+        """
+        if error is not None:
+            if isinstance(error, requests.exceptions.ConnectTimeout):
+                return "connect"
+            if isinstance(error, RETRYABLE_EXCEPTIONS) and idempotent:
+                return "timeout" if isinstance(error, requests.exceptions.Timeout) else "connection"
+            return None
+        reason = RETRYABLE_STATUS.get(response.status_code)
+        if reason is not None and not idempotent and reason != "429":
+            return None
+        return reason
+
+    def backoff(self, retry: int, response=None) -> float:
+        """Delay before retry number `retry` (0-based): full jitter, at least Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+        retry_after = parse_retry_after(response)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _next_delay(self, retry: int, response, deadline_at: float) -> Optional[float]:
+        """Delay before the next attempt, or None if the call should give up"""
+        if retry + 1 >= self.max_attempts:
+            return None
+        # A long Retry-After (Discogs often sends 60s) is capped, not a reason to give up;
+        # the next attempt is throttled again if the window has not reopened yet
+        latest = deadline_at - time.monotonic() - self.min_attempt_seconds
+        delay = min(self.backoff(retry, response), self.max_delay, latest)
+        if delay < 0:
+            return None
+        return delay
+
+    def run(self, attempt: Callable[[float], Any], idempotent: bool = True,
+            budget: Optional[RetryBudget] = None, deadline: Optional[float] = None,
+            on_retry: Optional[Callable[[str, float], None]] = None):
+        """
+        Call `attempt(remaining_seconds)` until it succeeds or the policy gives up
+
+        Args:
+            attempt: Sends one request and returns the response
+            idempotent: Whether the request may be repeated safely
+            budget: Retry budget to draw from (no limit if None)
+            deadline: Overrides the policy's per-call deadline
+            on_retry: Called with (reason, delay) before each sleep
+
+        Returns:
+            The last response; retryable statuses are returned once retries run out
+
+        Raises:
+            The last connection error if retries run out
+        """
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        if budget is not None:
+            budget.deposit()
+        retry = 0
+        while True:
+            response, error = None, None
+            try:
+                response = attempt(max(0.0, deadline_at - time.monotonic()))
+            except RETRYABLE_EXCEPTIONS as e:
+                error = e
+            delay = self._plan(retry, response, error, idempotent, budget, deadline_at, on_retry)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+            retry += 1
+
+    async def run_async(self, attempt: Callable[[float], Awaitable[Any]], idempotent: bool = True,
+                        budget: Optional[RetryBudget] = None, deadline: Optional[float] = None,
+                        on_retry: Optional[Callable[[str, float], None]] = None):
+        """Async variant of run(): `attempt` is awaited and backoff uses asyncio.sleep"""
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        if budget is not None:
+            budget.deposit()
+        retry = 0
+        while True:
+            response, error = None, None
+            try:
+                response = await attempt(max(0.0, deadline_at - time.monotonic()))
+            except RETRYABLE_EXCEPTIONS as e:
+                error = e
+            delay = self._plan(retry, response, error, idempotent, budget, deadline_at, on_retry)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            await asyncio.sleep(delay)
+            retry += 1
+
+    def _plan(self, retry: int, response, error, idempotent: bool, budget: Optional[RetryBudget],
+              deadline_at: float, on_retry) -> Optional[float]:
+        """Decide whether to retry an attempt's result; returns the sleep or None"""
+        reason = self.retry_reason(response, error, idempotent)
+        if reason is None:
+            return None
+        delay = self._next_delay(retry, response, deadline_at)
+        if delay is None:
+            logger.warning(f"Giving up after {retry + 1} attempt(s) ({reason})")
+            return None
+        if budget is not None and not budget.withdraw():
+            logger.warning(f"Retry budget exhausted, not retrying ({reason})")
+            return None
+        if on_retry is not None:
+            on_retry(reason, delay)
+        return delay
+
+# Default policies per scheduler lane
+INTERACTIVE_RETRY_POLICY = RetryPolicy(deadline=DISCOGS_INTERACTIVE_DEADLINE)
+BATCH_RETRY_POLICY = RetryPolicy(deadline=DISCOGS_BATCH_DEADLINE)
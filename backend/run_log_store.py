@@ -0,0 +1,403 @@
+"""
+Run log storage for WaxValue
+
+Apply, decline and analysis runs used to be appended to the session's `logs`
+list, rewriting the session on every entry and embedding bulk-apply results
+in it. They are now rows in the RunLog / ListingSnapshot tables:
+- one RunLog row per run; fields without a column (action, listing id, ...)
+  are kept in run_config
+- one ListingSnapshot child row per listing a run touched (bulk-apply results)
+- history is read newest first with cursor pagination on the (user_id, id)
+  index, so a page costs the same however long the history is
+- a background sweeper deletes runs older than each user's
+  UserSettings.log_retention_days, RUN_LOG_SWEEP_BATCH runs per transaction
+
+Session users are matched to `users` rows (created on their first run) by
+Discogs user id, else by email, else by session user id - never by username.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from models import SessionLocal, create_tables
+from models.user import User, UserSettings
+from models.logs import RunLog, ListingSnapshot
+
+logger = logging.getLogger(__name__)
+
+RUN_LOG_PAGE_SIZE = int(os.getenv("RUN_LOG_PAGE_SIZE", "50"))
+RUN_LOG_MAX_PAGE_SIZE = int(os.getenv("RUN_LOG_MAX_PAGE_SIZE", "500"))
+RUN_LOG_SWEEP_SECONDS = float(os.getenv("RUN_LOG_SWEEP_SECONDS", "3600"))
+RUN_LOG_SWEEP_BATCH = int(os.getenv("RUN_LOG_SWEEP_BATCH", "500"))
+# Retention for users without a settings row (matches the UserSettings column default)
+DEFAULT_LOG_RETENTION_DAYS = 90
+
+# Log entry fields stored in run_config rather than in their own column
+RUN_CONFIG_FIELDS = ("action", "listingId", "newPrice", "method", "suggestionsFound", "totalListings")
+
+def _cents(price: Any) -> Optional[int]:
+    try:
+        return int(round(float(price) * 100))
+    except (TypeError, ValueError):
+        return None
+
+def _price(cents: Optional[int]) -> Optional[float]:
+    return cents / 100 if cents is not None else None
+
+def _run_date(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.now()
+
+def _limit(limit: Optional[int]) -> int:
+    return max(1, min(limit or RUN_LOG_PAGE_SIZE, RUN_LOG_MAX_PAGE_SIZE))
+
+def _cursor(cursor: Optional[str]) -> Optional[int]:
+    try:
+        return int(cursor) if cursor else None
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+class RunLogStore:
+    """
+    RunLog / ListingSnapshot persistence for the session-based API
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        # Owner identity (see _identity) -> users.id
+        self._user_ids: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self._tables_lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._tables_ready = False
+
+    def _db(self):
+        if not self._tables_ready:
+            # Calls arrive on worker threads; two concurrent create_all runs would both try to create the tables
+            with self._tables_lock:
+                if not self._tables_ready:
+                    create_tables()
+                    self._tables_ready = True
+        return self.session_factory()
+
+    @staticmethod
+    def _identity(user: Any) -> Tuple[str, Any]:
+        """
+        What identifies a session user's run log owner
+
+        Discogs-connected users are keyed on their Discogs user id, login-only users on
+        their email, and anyone else on the session user id. Never on a bare username:
+        login usernames are email local parts, which neither are unique nor keep apart
+        from Discogs usernames.
+        """
+        discogs_user_id = getattr(user, "discogsUserId", None)
+        if discogs_user_id:
+            return "discogs", int(discogs_user_id)
+        email = (getattr(user, "email", None) or "").strip().lower()
+        if email:
+            return "email", email
+        return "session", getattr(user, "id")
+
+    def _user_id(self, db, user: Any) -> int:
+        """users.id for a session user, creating the row on first use"""
+        kind, value = identity = self._identity(user)
+        with self._lock:
+            if identity in self._user_ids:
+                return self._user_ids[identity]
+
+        if kind == "discogs":
+            query = select(User.id).where(User.discogs_user_id == value)
+        elif kind == "email":
+            query = select(User.id).where(User.email == value, User.discogs_user_id.is_(None))
+        else:
+            query = select(User.id).where(User.username == f"session:{value}")
+        row = db.execute(query).first()
+        if row is not None:
+            user_id = row[0]
+        else:
+            # OAuth-only / session accounts: there is no password to log in with. The username
+            # column must be unique, so it holds a namespaced key rather than a display name.
+            if kind == "discogs":
+                username = f"discogs:{value}"
+            elif kind == "email":
+                username = f"email:{hashlib.sha256(value.encode('utf-8')).hexdigest()[:32]}"
+            else:
+                username = f"session:{value}"
+            account = User(username=username, email=value if kind == "email" else None, hashed_password="",
+                           discogs_user_id=value if kind == "discogs" else None,
+                           discogs_username=getattr(user, "username", None) if kind == "discogs" else None)
+            db.add(account)
+            try:
+                db.commit()
+                user_id = account.id
+                logger.info(f"Created user row {user_id} for {username}")
+            except IntegrityError:
+                # Another worker created it first
+                db.rollback()
+                user_id = db.execute(query).scalar_one()
+
+        with self._lock:
+            self._user_ids[identity] = user_id
+        return user_id
+
+    @staticmethod
+    def _run_to_dict(run: RunLog) -> Dict[str, Any]:
+        config = dict(run.run_config or {})
+        entry = {
+            "id": str(run.id),
+            "userId": str(run.user_id),
+            "runDate": run.run_date.isoformat() if run.run_date else None,
+            "isDryRun": run.is_dry_run,
+            "itemsScanned": run.items_scanned,
+            "itemsUpdated": run.items_updated,
+            "itemsSkipped": run.items_skipped,
+            "errors": run.errors,
+            "status": run.status,
+            "errorMessage": run.error_message,
+            "durationSeconds": run.duration_seconds
+        }
+        for field in RUN_CONFIG_FIELDS:
+            if field in config:
+                entry[field] = config.pop(field)
+        entry["runConfig"] = config
+        return entry
+
+    @staticmethod
+    def _snapshot_to_dict(snapshot: ListingSnapshot) -> Dict[str, Any]:
+        details = snapshot.listing_details or {}
+        return {
+            "id": str(snapshot.id),
+            "listingId": snapshot.listing_id,
+            "releaseId": snapshot.release_id,
+            "decision": snapshot.decision,
+            "success": snapshot.decision in ("applied", "declined"),
+            "currentPrice": _price(snapshot.before_price),
+            "suggestedPrice": _price(snapshot.suggested_price),
+            "newPrice": _price(snapshot.after_price),
+            "error": snapshot.reasoning,
+            **details
+        }
+
+    def record(self, user: Any, entry: Dict[str, Any], items: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Store one run
+
+        Args:
+            user: Session user (needs discogsUserId, email or id)
+            entry: Log entry in API shape (runDate, status, itemsScanned, ..., runConfig)
+            items: Per-listing results: listingId, decision, and optionally releaseId,
+                   currentPrice, suggestedPrice, newPrice, error, verified
+
+        Returns:
+            The stored entry as returned by list_runs
+        """
+        db = self._db()
+        try:
+            run = self._add_run(db, self._user_id(db, user), entry, items)
+            db.commit()
+            return self._run_to_dict(run)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _add_run(self, db, user_id: int, entry: Dict[str, Any],
+                 items: Optional[Iterable[Dict[str, Any]]] = None) -> RunLog:
+        """Add one run and its snapshots to the open transaction"""
+        config = dict(entry.get("runConfig") or {})
+        for field in RUN_CONFIG_FIELDS:
+            if field in entry:
+                config[field] = entry[field]
+        run = RunLog(
+            user_id=user_id,
+            run_date=_run_date(entry.get("runDate")),
+            is_dry_run=bool(entry.get("isDryRun", False)),
+            items_scanned=entry.get("itemsScanned", entry.get("totalListings", 0)) or 0,
+            items_updated=entry.get("itemsUpdated", 0) or 0,
+            items_skipped=entry.get("itemsSkipped", 0) or 0,
+            errors=entry.get("errors", 0) or 0,
+            status=entry.get("status", "completed"),
+            error_message=entry.get("errorMessage"),
+            duration_seconds=entry.get("durationSeconds"),
+            run_config=config
+        )
+        db.add(run)
+        db.flush()
+        for item in items or ():
+            db.add(ListingSnapshot(
+                run_log_id=run.id,
+                user_id=user_id,
+                listing_id=item["listingId"],
+                release_id=item.get("releaseId"),
+                before_price=_cents(item.get("currentPrice")),
+                after_price=_cents(item.get("newPrice")) if item.get("decision") == "applied" else None,
+                suggested_price=_cents(item.get("suggestedPrice")),
+                decision=item["decision"],
+                reasoning=item.get("error"),
+                listing_details={"verified": item["verified"]} if "verified" in item else None
+            ))
+        return run
+
+    def import_session_logs(self, user: Any, logs: List[Dict[str, Any]]) -> int:
+        """
+        Move log entries kept in a session (before run logs had tables) into the store
+
+        All entries are stored in one transaction, so a failed import stores none of them
+        and can simply be retried.
+        """
+        db = self._db()
+        try:
+            user_id = self._user_id(db, user)
+            for entry in logs:
+                results = entry.get("results") or []
+                items = [{**result, "decision": "applied" if result.get("success") else "failed"} for result in results]
+                self._add_run(db, user_id, {key: value for key, value in entry.items() if key != "results"}, items)
+            db.commit()
+            return len(logs)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def list_runs(self, user: Any, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        A page of a user's runs, newest first
+
+        Args:
+            user: Session user
+            limit: Page size (default RUN_LOG_PAGE_SIZE, at most RUN_LOG_MAX_PAGE_SIZE)
+            cursor: nextCursor from the previous page
+
+        Returns:
+            {"logs": [...], "nextCursor": str or None}
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        limit = _limit(limit)
+        before_id = _cursor(cursor)
+        db = self._db()
+        try:
+            user_id = self._user_id(db, user)
+            query = select(RunLog).where(RunLog.user_id == user_id)
+            if before_id is not None:
+                query = query.where(RunLog.id < before_id)
+            runs = db.execute(query.order_by(RunLog.id.desc()).limit(limit + 1)).scalars().all()
+            db.commit()
+            page = runs[:limit]
+            return {
+                "logs": [self._run_to_dict(run) for run in page],
+                "nextCursor": str(page[-1].id) if len(runs) > limit else None
+            }
+        finally:
+            db.close()
+
+    def list_items(self, user: Any, run_id: int, limit: Optional[int] = None,
+                   cursor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        A page of one run's per-listing results
+
+        Returns:
+            {"items": [...], "nextCursor": str or None}, or None if the run is not the user's
+        """
+        limit = _limit(limit)
+        after_id = _cursor(cursor)
+        db = self._db()
+        try:
+            user_id = self._user_id(db, user)
+            owner = db.execute(select(RunLog.user_id).where(RunLog.id == run_id)).first()
+            if owner is None or owner[0] != user_id:
+                return None
+            query = select(ListingSnapshot).where(ListingSnapshot.run_log_id == run_id)
+            if after_id is not None:
+                query = query.where(ListingSnapshot.id > after_id)
+            snapshots = db.execute(query.order_by(ListingSnapshot.id).limit(limit + 1)).scalars().all()
+            db.commit()
+            page = snapshots[:limit]
+            return {
+                "items": [self._snapshot_to_dict(snapshot) for snapshot in page],
+                "nextCursor": str(page[-1].id) if len(snapshots) > limit else None
+            }
+        finally:
+            db.close()
+
+    def latest(self, user: Any) -> Optional[Dict[str, Any]]:
+        """The user's most recent run"""
+        logs = self.list_runs(user, limit=1)["logs"]
+        return logs[0] if logs else None
+
+    def sweep(self, batch_size: int = RUN_LOG_SWEEP_BATCH, now: Optional[datetime] = None) -> int:
+        """
+        Delete runs (and their snapshots) older than their user's log_retention_days
+
+        Returns:
+            Number of runs deleted
+        """
+        now = now or datetime.now()
+        retention = select(
+            User.id.label("user_id"),
+            func.coalesce(UserSettings.log_retention_days, DEFAULT_LOG_RETENTION_DAYS).label("days")
+        ).outerjoin(UserSettings, UserSettings.user_id == User.id).subquery()
+        deleted = 0
+        db = self._db()
+        try:
+            for days in db.execute(select(retention.c.days).distinct()).scalars().all():
+                user_ids = select(retention.c.user_id).where(retention.c.days == days)
+                cutoff = now - timedelta(days=days)
+                while True:
+                    run_ids = db.execute(
+                        select(RunLog.id)
+                        .where(RunLog.user_id.in_(user_ids), RunLog.run_date < cutoff)
+                        .limit(batch_size)
+                    ).scalars().all()
+                    if not run_ids:
+                        break
+                    db.execute(delete(ListingSnapshot).where(ListingSnapshot.run_log_id.in_(run_ids)))
+                    db.execute(delete(RunLog).where(RunLog.id.in_(run_ids)))
+                    db.commit()
+                    deleted += len(run_ids)
+            if deleted:
+                logger.info(f"Run log retention sweep deleted {deleted} runs")
+            return deleted
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def start_sweeper(self, interval: float = RUN_LOG_SWEEP_SECONDS):
+        """Run sweep() every `interval` seconds in a background thread"""
+        if self._sweeper is not None or interval <= 0:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Run log retention sweep failed: {e}")
+
+        self._sweeper = threading.Thread(target=run, name="run-log-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+        self._sweeper = None
+
+# Global run log store instance
+run_log_store = RunLogStore()
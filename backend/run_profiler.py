@@ -0,0 +1,217 @@
+"""
+Per-run performance profile for WaxValue analysis runs
+
+A RunProfiler is created at the start of an analysis run and records:
+- wall time per phase (profile fetch, inventory pagination, price fetches,
+  compute, persistence); nested phases are subtracted from their parent
+- Discogs API calls, errors, retries and bytes received by the run's client
+  (a per-run view of the pooled client, see DiscogsClient.with_run_stats)
+- time spent blocked on the rate limiter and the request scheduler
+- price cache hit rate and peak memory during the run
+
+The summary is stored with the run's log entry (durationSeconds / runConfig,
+mirroring RunLog.duration_seconds / RunLog.run_config) so regressions can be
+compared across seller sizes.
+"""
+
+import os
+import time
+import tracemalloc
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# tracemalloc gives an accurate peak of Python allocations but slows allocation
+# noticeably, so by default the process RSS is sampled during the run instead
+RUN_PROFILE_TRACEMALLOC = os.getenv("RUN_PROFILE_TRACEMALLOC", "false").lower() == "true"
+RUN_PROFILE_RSS_SAMPLE_SECONDS = float(os.getenv("RUN_PROFILE_RSS_SAMPLE_SECONDS", "0.25"))
+
+PHASES = ("profile", "inventory", "price_fetch", "compute", "persist")
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process right now, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+class RssSampler:
+    """
+    Samples the process RSS on a background thread and keeps the peak
+
+    Unlike ru_maxrss (the peak over the whole process lifetime) this is the
+    peak while one run was in progress, so a run that needs more memory than
+    the last one shows up. Concurrent runs in the same process still share it.
+    """
+
+    def __init__(self, interval: float = RUN_PROFILE_RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.start_bytes = current_rss_bytes()
+        self.peak_bytes = self.start_bytes
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if self.start_bytes is not None:
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+
+    @property
+    def available(self) -> bool:
+        return self.start_bytes is not None
+
+    def sample(self):
+        rss = current_rss_bytes()
+        if rss is not None and (self.peak_bytes is None or rss > self.peak_bytes):
+            self.peak_bytes = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        """Take a last sample and stop the sampling thread"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.sample()
+
+def _mb(size: int) -> float:
+    return round(size / (1024 * 1024), 2)
+
+class RunProfiler:
+    """
+    Collects phase timings and request totals for one analysis run
+    """
+
+    def __init__(self, client=None, trace_memory: bool = RUN_PROFILE_TRACEMALLOC):
+        """
+        Args:
+            client: DiscogsClient used for the run, ideally a with_run_stats() view
+                    so requests of concurrent work are not counted (its RequestStats are diffed)
+            trace_memory: Measure the run's peak Python allocations with tracemalloc
+                          instead of sampling the process RSS
+        """
+        self.client = client
+        self.trace_memory = trace_memory
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self._stack: List[List[Any]] = []
+        self._stats_start = client.stats.snapshot() if client is not None else {}
+        self.items_processed = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._finished: Optional[Dict[str, Any]] = None
+        self._rss: Optional[RssSampler] = None
+        if self.trace_memory:
+            self._start_tracemalloc()
+        else:
+            self._rss = RssSampler()
+
+    @staticmethod
+    def _start_tracemalloc():
+        global _tracemalloc_users
+        with _tracemalloc_lock:
+            if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            _tracemalloc_users += 1
+
+    @staticmethod
+    def _stop_tracemalloc() -> int:
+        """Stop tracing if this was the last profiler using it; returns the peak in bytes"""
+        global _tracemalloc_users
+        with _tracemalloc_lock:
+            _, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+            _tracemalloc_users = max(0, _tracemalloc_users - 1)
+            if _tracemalloc_users == 0 and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            return peak
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block of work; time spent in nested phases is not counted twice"""
+        frame = [name, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - frame[2]
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def iterate(self, iterable: Iterable, name: str) -> Iterator:
+        """Yield from an iterable, timing each wait for its next item as phase `name`"""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def record_item(self, cache_hit: bool):
+        """Count one processed listing and whether its price data came from the cache"""
+        self.items_processed += 1
+        if cache_hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def _request_totals(self) -> Dict[str, float]:
+        if self.client is None:
+            return {}
+        end = self.client.stats.snapshot()
+        return {field: end[field] - self._stats_start.get(field, 0) for field in end}
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Stop profiling and build the summary (safe to call more than once)
+
+        Returns:
+            Dict with durationSeconds and a profile dict for the run log's runConfig
+        """
+        if self._finished is not None:
+            return self._finished
+
+        duration = time.perf_counter() - self.started
+        requests = self._request_totals()
+        lookups = self.cache_hits + self.cache_misses
+
+        if self.trace_memory:
+            peak_bytes = self._stop_tracemalloc()
+            memory = {"peakMemoryMb": _mb(peak_bytes), "memoryGrowthMb": None, "memorySource": "tracemalloc"}
+        elif self._rss.available:
+            self._rss.stop()
+            memory = {
+                "peakMemoryMb": _mb(self._rss.peak_bytes),
+                "memoryGrowthMb": _mb(self._rss.peak_bytes - self._rss.start_bytes),
+                "memorySource": "rss_sampled"
+            }
+        else:
+            memory = {"peakMemoryMb": None, "memoryGrowthMb": None, "memorySource": "unavailable"}
+
+        profile = {
+            "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            "itemsProcessed": self.items_processed,
+            "cacheHits": self.cache_hits,
+            "cacheHitRate": round(self.cache_hits / lookups, 3) if lookups else 0.0,
+            "apiCalls": int(requests.get("calls", 0)),
+            "apiErrors": int(requests.get("errors", 0)),
+            "retries": int(requests.get("retries", 0)),
+            "bytesReceived": int(requests.get("bytes_received", 0)),
+            "networkSeconds": round(requests.get("network_seconds", 0.0), 3),
+            "rateLimitWaitSeconds": round(requests.get("token_wait_seconds", 0.0), 3),
+            "schedulerWaitSeconds": round(requests.get("scheduler_wait_seconds", 0.0), 3),
+            "retrySleepSeconds": round(requests.get("retry_sleep_seconds", 0.0), 3),
+            **memory
+        }
+        self._finished = {"durationSeconds": round(duration, 3), "profile": profile}
+        return self._finished
@@ -0,0 +1,50 @@
+"""
+JSON serialization for WaxValue
+
+Single place that decides how the backend turns data into JSON:
+- orjson when it is installed (several times faster than the stdlib encoder)
+- stdlib json fallback with the same compact output otherwise
+
+Used by the SSE framing, the session store and the API responses.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize obj to compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+
+    def loads(data: Any) -> Any:
+        """Parse JSON from bytes or str"""
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> bytes:
+        """Serialize obj to compact UTF-8 JSON bytes"""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def loads(data: Any) -> Any:
+        """Parse JSON from bytes or str"""
+        return json.loads(data)
+
+def dumps_str(obj: Any) -> str:
+    """Serialize obj to a compact JSON string"""
+    return dumps(obj).decode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that renders through the shared serializer"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,66 +1,582 @@
-import json
+"""
+Session storage
+
+Sessions are rows in a small SQLite database (SESSIONS_DB) shared by every
+uvicorn worker, like the job registry:
+- each row carries a version, bumped on every write, and a store-wide change
+  sequence; a worker polls "what changed since sequence N" (an index range
+  scan) at most every SESSION_SYNC_MS and drops exactly the cached sessions
+  another worker has written since it read them
+- writes merge at key level: update_session_data only rewrites the keys it
+  changed on top of the current row, so two workers updating different keys
+  of one session no longer overwrite each other (set_session still replaces
+  the whole session)
+
+Sessions are read on first access. Database reads run outside the in-memory
+lock (it is only taken to install what was read), so one slow read does not
+stall every other request. Resident sessions are kept in an LRU: at most
+SESSION_CACHE_SIZE of them, and a session that has not been used for
+SESSION_IDLE_SECONDS is dropped from memory.
+
+Writes are write-behind: a changed session is marked dirty and a background
+flusher commits every dirty session in one transaction SESSION_WRITE_DELAY_MS
+after the first change, so a burst of updates costs one write. A crash loses
+at most that window, never a torn session. SESSION_DURABILITY=sync (or
+durable=True on a single call) commits with fsync before returning instead.
+Everything still dirty is flushed by close() on shutdown.
+
+Sessions from older stores are imported: a legacy single sessions.json on
+first start, and per-session files under SESSIONS_DIR when first accessed.
+"""
+
 import os
-from typing import Dict, Any, Optional
+import time
+import sqlite3
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional, Set, Tuple
+from serialization import dumps, loads
 
 logger = logging.getLogger(__name__)
 
+SESSIONS_DB = os.getenv("SESSIONS_DB", "waxvalue_sessions.db")
+SESSIONS_DIR = os.getenv("SESSIONS_DIR", "sessions")
+SESSIONS_LEGACY_FILE = os.getenv("SESSIONS_LEGACY_FILE", "sessions.json")
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1000"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+# "deferred": write-behind, no fsync; "sync": every change is committed and fsynced before returning
+SESSION_DURABILITY = os.getenv("SESSION_DURABILITY", "deferred").lower()
+SESSION_WRITE_DELAY_MS = int(os.getenv("SESSION_WRITE_DELAY_MS", "500"))
+# How stale a cached session may be before other workers' writes are checked for
+SESSION_SYNC_MS = int(os.getenv("SESSION_SYNC_MS", "250"))
+
+# A dirty session: its data and the keys changed since it was read (None: replace the whole session)
+DirtySession = Tuple[Dict[str, Any], Optional[Set[str]]]
+
 class SessionManager:
-    def __init__(self, sessions_file: str = "sessions.json"):
-        self.sessions_file = sessions_file
-        self.sessions: Dict[str, Dict[str, Any]] = {}
-        self.load_sessions()
-    
-    def load_sessions(self):
-        """Load sessions from file"""
+    def __init__(self, db_path: str = SESSIONS_DB, sessions_dir: Optional[str] = SESSIONS_DIR,
+                 legacy_file: Optional[str] = SESSIONS_LEGACY_FILE,
+                 cache_size: int = SESSION_CACHE_SIZE, idle_seconds: float = SESSION_IDLE_SECONDS,
+                 durability: str = SESSION_DURABILITY, write_delay_ms: int = SESSION_WRITE_DELAY_MS,
+                 sync_ms: int = SESSION_SYNC_MS):
+        """
+        Args:
+            db_path: SQLite database shared by all worker processes
+            sessions_dir: Per-session file store to import sessions from on access (None to skip)
+            legacy_file: Single-file session store to import on first start (None to skip)
+            cache_size: Sessions kept in memory at most
+            idle_seconds: Sessions unused for this long are dropped from memory
+            durability: "deferred" (write-behind) or "sync" (commit + fsync on every change)
+            write_delay_ms: How long changes are coalesced before a deferred flush
+            sync_ms: Minimum interval between checks for other workers' writes
+        """
+        self.db_path = db_path
+        self.sessions_dir = sessions_dir
+        self.cache_size = max(1, cache_size)
+        self.idle_seconds = idle_seconds
+        self.durability = durability if durability in ("deferred", "sync") else "deferred"
+        self.write_delay = max(0, write_delay_ms) / 1000
+        self.sync_interval = max(0, sync_ms) / 1000
+        # Resident sessions, least recently used first, and the row version each was read at
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+        # Changed sessions waiting for a flush, and sessions a flush is writing right now.
+        # Both stay readable even after the session is evicted from the LRU.
+        self._dirty: Dict[str, DirtySession] = {}
+        self._writing: Dict[str, DirtySession] = {}
+        self._flush_due: Optional[float] = None
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        # Serializes flushes so a session's writes land in the order they were taken
+        self._io_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+        self._seen_seq = 0
+        self._synced_at = 0.0
+        self.flushes = 0
+        self.writes = 0
+        self.invalidations = 0
+        self._init_db()
+        if legacy_file:
+            self.migrate_legacy_file(legacy_file)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; writes use BEGIN IMMEDIATE explicitly
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
         try:
-            if os.path.exists(self.sessions_file):
-                with open(self.sessions_file, 'r') as f:
-                    self.sessions = json.load(f)
-                logger.info(f"Loaded {len(self.sessions)} sessions from {self.sessions_file}")
-            else:
-                logger.info(f"No sessions file found at {self.sessions_file}, starting with empty sessions")
-                self.sessions = {}
-        except Exception as e:
-            logger.error(f"Error loading sessions: {e}")
-            self.sessions = {}
-    
-    def save_sessions(self):
-        """Save sessions to file"""
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    change_seq INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    data BLOB
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_change_seq ON sessions (change_seq)")
+            self._seen_seq = conn.execute("SELECT COALESCE(MAX(change_seq), 0) FROM sessions").fetchone()[0]
+        finally:
+            conn.close()
+
+    def _commit(self, rows: Dict[str, Tuple[Optional[bytes], Optional[bytes]]],
+                durable: bool = False) -> Dict[str, Tuple[int, Optional[bytes]]]:
+        """
+        Write sessions in one transaction
+
+        Args:
+            rows: session id -> (full data, None) to replace a session,
+                  (None, {"set": {...}, "unset": [...]}) to merge keys into the stored session,
+                  or (None, None) to delete it
+            durable: fsync the commit
+
+        Returns:
+            session id -> (new version, the merged data for key merges, else None)
+        """
+        written = {}
+        conn = self._connect()
+        try:
+            conn.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+            conn.execute("BEGIN IMMEDIATE")
+            seq = conn.execute("SELECT COALESCE(MAX(change_seq), 0) FROM sessions").fetchone()[0]
+            now = time.time()
+            for session_id, (data, changes) in rows.items():
+                seq += 1
+                row = conn.execute("SELECT version, data FROM sessions WHERE session_id = ?",
+                                   (session_id,)).fetchone()
+                version = (row["version"] if row is not None else 0) + 1
+                merged = None
+                if changes is not None:
+                    stored = loads(row["data"]) if row is not None and row["data"] is not None else {}
+                    changes = loads(changes)
+                    stored.update(changes["set"])
+                    for key in changes["unset"]:
+                        stored.pop(key, None)
+                    data = merged = dumps(stored)
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, version, change_seq, updated_at, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (session_id, version, seq, now, data)
+                )
+                written[session_id] = (version, merged)
+            conn.execute("COMMIT")
+            return written
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _fetch(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Stored session data (None if missing or deleted) and its version"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT version, data FROM sessions WHERE session_id = ?",
+                               (session_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None, 0
+        return (loads(row["data"]) if row["data"] is not None else None), row["version"]
+
+    def migrate_legacy_file(self, legacy_file: str):
+        """Import a single-file session store, then rename it aside"""
+        if not os.path.exists(legacy_file):
+            return
         try:
-            with open(self.sessions_file, 'w') as f:
-                json.dump(self.sessions, f, indent=2)
-            logger.debug(f"Saved {len(self.sessions)} sessions to {self.sessions_file}")
+            with open(legacy_file, 'rb') as f:
+                stored = loads(f.read())
+            existing = set()
+            conn = self._connect()
+            try:
+                for row in conn.execute("SELECT session_id FROM sessions"):
+                    existing.add(row["session_id"])
+            finally:
+                conn.close()
+            self._commit({session_id: (dumps(session_data), None) for session_id, session_data in stored.items()
+                          if session_id not in existing}, durable=True)
+            os.replace(legacy_file, f"{legacy_file}.migrated")
+            logger.info(f"Migrated {len(stored)} sessions from {legacy_file} to {self.db_path}")
         except Exception as e:
-            logger.error(f"Error saving sessions: {e}")
-    
-    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get session data"""
-        return self.sessions.get(session_id)
-    
-    def set_session(self, session_id: str, session_data: Dict[str, Any]):
-        """Set session data and save to file"""
+            logger.error(f"Error migrating sessions from {legacy_file}: {e}")
+
+    def _import_session_file(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Move a session from the per-session file store into the database, if it is there"""
+        if not self.sessions_dir:
+            return None, 0
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+        path = os.path.join(self.sessions_dir, digest[:2], f"{digest}.json")
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+        except FileNotFoundError:
+            # Not in the file store, or another thread just imported it
+            return self._fetch(session_id)
+        version, _ = self._commit({session_id: (payload, None)}, durable=True)[session_id]
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        logger.info(f"Imported session {session_id[:10]}... from {self.sessions_dir}/")
+        return loads(payload), version
+
+    def _touch(self, session_id: str, session_data: Dict[str, Any]):
+        """Mark a session most recently used and evict idle or excess sessions"""
+        now = time.monotonic()
         self.sessions[session_id] = session_data
-        self.save_sessions()
+        self.sessions.move_to_end(session_id)
+        self._last_used[session_id] = now
+        while len(self.sessions) > 1:
+            oldest = next(iter(self.sessions))
+            if len(self.sessions) <= self.cache_size and now - self._last_used[oldest] < self.idle_seconds:
+                break
+            self._forget(oldest)
+
+    def _forget(self, session_id: str):
+        """Drop a session from the cache (it is read again on next access)"""
+        self.sessions.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        self._versions.pop(session_id, None)
+
+    def _pending(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Session data not yet written, if any"""
+        pending = self._dirty.get(session_id) or self._writing.get(session_id)
+        return pending[0] if pending is not None else None
+
+    def _resident(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """This process's copy of a session: cached or not yet written (call with the lock held)"""
+        session_data = self.sessions.get(session_id)
+        return session_data if session_data is not None else self._pending(session_id)
+
+    def _sync(self, force: bool = False):
+        """Drop cached sessions that another worker has written since they were read"""
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        with self._lock:
+            seen_seq = self._seen_seq
+        # Query without the lock; it is only taken to drop stale sessions
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT session_id, version, change_seq FROM sessions WHERE change_seq > ?",
+                                (seen_seq,)).fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            for row in rows:
+                self._seen_seq = max(self._seen_seq, row["change_seq"])
+                session_id = row["session_id"]
+                if (session_id in self.sessions and self._versions.get(session_id) != row["version"]
+                        and self._pending(session_id) is None):
+                    self._forget(session_id)
+                    self.invalidations += 1
+
+    def _mark_dirty(self, session_id: str, session_data: Dict[str, Any], key: Optional[str] = None):
+        """Record a change; key=None means the whole session was replaced"""
+        previous = self._dirty.get(session_id)
+        if key is None or (previous is not None and previous[1] is None):
+            self._dirty[session_id] = (session_data, None)
+        else:
+            changed = set(previous[1]) if previous is not None else set()
+            changed.add(key)
+            self._dirty[session_id] = (session_data, changed)
+
+    def _schedule(self, session_id: str, durable: bool):
+        """Flush now (sync durability) or arm the deferred flush"""
+        with self._lock:
+            if not (durable or self.durability == "sync" or self._closed):
+                if self._flush_due is None:
+                    self._flush_due = time.monotonic() + self.write_delay
+                    self._start_flusher()
+                    self._changed.notify()
+                return
+        self.flush([session_id], durable=True)
+
+    def _start_flusher(self):
+        if self._flusher is None and not self._closed:
+            self._flusher = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                while not self._closed:
+                    if self._flush_due is None:
+                        self._changed.wait()
+                        continue
+                    remaining = self._flush_due - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self, session_ids: Optional[Iterable[str]] = None, durable: bool = False) -> int:
+        """
+        Write dirty sessions now, in one transaction
+
+        Args:
+            session_ids: Sessions to write (default: every dirty session)
+            durable: fsync the commit before returning
+
+        Returns:
+            Number of sessions written
+        """
+        with self._io_lock:
+            with self._lock:
+                if session_ids is None:
+                    batch = self._dirty
+                    self._dirty = {}
+                else:
+                    batch = {sid: self._dirty.pop(sid) for sid in session_ids if sid in self._dirty}
+                if not self._dirty:
+                    self._flush_due = None
+                # Serialize under the lock: callers mutate session dicts while holding it
+                rows = {}
+                for session_id, (session_data, changed) in batch.items():
+                    try:
+                        if changed is None:
+                            rows[session_id] = (dumps(session_data), None)
+                        else:
+                            rows[session_id] = (None, dumps({
+                                "set": {key: session_data[key] for key in changed if key in session_data},
+                                "unset": [key for key in changed if key not in session_data]
+                            }))
+                    except Exception as e:
+                        logger.error(f"Error serializing session {session_id[:10]}...: {e}")
+                self._writing = batch
+
+            written = {}
+            if rows:
+                try:
+                    written = self._commit(rows, durable=durable)
+                except Exception as e:
+                    logger.error(f"Error saving {len(rows)} sessions: {e}")
+                    # Keep them dirty so the next flush retries
+                    with self._lock:
+                        for session_id, (session_data, changed) in batch.items():
+                            if session_id not in self._dirty:
+                                self._dirty[session_id] = (session_data, changed)
+                            else:
+                                self._mark_dirty(session_id, session_data)
+                        if self._flush_due is None:
+                            self._flush_due = time.monotonic() + self.write_delay
+                            self._changed.notify()
+
+            with self._lock:
+                self._writing = {}
+                for session_id, (version, merged) in written.items():
+                    if session_id in self._dirty:
+                        continue
+                    if merged is not None and self._versions.get(session_id) != version - 1:
+                        # Another worker wrote this session since we read it: adopt the merged row
+                        if session_id in self.sessions:
+                            self.sessions[session_id] = loads(merged)
+                    if session_id in self.sessions:
+                        self._versions[session_id] = version
+                self.writes += len(written)
+                if batch:
+                    self.flushes += 1
+        if written:
+            logger.debug(f"Flushed {len(written)} sessions")
+        return len(written)
+
+    def close(self):
+        """Flush every dirty session (durably) and stop the background flusher"""
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+        flusher = self._flusher
+        if flusher is not None:
+            flusher.join(timeout=5)
+        written = self.flush(durable=True)
+        logger.info(f"Session store closed ({written} sessions flushed)")
+
+    def save_session(self, session_id: str, durable: bool = False):
+        """
+        Schedule a whole resident session to be written
+
+        Args:
+            session_id: Session to save
+            durable: Commit with fsync before returning, whatever SESSION_DURABILITY is
+        """
+        with self._lock:
+            session_data = self.sessions.get(session_id)
+            if session_data is None:
+                session_data = self._pending(session_id)
+            if session_data is None:
+                return
+            self._mark_dirty(session_id, session_data)
+        self._schedule(session_id, durable)
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get session data, reading it from the database on first access"""
+        self._sync()
+        with self._lock:
+            session_data = self._resident(session_id)
+            if session_data is not None:
+                self._touch(session_id, session_data)
+                return session_data
+            seen_seq = self._seen_seq
+
+        # Read without the lock, so other sessions are not held up behind the database
+        try:
+            stored, version = self._fetch(session_id)
+            if stored is None and version == 0:
+                stored, version = self._import_session_file(session_id)
+        except Exception as e:
+            logger.error(f"Error loading session {session_id[:10]}...: {e}")
+            return None
+        if stored is None:
+            return None
+
+        with self._lock:
+            session_data = self._resident(session_id)
+            if session_data is not None:
+                # Another thread loaded or changed it meanwhile; its copy wins
+                self._touch(session_id, session_data)
+                return session_data
+            if self._seen_seq != seen_seq:
+                # A sync ran while we read and may have skipped this session: don't cache what may be stale
+                return stored
+            self._versions[session_id] = version
+            self._touch(session_id, stored)
+            return stored
+
+    def reload_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Re-read a single session to pick up writes from other worker processes"""
+        with self._lock:
+            if self._pending(session_id) is not None:
+                # This process holds the newest copy; it has not been written yet
+                return self._resident(session_id)
+        try:
+            stored, version = self._fetch(session_id)
+        except Exception as e:
+            logger.warning(f"Error reloading session {session_id[:10]}...: {e}")
+            with self._lock:
+                return self.sessions.get(session_id)
+        with self._lock:
+            if self._pending(session_id) is not None:
+                return self._resident(session_id)
+            if stored is None:
+                self._forget(session_id)
+            elif version > self._versions.get(session_id, 0):
+                # Versions only grow, so an older read never replaces a newer cached copy
+                self._touch(session_id, stored)
+                self._versions[session_id] = version
+            return self.sessions.get(session_id)
+
+    def set_session(self, session_id: str, session_data: Dict[str, Any], durable: bool = False):
+        """Set (replace) session data and save it"""
+        with self._lock:
+            self._touch(session_id, session_data)
+            self._mark_dirty(session_id, session_data)
+        self._schedule(session_id, durable)
         logger.debug(f"Updated session {session_id[:10]}...")
-    
+
     def delete_session(self, session_id: str):
-        """Delete session and save to file"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            self.save_sessions()
-            logger.debug(f"Deleted session {session_id[:10]}...")
-    
-    def update_session_data(self, session_id: str, key: str, value: Any):
-        """Update specific data in session and save to file"""
-        if session_id in self.sessions:
-            self.sessions[session_id][key] = value
-            self.save_sessions()
-            logger.debug(f"Updated session {session_id[:10]}... key: {key}")
-    
+        """Delete session from the cache and the database"""
+        with self._io_lock:
+            with self._lock:
+                self._forget(session_id)
+                self._dirty.pop(session_id, None)
+            try:
+                self._commit({session_id: (None, None)})
+                logger.debug(f"Deleted session {session_id[:10]}...")
+            except Exception as e:
+                logger.error(f"Error deleting session {session_id[:10]}...: {e}")
+
+    def update_session_data(self, session_id: str, key: str, value: Any, durable: bool = False):
+        """Update specific data in session and save it (only that key is written)"""
+        session_data = self.get_session(session_id)
+        if session_data is None:
+            return
+        with self._lock:
+            # Prefer the copy another thread may have cached since (both came from the same row)
+            resident = self._resident(session_id)
+            if resident is not None:
+                session_data = resident
+            session_data[key] = value
+            self._mark_dirty(session_id, session_data, key)
+        self._schedule(session_id, durable)
+        logger.debug(f"Updated session {session_id[:10]}... key: {key}")
+
+    def pop_session_data(self, session_id: str, key: str, default: Any = None) -> Any:
+        """
+        Remove a key from a session and return its value, atomically across worker processes
+
+        The stored row is read and rewritten in one BEGIN IMMEDIATE transaction, so when
+        several workers (or threads) pop the same key only one of them gets the value.
+        """
+        # Write out this process's pending changes first, so they can't put the key back later
+        self.flush([session_id])
+        with self._io_lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT version, data FROM sessions WHERE session_id = ?",
+                                   (session_id,)).fetchone()
+                stored = loads(row["data"]) if row is not None and row["data"] is not None else {}
+                if key not in stored:
+                    conn.execute("ROLLBACK")
+                    value, version = default, None
+                else:
+                    value = stored.pop(key)
+                    previous, version = row["version"], row["version"] + 1
+                    seq = conn.execute("SELECT COALESCE(MAX(change_seq), 0) FROM sessions").fetchone()[0] + 1
+                    conn.execute(
+                        "UPDATE sessions SET version = ?, change_seq = ?, updated_at = ?, data = ? WHERE session_id = ?",
+                        (version, seq, time.time(), dumps(stored), session_id)
+                    )
+                    conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+            with self._lock:
+                resident = self._resident(session_id)
+                if resident is not None:
+                    resident.pop(key, None)
+                if version is not None and session_id in self.sessions and session_id not in self._dirty:
+                    if self._versions.get(session_id) == previous:
+                        self._versions[session_id] = version
+                    else:
+                        # The cached copy was already behind the row: read it again on next access
+                        self._forget(session_id)
+        return value
+
     def has_session(self, session_id: str) -> bool:
         """Check if session exists"""
-        return session_id in self.sessions
+        return self.get_session(session_id) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache, write-behind and cross-worker invalidation counters"""
+        with self._lock:
+            return {
+                "resident": len(self.sessions),
+                "dirty": len(self._dirty),
+                "cacheSize": self.cache_size,
+                "idleSeconds": self.idle_seconds,
+                "durability": self.durability,
+                "flushes": self.flushes,
+                "writes": self.writes,
+                "invalidations": self.invalidations,
+                "seenChangeSeq": self._seen_seq
+            }
 
 # Global session manager instance
 session_manager = SessionManager()
@@ -0,0 +1,190 @@
+"""
+Server-Sent Events framing for WaxValue
+
+Every event on the suggestions stream is a single `data:` line holding a JSON
+object whose first key is `type`. The `data: {"type":"<name>"` prefix never
+changes for a given event type, so it is encoded once and cached; only the
+payload fields are serialized per event.
+
+EventBatcher coalesces the high-volume events of an analysis run:
+- `progress` is emitted at most every N ms or every N items
+- suggestions are grouped into `suggestions` frames of up to N items
+
+Each frame carries an `id:` resume token (see StreamCursor) so a reconnecting
+client can send `Last-Event-ID` and only receive suggestions it has not seen.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from serialization import dumps
+
+FRAME_END = b"\n\n"
+
+@lru_cache(maxsize=32)
+def _event_prefix(event_type: str) -> bytes:
+    """Pre-encoded `data: {"type":"<event_type>"` prefix"""
+    return b'data: {"type":' + dumps(event_type)
+
+def encode_event(event_type: str, payload: Optional[Dict[str, Any]] = None,
+                 event_id: Optional[str] = None) -> bytes:
+    """
+    Encode a typed SSE event
+
+    Args:
+        event_type: Value of the `type` field
+        payload: Remaining fields of the event (must not contain `type`)
+        event_id: Optional SSE `id:` value
+
+    Returns:
+        Complete SSE frame as bytes
+    """
+    prefix = _event_prefix(event_type)
+    if event_id is not None:
+        prefix = b"id: " + event_id.encode("ascii") + b"\n" + prefix
+    if not payload:
+        return prefix + b"}" + FRAME_END
+    body = dumps(payload)
+    # body is b'{...}' - splice its fields in after the cached type prefix
+    return prefix + b"," + body[1:] + FRAME_END
+
+def encode_data(data: Dict[str, Any]) -> bytes:
+    """Encode an arbitrary JSON object as an SSE frame"""
+    return b"data: " + dumps(data) + FRAME_END
+
+class StreamCursor:
+    """
+    Position of one client in an analysis run's event stream
+
+    Serialized as the SSE event id `<run_id>.<seq>.<delivered>`:
+    - run_id: analysis run the events belong to
+    - seq: monotonically increasing event sequence number
+    - delivered: number of suggestions the client has received
+    """
+
+    def __init__(self, run_id: str, seq: int = 0, delivered: int = 0):
+        self.run_id = run_id
+        self.seq = seq
+        self.delivered = delivered
+
+    @classmethod
+    def resume(cls, run_id: str, last_event_id: Optional[str]) -> "StreamCursor":
+        """
+        Continue from a client's Last-Event-ID, or start fresh
+
+        Tokens from another run or that fail to parse are ignored.
+        """
+        if last_event_id:
+            parts = last_event_id.strip().split(".")
+            if len(parts) == 3 and parts[0] == run_id and parts[1].isdigit() and parts[2].isdigit():
+                return cls(run_id, int(parts[1]), int(parts[2]))
+        return cls(run_id)
+
+    @property
+    def is_resumed(self) -> bool:
+        return self.seq > 0
+
+    def next_id(self, delivered_delta: int = 0) -> str:
+        self.seq += 1
+        self.delivered += delivered_delta
+        return f"{self.run_id}.{self.seq}.{self.delivered}"
+
+@dataclass
+class StreamOptions:
+    """Per-client batching settings for the suggestions stream"""
+    batch_size: int = int(os.getenv("SSE_BATCH_SIZE", "25"))
+    progress_interval_ms: int = int(os.getenv("SSE_PROGRESS_INTERVAL_MS", "250"))
+    progress_every: int = int(os.getenv("SSE_PROGRESS_EVERY", "50"))
+
+    @classmethod
+    def from_query(cls, batch: Optional[int] = None, progress_ms: Optional[int] = None,
+                   progress_items: Optional[int] = None) -> "StreamOptions":
+        """Build options from query parameters, clamped to sane ranges"""
+        options = cls()
+        if batch is not None:
+            options.batch_size = max(1, min(batch, 500))
+        if progress_ms is not None:
+            options.progress_interval_ms = max(0, min(progress_ms, 10000))
+        if progress_items is not None:
+            options.progress_every = max(1, min(progress_items, 5000))
+        return options
+
+class EventBatcher:
+    """
+    Coalesces progress and suggestion events for one stream
+
+    Methods return the frames that are due (possibly none); callers yield them.
+    A batch size of 1 keeps the legacy one `suggestion` event per item.
+    When a cursor is given every frame is stamped with its resume token.
+    """
+
+    def __init__(self, options: Optional[StreamOptions] = None,
+                 cursor: Optional[StreamCursor] = None):
+        self.options = options or StreamOptions()
+        self.cursor = cursor
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_since = 0.0
+        self._last_progress_at = 0.0
+        self._items_since_progress = 0
+        self._last_progress: Optional[Dict[str, Any]] = None
+        self._progress_sent = True
+
+    def _interval_elapsed(self, since: float, now: float) -> bool:
+        return (now - since) * 1000 >= self.options.progress_interval_ms
+
+    def _encode(self, event_type: str, payload: Optional[Dict[str, Any]],
+                suggestion_count: int = 0) -> bytes:
+        event_id = self.cursor.next_id(suggestion_count) if self.cursor else None
+        return encode_event(event_type, payload, event_id)
+
+    def event(self, event_type: str, payload: Optional[Dict[str, Any]] = None) -> bytes:
+        """Encode a one-off event (total, status, complete, error)"""
+        return self._encode(event_type, payload)
+
+    def _flush_suggestions(self) -> List[bytes]:
+        if not self._pending:
+            return []
+        frame = self._encode('suggestions', {'suggestions': self._pending}, len(self._pending))
+        self._pending = []
+        return [frame]
+
+    def add_suggestion(self, suggestion: Dict[str, Any]) -> List[bytes]:
+        """Queue a suggestion, returning any frames that are now due"""
+        if self.options.batch_size <= 1:
+            return [self._encode('suggestion', {'suggestion': suggestion}, 1)]
+        now = time.monotonic()
+        if not self._pending:
+            self._pending_since = now
+        self._pending.append(suggestion)
+        if len(self._pending) >= self.options.batch_size or self._interval_elapsed(self._pending_since, now):
+            return self._flush_suggestions()
+        return []
+
+    def progress(self, payload: Dict[str, Any]) -> List[bytes]:
+        """Record progress, returning frames if a progress event is due"""
+        now = time.monotonic()
+        self._last_progress = payload
+        self._progress_sent = False
+        self._items_since_progress += 1
+        if (self._items_since_progress < self.options.progress_every
+                and not self._interval_elapsed(self._last_progress_at, now)):
+            return []
+        return self._emit_progress(now)
+
+    def _emit_progress(self, now: float) -> List[bytes]:
+        # Send queued suggestions first so the table never lags the counter
+        frames = self._flush_suggestions()
+        frames.append(self._encode('progress', self._last_progress))
+        self._last_progress_at = now
+        self._items_since_progress = 0
+        self._progress_sent = True
+        return frames
+
+    def flush(self) -> List[bytes]:
+        """Emit everything still buffered (call before the final event)"""
+        if self._last_progress is not None and not self._progress_sent:
+            return self._emit_progress(time.monotonic())
+        return self._flush_suggestions()
@@ -0,0 +1,32 @@
+"""
+Shared fixtures for the WaxValue backend tests
+
+Tests run inside a scratch directory so session, job, run log and rate-limit
+state never touches the working tree.
+
+Run from backend/:
+    pytest tests
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Scratch directory for the global stores; this must happen before any backend module is imported
+SCRATCH_DIR = tempfile.mkdtemp(prefix="waxvalue-test-")
+os.environ.setdefault("SESSIONS_DB", os.path.join(SCRATCH_DIR, "sessions.db"))
+os.environ.setdefault("SESSIONS_DIR", os.path.join(SCRATCH_DIR, "sessions"))
+os.environ.setdefault("SESSIONS_LEGACY_FILE", os.path.join(SCRATCH_DIR, "sessions.json"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(SCRATCH_DIR, 'waxvalue.db')}")
+os.environ.setdefault("JOB_REGISTRY_DB", os.path.join(SCRATCH_DIR, "jobs.db"))
+os.environ.setdefault("DISCOGS_RATE_LIMIT_DIR", SCRATCH_DIR)
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    """Path for a fresh SQLite database"""
+    return str(tmp_path / "test.db")
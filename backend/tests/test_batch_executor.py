@@ -0,0 +1,169 @@
+import asyncio
+import threading
+
+import pytest
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+
+from batch_executor import BatchCapacityError, BatchExecutor
+
+def active_runs(executor: BatchExecutor) -> int:
+    return sum(executor.stats()["active"].values())
+
+def test_admission_turns_runs_away_at_capacity():
+    executor = BatchExecutor(workers=1, max_active=2)
+    executor.admit("analysis")
+    executor.admit("bulk_apply")
+
+    with pytest.raises(BatchCapacityError) as error:
+        executor.admit("analysis")
+
+    assert error.value.kind == "analysis"
+    assert error.value.retry_after > 0
+    assert executor.stats()["rejected"] == {"analysis": 1}
+
+def test_release_is_idempotent():
+    executor = BatchExecutor(workers=1, max_active=1)
+    ticket = executor.admit("analysis")
+    ticket.release()
+    ticket.release()
+
+    assert active_runs(executor) == 0
+    # The double release didn't free a slot that was never taken
+    executor.admit("analysis")
+    with pytest.raises(BatchCapacityError):
+        executor.admit("analysis")
+
+def test_run_releases_on_success_and_failure():
+    executor = BatchExecutor(workers=1, max_active=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    assert asyncio.run(executor.run("bulk_apply", lambda x: x * 2, 21)) == 42
+    with pytest.raises(ValueError):
+        asyncio.run(executor.run("bulk_apply", fail))
+    assert active_runs(executor) == 0
+
+def test_submit_admits_up_front_and_holds_the_slot_until_the_work_ends():
+    executor = BatchExecutor(workers=1, max_active=1)
+    release = threading.Event()
+
+    pending = executor.submit("bulk_apply", release.wait, 5)
+    with pytest.raises(BatchCapacityError):
+        executor.submit("bulk_apply", lambda: None)
+    assert active_runs(executor) == 1
+
+    release.set()
+    executor._executor.shutdown(wait=True)
+    assert pending.result() is True
+    assert active_runs(executor) == 0
+
+def test_run_holds_its_slot_until_cancelled_work_finishes():
+    executor = BatchExecutor(workers=1, max_active=1)
+    running = threading.Event()
+    finish = threading.Event()
+
+    def work():
+        running.set()
+        finish.wait(5)
+
+    async def cancel_mid_run():
+        task = asyncio.create_task(executor.run("bulk_apply", work))
+        await asyncio.get_running_loop().run_in_executor(None, running.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_mid_run())
+    # The work is still running on the pool, so its slot stays taken
+    assert active_runs(executor) == 1
+    finish.set()
+    executor._executor.shutdown(wait=True)
+    assert active_runs(executor) == 0
+
+def test_iterate_releases_when_consumer_stops_early():
+    executor = BatchExecutor(workers=1, max_active=1)
+    closed = []
+
+    def items():
+        try:
+            yield from range(10)
+        finally:
+            closed.append(True)
+
+    async def consume():
+        ticket = executor.admit("analysis")
+        stream = executor.iterate(items(), ticket)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(consume()) == 0
+    assert active_runs(executor) == 0
+    executor.shutdown()
+    executor._executor.shutdown(wait=True)
+    assert closed == [True]
+
+def test_iterate_closes_generator_after_consumer_is_cancelled_mid_step():
+    # A free worker could run close() while the step is still executing
+    executor = BatchExecutor(workers=2, max_active=1)
+    stepping = threading.Event()
+    finish_step = threading.Event()
+    closed = threading.Event()
+
+    def items():
+        try:
+            yield "first"
+            stepping.set()
+            finish_step.wait(5)
+            yield "second"
+        finally:
+            closed.set()
+
+    # Keep a reference so only an explicit close (not GC) can run the generator's finally
+    generator = items()
+
+    async def consume():
+        ticket = executor.admit("analysis")
+
+        async def drain():
+            async for _ in executor.iterate(generator, ticket):
+                pass
+
+        task = asyncio.create_task(drain())
+        # The client disconnects while the second step is running on the pool
+        await asyncio.get_running_loop().run_in_executor(None, stepping.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(consume())
+    assert not closed.is_set()
+    finish_step.set()
+
+    assert closed.wait(5)
+    assert generator.gi_frame is None
+    assert active_runs(executor) == 0
+
+def test_stream_that_never_starts_releases_ticket():
+    executor = BatchExecutor(workers=1, max_active=1)
+    ticket = executor.admit("analysis")
+    response = StreamingResponse(executor.iterate(iter(["data: 1\n\n"]), ticket), media_type="text/event-stream",
+                                 background=BackgroundTask(ticket.release))
+
+    async def receive():
+        # The client is gone before the first chunk is sent
+        return {"type": "http.disconnect"}
+
+    sent = []
+
+    async def send(message):
+        # Like uvicorn, sends after a disconnect are dropped
+        sent.append(message["type"])
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+    asyncio.run(response(scope, receive, send))
+
+    assert "http.response.body" not in sent
+    assert active_runs(executor) == 0
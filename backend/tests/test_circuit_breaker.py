@@ -0,0 +1,60 @@
+import time
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+def fail(breaker: CircuitBreaker, times: int):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record(False)
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("inventory", failure_threshold=3, open_seconds=60)
+    fail(breaker, 2)
+    assert breaker.state == CLOSED
+
+    fail(breaker, 1)
+
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+    assert 0 < breaker.retry_in() <= 60
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("inventory", failure_threshold=3)
+    fail(breaker, 2)
+    breaker.allow()
+    breaker.record(True)
+    fail(breaker, 2)
+
+    assert breaker.state == CLOSED
+
+def test_throttled_calls_do_not_count():
+    breaker = CircuitBreaker("inventory", failure_threshold=1)
+    for _ in range(5):
+        assert breaker.allow()
+        breaker.record(None)
+
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+def test_half_open_lets_a_limited_number_of_probes_through():
+    breaker = CircuitBreaker("inventory", failure_threshold=1, open_seconds=0.05, half_open_probes=1)
+    fail(breaker, 1)
+    time.sleep(0.1)
+
+    assert breaker.allow() is True
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is False
+
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow() is True
+
+def test_failed_probe_opens_the_circuit_again():
+    breaker = CircuitBreaker("inventory", failure_threshold=5, open_seconds=0.05)
+    fail(breaker, 5)
+    time.sleep(0.1)
+
+    assert breaker.allow() is True
+    breaker.record(False)
+
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from discogs_scheduler import BATCH, INTERACTIVE, FairScheduler, SchedulerTimeout
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+def queue_batch_calls(scheduler: FairScheduler, calls, granted):
+    """Queue one batch call per (account, label), in order; each records its label when granted"""
+    threads = []
+    for account_key, label in calls:
+        def run(account_key=account_key, label=label):
+            with scheduler.slot(account_key, BATCH, timeout=5):
+                granted.append(label)
+        waiting = scheduler.stats()["batch_waiting"]
+        thread = threading.Thread(target=run)
+        thread.start()
+        wait_for(lambda: scheduler.stats()["batch_waiting"] == waiting + 1)
+        threads.append(thread)
+    return threads
+
+def grant_order(scheduler: FairScheduler, calls):
+    # One batch slot, taken up front so every call queues before any is granted
+    assert scheduler.acquire("holder", BATCH)
+    granted = []
+    threads = queue_batch_calls(scheduler, calls, granted)
+    scheduler.release(BATCH)
+    for thread in threads:
+        thread.join()
+    return granted
+
+def test_batch_slots_round_robin_across_accounts():
+    scheduler = FairScheduler(max_in_flight=2, interactive_slots=1)
+    calls = [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]
+
+    assert grant_order(scheduler, calls) == ["a1", "b1", "a2", "a3"]
+    assert scheduler.stats()["in_flight"] == 0
+
+def test_weight_gives_an_account_more_turns():
+    scheduler = FairScheduler(max_in_flight=2, interactive_slots=1)
+    scheduler.set_weight("a", 2)
+    calls = [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]
+
+    assert grant_order(scheduler, calls) == ["a1", "a2", "b1", "a3"]
+
+def test_interactive_slots_are_reserved_from_batch_work():
+    scheduler = FairScheduler(max_in_flight=2, interactive_slots=1)
+    assert scheduler.acquire("a", BATCH)
+
+    assert scheduler.acquire("b", BATCH, timeout=0.05) is False
+    assert scheduler.stats()["batch_waiting"] == 0
+    assert scheduler.acquire("b", INTERACTIVE, timeout=0.05) is True
+
+def test_interactive_waiters_go_before_batch_waiters():
+    scheduler = FairScheduler(max_in_flight=1, interactive_slots=0)
+    assert scheduler.acquire("holder", INTERACTIVE)
+    granted = []
+    batch = queue_batch_calls(scheduler, [("a", "batch")], granted)
+
+    def interactive():
+        with scheduler.slot("b", INTERACTIVE, timeout=5):
+            granted.append("interactive")
+
+    thread = threading.Thread(target=interactive)
+    thread.start()
+    wait_for(lambda: scheduler.stats()["interactive_waiting"] == 1)
+    scheduler.release(INTERACTIVE)
+    for waiting in batch + [thread]:
+        waiting.join()
+
+    assert granted == ["interactive", "batch"]
+
+def test_slot_raises_on_timeout():
+    scheduler = FairScheduler(max_in_flight=1, interactive_slots=0)
+    assert scheduler.acquire("a", INTERACTIVE)
+
+    with pytest.raises(SchedulerTimeout):
+        with scheduler.slot("b", INTERACTIVE, timeout=0.05):
+            pass
+    assert scheduler.stats()["interactive_waiting"] == 0
@@ -0,0 +1,194 @@
+import asyncio
+import csv
+import io
+import secrets
+import threading
+import time
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from fastapi import HTTPException
+
+import inventory_upload
+import main
+from inventory_upload import apply_price_changes_by_upload, reconcile_price_changes
+from pricing import listing_currency
+
+class FakeUploadClient:
+    """Applies uploaded CSVs to an in-memory inventory; uploads listed in fail_uploads fail"""
+
+    def __init__(self, prices: Dict[int, float], fail_uploads=(), ignore_listings=()):
+        self.prices = dict(prices)
+        self.fail_uploads = set(fail_uploads)
+        self.ignore_listings = set(ignore_listings)
+        self.uploads: List[Dict[int, float]] = []
+        self.updated: List[int] = []
+
+    def upload_inventory_changes(self, csv_bytes: bytes) -> int:
+        rows = csv.DictReader(io.StringIO(csv_bytes.decode("utf-8")))
+        self.uploads.append({int(row["listing_id"]): float(row["price"]) for row in rows})
+        return len(self.uploads)
+
+    def get_inventory_upload(self, upload_id: int) -> Dict[str, Any]:
+        if upload_id in self.fail_uploads:
+            return {"id": upload_id, "status": "failed", "results": "rejected"}
+        for listing_id, price in self.uploads[upload_id - 1].items():
+            if listing_id in self.prices and listing_id not in self.ignore_listings:
+                self.prices[listing_id] = price
+        return {"id": upload_id, "status": "success"}
+
+    def request_inventory_export(self) -> int:
+        return 1
+
+    def get_inventory_export(self, export_id: int) -> Dict[str, Any]:
+        return {"id": export_id, "status": "success"}
+
+    def iter_inventory_export(self, export_id: int) -> Iterator[Dict[str, str]]:
+        for listing_id, price in self.prices.items():
+            yield {"listing_id": str(listing_id), "release_id": "1", "price": f"{price:.2f}"}
+
+    def update_listing_price(self, listing_id: int, price: float):
+        self.updated.append(listing_id)
+        self.prices[listing_id] = price
+        return 200, {}
+
+class GatedClient(FakeUploadClient):
+    """Per-listing updates wait until the gate opens"""
+
+    def __init__(self, prices: Dict[int, float], gate: threading.Event):
+        super().__init__(prices)
+        self.gate = gate
+
+    def update_listing_price(self, listing_id: int, price: float):
+        assert self.gate.wait(5)
+        return super().update_listing_price(listing_id, price)
+
+def new_seller_session(suggestions: List[Dict[str, Any]]) -> str:
+    session_id = secrets.token_urlsafe(16)
+    main.session_manager.set_session(session_id, {
+        "user": {"id": session_id, "username": f"seller-{session_id[:6]}", "email": "seller@example.invalid",
+                 "accessToken": "token", "accessTokenSecret": "secret"},
+        "settings": {},
+        "suggestions": suggestions
+    })
+    return session_id
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(inventory_upload, "INVENTORY_UPLOAD_MAX_ROWS", 2)
+
+def test_uploads_in_chunks_and_verifies_each_listing():
+    client = FakeUploadClient({1: 10.0, 2: 10.0, 3: 10.0})
+    results, leftover = apply_price_changes_by_upload(client, {1: 11.0, 2: 12.0, 3: 13.0})
+
+    assert len(client.uploads) == 2
+    assert leftover == {}
+    assert sorted(r["listingId"] for r in results if r["success"] and r["verified"]) == [1, 2, 3]
+
+def test_only_failed_chunks_are_handed_back():
+    client = FakeUploadClient({1: 10.0, 2: 10.0, 3: 10.0, 4: 10.0}, fail_uploads={2})
+    results, leftover = apply_price_changes_by_upload(client, {1: 11.0, 2: 12.0, 3: 13.0, 4: 14.0})
+
+    assert leftover == {3: 13.0, 4: 14.0}
+    assert sorted(r["listingId"] for r in results) == [1, 2]
+
+def test_unapplied_listings_are_handed_back():
+    client = FakeUploadClient({1: 10.0, 2: 10.0}, ignore_listings={2})
+    results, leftover = apply_price_changes_by_upload(client, {1: 11.0, 2: 12.0, 5: 15.0})
+
+    assert [r["listingId"] for r in results] == [1]
+    # 2 kept its old price, 5 is not in the inventory
+    assert leftover == {2: 12.0, 5: 15.0}
+
+def test_unverifiable_uploads_are_reported_unverified():
+    client = FakeUploadClient({1: 10.0})
+    results, leftover = apply_price_changes_by_upload(client, {1: 11.0}, verify=False)
+
+    assert leftover == {}
+    assert results == [{"listingId": 1, "success": True, "newPrice": 11.0, "verified": False}]
+
+def test_reconcile_only_keeps_changed_listings():
+    inventory = iter([{"id": 1, "price": {"value": 11.0}}, {"id": 2, "price": {"value": 3.0}}])
+    results, leftover = reconcile_price_changes({1: 11.0}, inventory)
+
+    assert results == [{"listingId": 1, "success": True, "newPrice": 11.0, "verified": True}]
+    assert leftover == {}
+
+def test_bulk_apply_falls_back_only_for_unconfirmed_changes(monkeypatch):
+    monkeypatch.setattr(main, "BULK_UPLOAD_MIN_LISTINGS", 2)
+    client = FakeUploadClient({1: 10.0, 2: 10.0, 3: 10.0, 4: 10.0}, fail_uploads={2})
+    results, method = main.apply_price_changes(client, {1: 11.0, 2: 12.0, 3: 13.0, 4: 14.0})
+
+    assert method == "upload+per_listing"
+    assert client.updated == [3, 4]
+    assert all(r["success"] for r in results)
+    assert client.prices == {1: 11.0, 2: 12.0, 3: 13.0, 4: 14.0}
+
+def test_bulk_apply_skips_fallback_when_uploads_succeed(monkeypatch):
+    monkeypatch.setattr(main, "BULK_UPLOAD_MIN_LISTINGS", 2)
+    client = FakeUploadClient({1: 10.0, 2: 10.0})
+    results, method = main.apply_price_changes(client, {1: 11.0, 2: 12.0})
+
+    assert method == "upload"
+    assert client.updated == []
+
+def test_currency_comes_from_the_listing_price():
+    listing = {"id": 1, "price": {"value": 10.0, "currency": "GBP"}}
+    assert listing_currency(listing) == "GBP"
+    fields = dict(listingId=1, releaseId=2, currentPrice=1.0, suggestedPrice=2.0, basis="VG+", status="ok",
+                  strategy="Conservative", condition="VG+", artist="a", title="t", label="l", imageUrl="",
+                  currency="GBP")
+    assert main.PriceSuggestion(**fields).dict()["currency"] == "GBP"
+
+def test_seller_currency_falls_back_to_settings():
+    assert main.seller_currency({}, [{"currency": "EUR"}]) == "EUR"
+    assert main.seller_currency({"settings": {"currency": "AUD"}}, [{}]) == "AUD"
+    assert main.seller_currency({}, []) == "USD"
+
+def test_bulk_apply_runs_in_the_background_and_is_polled(monkeypatch):
+    gate = threading.Event()
+    client = GatedClient({1: 10.0, 2: 10.0}, gate)
+    monkeypatch.setattr(main, "discogs_client_for", lambda user, priority: client)
+    monkeypatch.setattr(main, "BULK_UPLOAD_MIN_LISTINGS", 0)
+    session_id = new_seller_session([{"listingId": 1, "suggestedPrice": 11.0, "currency": "USD"},
+                                     {"listingId": 2, "suggestedPrice": 12.0, "currency": "USD"}])
+    try:
+        # Returns while the Discogs calls are still blocked
+        started = asyncio.run(main.bulk_apply_price_suggestions({"listingIds": [1, 2, 3]}, session_id))
+        assert started["status"] == "running" and started["total"] == 3
+
+        with pytest.raises(HTTPException) as busy:
+            asyncio.run(main.bulk_apply_price_suggestions({"listingIds": [1]}, session_id))
+        assert busy.value.status_code == 409
+        assert asyncio.run(main.get_bulk_apply_status(started["jobId"], session_id))["status"] == "running"
+
+        gate.set()
+        deadline = time.monotonic() + 5
+        while True:
+            status = asyncio.run(main.get_bulk_apply_status(started["jobId"], session_id))
+            if status["status"] != "running":
+                break
+            assert time.monotonic() < deadline, "timed out"
+            time.sleep(0.01)
+
+        assert status["status"] == "completed" and status["processed"] == 3
+        assert (status["result"]["successful_updates"], status["result"]["errors"]) == (2, 1)
+        assert client.prices == {1: 11.0, 2: 12.0}
+        assert main.session_manager.get_session(session_id)["suggestions"] == []
+    finally:
+        gate.set()
+        main.session_manager.delete_session(session_id)
+
+def test_bulk_apply_without_a_lease_is_reported_failed():
+    session_id = new_seller_session([])
+    main.session_manager.update_session_data(session_id, "bulk_apply", {"jobId": "lost", "status": "running",
+                                                                         "processed": 0, "total": 1})
+    try:
+        status = asyncio.run(main.get_bulk_apply_status("lost", session_id))
+        assert status["status"] == "failed"
+
+        with pytest.raises(HTTPException) as missing:
+            asyncio.run(main.get_bulk_apply_status("other", session_id))
+        assert missing.value.status_code == 404
+    finally:
+        main.session_manager.delete_session(session_id)
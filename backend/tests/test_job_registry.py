@@ -0,0 +1,124 @@
+import asyncio
+import secrets
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import job_registry as job_registry_module
+from job_registry import JobRegistry, LeaseHandoff
+
+def test_acquire_is_exclusive_per_account(db_path):
+    registry = JobRegistry(db_path)
+    job = registry.acquire("discogs:1", "session-a")
+
+    assert job is not None
+    assert registry.acquire("discogs:1", "session-b") is None
+    assert registry.acquire("discogs:2", "session-b") is not None
+    assert registry.get_active("discogs:1").job_id == job.job_id
+
+def test_release_frees_the_account(db_path):
+    registry = JobRegistry(db_path)
+    job = registry.acquire("discogs:1", "session-a")
+    registry.release(job)
+
+    assert registry.get_active("discogs:1") is None
+    assert registry.acquire("discogs:1", "session-b") is not None
+
+def test_expired_lease_is_taken_over(db_path):
+    registry = JobRegistry(db_path, lease_seconds=0.05)
+    stale = registry.acquire("discogs:1", "session-a")
+    time.sleep(0.1)
+
+    assert registry.get_active("discogs:1") is None
+    fresh = registry.acquire("discogs:1", "session-b")
+    assert fresh is not None and fresh.job_id != stale.job_id
+    # The stale owner finds out on its next heartbeat, and can't release the new lease
+    assert registry.heartbeat(stale, force=True) is False
+    registry.release(stale)
+    assert registry.is_active(fresh)
+
+def test_heartbeat_extends_lease_and_records_progress(db_path):
+    registry = JobRegistry(db_path, lease_seconds=60)
+    job = registry.acquire("discogs:1", "session-a")
+    expires = job.lease_expires
+
+    assert registry.heartbeat(job, processed=5, total=10, force=True)
+    active = registry.get_active("discogs:1")
+    assert (active.processed, active.total) == (5, 10)
+    assert active.lease_expires >= expires
+
+def test_heartbeat_is_throttled(db_path, monkeypatch):
+    monkeypatch.setattr(job_registry_module, "JOB_HEARTBEAT_SECONDS", 3600)
+    registry = JobRegistry(db_path)
+    job = registry.acquire("discogs:1", "session-a")
+
+    assert registry.heartbeat(job, processed=7)
+    # Progress is kept on the job but not written until the next due heartbeat
+    assert job.processed == 7
+    assert registry.get_active("discogs:1").processed == 0
+
+def test_handoff_releases_lease_of_a_run_that_never_started(db_path):
+    registry = JobRegistry(db_path)
+    job = registry.acquire("discogs:1", "session-a")
+    handoff = LeaseHandoff(registry, job)
+
+    handoff.abandon()
+
+    assert registry.get_active("discogs:1") is None
+    # A run that starts after the response gave up must not do any work
+    assert handoff.start() is False
+
+def test_handoff_leaves_lease_to_a_started_run(db_path):
+    registry = JobRegistry(db_path)
+    job = registry.acquire("discogs:1", "session-a")
+    handoff = LeaseHandoff(registry, job)
+
+    assert handoff.start() is True
+    handoff.abandon()
+
+    assert registry.is_active(job)
+
+def new_analysis_session(main) -> str:
+    session_id = secrets.token_urlsafe(16)
+    main.session_manager.set_session(session_id, {
+        "user": {"id": session_id, "username": f"seller-{session_id[:6]}", "email": "seller@example.invalid",
+                 "accessToken": "token", "accessTokenSecret": "secret"},
+        "settings": {},
+        "suggestions": []
+    })
+    return session_id
+
+def test_non_streaming_analysis_refuses_a_held_lease():
+    import main
+
+    session_id = new_analysis_session(main)
+    account_key = main.analysis_account_key(main.require_auth(session_id))
+    job = main.job_registry.acquire(account_key, "another-session")
+    try:
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(main.get_suggestions(session_id))
+        assert error.value.status_code == 409
+    finally:
+        main.job_registry.release(job)
+        main.session_manager.delete_session(session_id)
+
+def test_non_streaming_analysis_holds_the_lease_while_it_runs(monkeypatch):
+    import main
+
+    session_id = new_analysis_session(main)
+    account_key = main.analysis_account_key(main.require_auth(session_id))
+    held = []
+
+    def fake_analysis(user, session_id, job):
+        held.append(main.job_registry.get_active(account_key).job_id == job.job_id)
+        return {"suggestions": []}
+
+    monkeypatch.setattr(main, "run_suggestions_analysis", fake_analysis)
+    try:
+        assert asyncio.run(main.get_suggestions(session_id)) == {"suggestions": []}
+    finally:
+        main.session_manager.delete_session(session_id)
+
+    assert held == [True]
+    assert main.job_registry.get_active(account_key) is None
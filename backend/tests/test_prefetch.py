@@ -0,0 +1,113 @@
+import threading
+from typing import Any, Dict, List
+
+import main
+from prefetch import (PriceSuggestionPrefetcher, group_listings_by_release, inventory_sort,
+                      iter_release_groups, resolve_order)
+
+def listing(listing_id: int, release_id: int, price: float = 10.0, posted: str = "2024-01-01T00:00:00") -> Dict[str, Any]:
+    return {"id": listing_id, "status": "For Sale", "posted": posted,
+            "price": {"value": price, "currency": "USD"}, "release": {"id": release_id}}
+
+class FakePriceClient:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls: List[int] = []
+        self._lock = threading.Lock()
+
+    def get_price_suggestions(self, release_id: int) -> Dict[str, Any]:
+        with self._lock:
+            self.calls.append(release_id)
+        if release_id in self.failing:
+            raise RuntimeError("boom")
+        return {"Mint (M)": {"value": float(release_id), "currency": "USD"}}
+
+def test_duplicated_order_ranks_by_listing_count():
+    groups = group_listings_by_release([listing(1, 100), listing(2, 200), listing(3, 200), listing(4, 300)])
+    assert [release_id for release_id, _ in groups] == [200, 100, 300]
+
+def test_price_desc_ranks_by_best_listing():
+    groups = group_listings_by_release([listing(1, 100, 5.0), listing(2, 200, 50.0), listing(3, 100, 80.0)],
+                                       "price_desc")
+    assert [(release_id, [l["id"] for l in ls]) for release_id, ls in groups] == [(100, [3, 1]), (200, [2])]
+
+def test_inventory_sort_for_sortable_orders():
+    assert inventory_sort("price_desc") == {"sort": "price", "sort_order": "desc"}
+    assert inventory_sort("stale") == {"sort": "listed", "sort_order": "asc"}
+    assert inventory_sort("recent") == {"sort": "listed", "sort_order": "desc"}
+    assert inventory_sort("duplicated") == {}
+
+def test_resolve_order_falls_back_for_unknown_orders():
+    assert resolve_order("price_desc") == "price_desc"
+    assert resolve_order("bogus") in ("duplicated", "price_desc", "stale", "recent")
+
+def test_server_sorted_pages_keep_priority_across_pages():
+    # Pages as Discogs returns them for sort=price&sort_order=desc
+    listings = sorted((listing(i, 1000 + i % 37, price=float(i % 101)) for i in range(500)),
+                      key=lambda l: l["price"]["value"], reverse=True)
+    pages = [listings[i:i + 100] for i in range(0, len(listings), 100)]
+    best = [ls[0]["price"]["value"] for _, ls in iter_release_groups(pages, "price_desc")]
+
+    assert best == sorted(best, reverse=True)
+
+def test_duplicated_order_ranks_across_pages_before_fetching():
+    events = []
+
+    def pages():
+        for number, page in enumerate([[listing(1, 100), listing(2, 200)], [listing(3, 300), listing(4, 300)],
+                                       [listing(5, 300), listing(6, 200)]]):
+            events.append(f"page {number + 1}")
+            yield page
+
+    class RecordingClient(FakePriceClient):
+        def get_price_suggestions(self, release_id):
+            events.append(f"fetch {release_id}")
+            return super().get_price_suggestions(release_id)
+
+    groups = iter_release_groups(pages(), "duplicated")
+    with PriceSuggestionPrefetcher(RecordingClient(), groups, workers=1, window=1) as prefetcher:
+        results = list(prefetcher.results())
+
+    assert [release_id for release_id, *_ in results] == [300, 200, 100]
+    assert events[:3] == ["page 1", "page 2", "page 3"]
+
+def test_inventory_pages_are_requested_with_the_sort():
+    class PagedClient:
+        def __init__(self):
+            self.requests = []
+
+        def get_user_inventory(self, username, page=1, per_page=100, **sort):
+            self.requests.append((page, sort))
+            return {"pagination": {"page": page, "pages": 3, "items": 300},
+                    "listings": [listing(page * 1000 + i, i) for i in range(100)]}
+
+    client = PagedClient()
+    sort = inventory_sort("price_desc")
+    pages = list(main.iter_user_inventory_pages(client, "seller", sort=sort))
+
+    assert len(pages) == 3
+    assert client.requests == [(1, sort), (2, sort), (3, sort)]
+
+def test_prefetcher_fetches_each_release_once():
+    client = FakePriceClient()
+    pages = [[listing(1, 100), listing(2, 200)], [listing(3, 100), listing(4, 300)]]
+    # A per-page order, so release 100 reaches the prefetcher once per page
+    groups = iter_release_groups(pages, "price_desc")
+    with PriceSuggestionPrefetcher(client, groups, workers=2, window=2) as prefetcher:
+        results = list(prefetcher.results())
+
+    assert sorted(client.calls) == [100, 200, 300]
+    assert prefetcher.fetches == 3
+    priced = sorted(l["id"] for _, ls, suggestions, _ in results if suggestions for l in ls)
+    assert priced == [1, 2, 3, 4]
+    # The second copy of release 100 needed no fetch of its own
+    assert any(release_id == 100 and from_cache for release_id, _, _, from_cache in results)
+
+def test_prefetcher_reports_failed_fetches():
+    client = FakePriceClient(failing={200})
+    groups = [(100, [listing(1, 100)]), (200, [listing(2, 200)])]
+    with PriceSuggestionPrefetcher(client, groups) as prefetcher:
+        results = {release_id: suggestions for release_id, _, suggestions, _ in prefetcher.results()}
+
+    assert results[100] is not None
+    assert results[200] is None
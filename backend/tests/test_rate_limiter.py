@@ -0,0 +1,51 @@
+import multiprocessing
+
+from discogs_client import TokenBucketRateLimiter
+
+def spend_tokens(db_path: str, count: int):
+    limiter = TokenBucketRateLimiter("user-1", capacity=10, refill_rate=0.001, db_path=db_path)
+    for _ in range(count):
+        assert limiter.acquire_token(timeout=0)
+
+def test_bucket_is_shared_across_processes(db_path):
+    worker = multiprocessing.get_context("spawn").Process(target=spend_tokens, args=(db_path, 6))
+    worker.start()
+    worker.join(30)
+    assert worker.exitcode == 0
+
+    limiter = TokenBucketRateLimiter("user-1", capacity=10, refill_rate=0.001, db_path=db_path)
+    assert 3.9 < limiter.tokens < 4.1
+    for _ in range(4):
+        assert limiter.acquire_token(timeout=0)
+    assert limiter.acquire_token(timeout=0) is False
+
+def test_instances_for_the_same_key_share_the_budget(db_path):
+    first = TokenBucketRateLimiter("user-1", capacity=2, refill_rate=0.001, db_path=db_path)
+    second = TokenBucketRateLimiter("user-1", capacity=2, refill_rate=0.001, db_path=db_path)
+
+    assert first.acquire_token(timeout=0)
+    assert second.acquire_token(timeout=0)
+    assert first.acquire_token(timeout=0) is False
+    assert second.acquire_token(timeout=0) is False
+
+def test_accounts_have_separate_buckets(db_path):
+    first = TokenBucketRateLimiter("user-1", capacity=1, refill_rate=0.001, db_path=db_path)
+    second = TokenBucketRateLimiter("user-2", capacity=1, refill_rate=0.001, db_path=db_path)
+
+    assert first.acquire_token(timeout=0)
+    assert second.acquire_token(timeout=0)
+
+def test_reserve_leaves_headroom(db_path):
+    limiter = TokenBucketRateLimiter("user-1", capacity=3, refill_rate=0.001, db_path=db_path)
+
+    assert limiter.acquire_token(timeout=0, reserve=1)
+    assert limiter.acquire_token(timeout=0, reserve=1)
+    assert limiter.acquire_token(timeout=0, reserve=1) is False
+    # The reserved token is still there for a call without a reserve
+    assert limiter.acquire_token(timeout=0)
+
+def test_waits_for_refill(db_path):
+    limiter = TokenBucketRateLimiter("user-1", capacity=1, refill_rate=20.0, db_path=db_path)
+
+    assert limiter.acquire_token(timeout=0)
+    assert limiter.acquire_token(timeout=1.0)
@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+import requests
+
+import retry_policy
+from retry_policy import RetryBudget, RetryPolicy
+
+class FakeResponse:
+    def __init__(self, status_code: int, retry_after: str = None):
+        self.status_code = status_code
+        self.headers = {"Retry-After": retry_after} if retry_after is not None else {}
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record sleeps instead of taking them"""
+    taken = []
+    monkeypatch.setattr(retry_policy.time, "sleep", taken.append)
+    return taken
+
+def attempts(*results):
+    """attempt() callable returning (or raising) each result in turn"""
+    remaining = list(results)
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        result = remaining.pop(0)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    attempt.calls = calls
+    return attempt
+
+def test_retries_5xx_until_success(sleeps):
+    attempt = attempts(FakeResponse(503), FakeResponse(502), FakeResponse(200))
+    response = RetryPolicy(base_delay=0.01).run(attempt)
+
+    assert response.status_code == 200
+    assert len(attempt.calls) == 3
+    assert len(sleeps) == 2
+
+def test_final_status_is_not_retried(sleeps):
+    attempt = attempts(FakeResponse(404))
+
+    assert RetryPolicy().run(attempt).status_code == 404
+    assert sleeps == []
+
+def test_gives_up_after_max_attempts(sleeps):
+    attempt = attempts(*[FakeResponse(500)] * 3)
+    response = RetryPolicy(max_attempts=3, base_delay=0.01).run(attempt)
+
+    assert response.status_code == 500
+    assert len(attempt.calls) == 3
+
+def test_long_retry_after_is_capped_not_fatal(sleeps):
+    # Discogs commonly answers 429 with Retry-After: 60
+    attempt = attempts(FakeResponse(429, "60"), FakeResponse(200))
+    policy = RetryPolicy(max_delay=30, deadline=120)
+
+    assert policy.run(attempt).status_code == 200
+    assert sleeps == [30]
+
+def test_retry_after_is_capped_by_the_deadline(sleeps):
+    attempt = attempts(FakeResponse(429, "60"), FakeResponse(200))
+    policy = RetryPolicy(max_delay=30, deadline=10, min_attempt_seconds=1)
+
+    assert policy.run(attempt).status_code == 200
+    assert 8.9 < sleeps[0] <= 9
+
+def test_no_retry_without_time_for_another_attempt(sleeps):
+    attempt = attempts(FakeResponse(429, "5"))
+    policy = RetryPolicy(deadline=0.5, min_attempt_seconds=1)
+
+    assert policy.run(attempt).status_code == 429
+    assert sleeps == []
+
+def test_retry_after_sets_a_minimum_delay(sleeps):
+    attempt = attempts(FakeResponse(429, "2"), FakeResponse(200))
+    RetryPolicy(base_delay=0.01, deadline=60).run(attempt)
+
+    assert sleeps == [2]
+
+def test_non_idempotent_requests_only_retry_safe_failures(sleeps):
+    policy = RetryPolicy(base_delay=0.01)
+
+    assert policy.run(attempts(FakeResponse(503)), idempotent=False).status_code == 503
+    assert policy.run(attempts(FakeResponse(429), FakeResponse(201)), idempotent=False).status_code == 201
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        policy.run(attempts(requests.exceptions.ReadTimeout()), idempotent=False)
+    # The connection was never established, so Discogs never saw the request
+    assert policy.run(attempts(requests.exceptions.ConnectTimeout(), FakeResponse(201)),
+                      idempotent=False).status_code == 201
+
+def test_connection_errors_are_raised_once_retries_run_out(sleeps):
+    attempt = attempts(*[requests.exceptions.ConnectionError()] * 2)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        RetryPolicy(max_attempts=2, base_delay=0.01).run(attempt)
+    assert len(attempt.calls) == 2
+
+def test_retry_budget_limits_retries(sleeps):
+    budget = RetryBudget(ratio=0.0, minimum=1)
+    policy = RetryPolicy(base_delay=0.01)
+
+    assert policy.run(attempts(FakeResponse(500), FakeResponse(200)), budget=budget).status_code == 200
+    # The budget is spent: the next failure is returned without a retry
+    assert policy.run(attempts(FakeResponse(500)), budget=budget).status_code == 500
+    assert len(sleeps) == 1
+
+def test_retry_budget_refills_with_traffic():
+    budget = RetryBudget(ratio=0.5, minimum=0)
+    assert budget.withdraw() is False
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw() is True
+
+def test_on_retry_reports_reason_and_delay(sleeps):
+    retries = []
+    RetryPolicy(deadline=60).run(attempts(FakeResponse(429, "3"), FakeResponse(200)),
+                                 on_retry=lambda reason, delay: retries.append((reason, delay)))
+
+    assert retries == [("429", 3)]
+
+def test_run_async_awaits_between_attempts(monkeypatch):
+    slept = []
+
+    async def fake_sleep(delay):
+        slept.append(delay)
+
+    monkeypatch.setattr(retry_policy.asyncio, "sleep", fake_sleep)
+    sync_attempt = attempts(FakeResponse(429, "45"), FakeResponse(200))
+
+    async def attempt(timeout):
+        return sync_attempt(timeout)
+
+    response = asyncio.run(RetryPolicy(max_delay=30, deadline=120).run_async(attempt))
+    assert response.status_code == 200
+    assert slept == [30]
+
+def test_throttled_interactive_call_does_not_block_the_event_loop(monkeypatch):
+    import secrets
+    import time
+
+    import main
+
+    class BackingOffClient:
+        def get_user_info(self):
+            # A sync client call waiting out a Retry-After
+            time.sleep(0.3)
+            return {"username": "tester", "avatar_url": None}
+
+    monkeypatch.setattr(main, "discogs_client_for", lambda user, lane=None: BackingOffClient())
+    session_id = secrets.token_urlsafe(16)
+    main.session_manager.set_session(session_id, {
+        "user": {"id": session_id, "username": "tester", "email": "tester@example.invalid",
+                 "accessToken": "token", "accessTokenSecret": "secret"}
+    })
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        profile = await main.get_user_profile(session_id)
+        ticking.cancel()
+        return profile, ticks
+
+    try:
+        profile, ticks = asyncio.run(run())
+    finally:
+        main.session_manager.delete_session(session_id)
+    assert profile["username"] == "tester"
+    assert ticks >= 10
@@ -0,0 +1,150 @@
+import itertools
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+
+from models import SessionLocal
+from models.logs import ListingSnapshot
+from models.user import UserSettings
+from run_log_store import RunLogStore
+
+_discogs_ids = itertools.count(900000)
+
+@pytest.fixture
+def store() -> RunLogStore:
+    return RunLogStore()
+
+@pytest.fixture
+def user() -> SimpleNamespace:
+    discogs_user_id = next(_discogs_ids)
+    return SimpleNamespace(id=f"session-{discogs_user_id}", discogsUserId=discogs_user_id,
+                           username=f"seller-{discogs_user_id}")
+
+def record_runs(store, user, count, run_date=None):
+    return [store.record(user, {"runDate": run_date or datetime.now(), "status": "completed",
+                                "itemsScanned": index, "action": "bulk_apply"})
+            for index in range(count)]
+
+def test_pages_are_newest_first_and_cover_every_run(store, user):
+    runs = record_runs(store, user, 7)
+
+    seen = []
+    cursor = None
+    while True:
+        page = store.list_runs(user, limit=3, cursor=cursor)
+        assert len(page["logs"]) <= 3
+        seen.extend(entry["id"] for entry in page["logs"])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+
+    assert seen == [run["id"] for run in reversed(runs)]
+    assert store.list_runs(user, limit=3)["logs"][0]["action"] == "bulk_apply"
+
+def test_last_full_page_has_no_next_cursor(store, user):
+    record_runs(store, user, 4)
+
+    first = store.list_runs(user, limit=2)
+    second = store.list_runs(user, limit=2, cursor=first["nextCursor"])
+
+    assert first["nextCursor"] is not None
+    assert len(second["logs"]) == 2 and second["nextCursor"] is None
+
+def test_runs_are_per_user(store, user):
+    other = SimpleNamespace(id="other", discogsUserId=next(_discogs_ids), username="other-seller")
+    record_runs(store, user, 2)
+    record_runs(store, other, 1)
+
+    assert len(store.list_runs(user)["logs"]) == 2
+    assert len(store.list_runs(other)["logs"]) == 1
+
+def test_login_users_are_keyed_on_email_not_username(store):
+    john_a = SimpleNamespace(id="session-a", discogsUserId=None, username="john", email="john@a.example")
+    john_b = SimpleNamespace(id="session-b", discogsUserId=None, username="john", email="john@b.example")
+    record_runs(store, john_a, 2)
+    record_runs(store, john_b, 1)
+
+    assert len(store.list_runs(john_a)["logs"]) == 2
+    assert len(store.list_runs(john_b)["logs"]) == 1
+    # Same email in a new session (and a fresh store) is the same owner
+    again = SimpleNamespace(id="session-c", discogsUserId=None, username="john", email="John@A.example")
+    assert len(RunLogStore().list_runs(again)["logs"]) == 2
+
+def test_login_user_named_like_a_discogs_user_gets_own_history(store, user):
+    record_runs(store, user, 2)
+    namesake = SimpleNamespace(id="session-x", discogsUserId=None, username=user.username,
+                               email=f"{user.username}@mail.example")
+
+    assert store.list_runs(namesake)["logs"] == []
+
+def test_users_without_email_are_keyed_on_session_user(store):
+    first = SimpleNamespace(id="session-no-email-1", discogsUserId=None, username=None, email=None)
+    second = SimpleNamespace(id="session-no-email-2", discogsUserId=None, username=None, email=None)
+    record_runs(store, first, 1)
+
+    assert store.list_runs(second)["logs"] == []
+
+def test_malformed_cursor_is_rejected(store, user):
+    with pytest.raises(ValueError):
+        store.list_runs(user, cursor="not-a-cursor")
+
+def test_items_page_in_order_and_only_for_the_owner(store, user):
+    items = [{"listingId": listing_id, "decision": "applied", "currentPrice": 10, "newPrice": 12.5}
+             for listing_id in range(5)]
+    run = store.record(user, {"status": "completed", "itemsUpdated": 5}, items)
+
+    first = store.list_items(user, int(run["id"]), limit=3)
+    second = store.list_items(user, int(run["id"]), limit=3, cursor=first["nextCursor"])
+
+    assert [item["listingId"] for item in first["items"] + second["items"]] == list(range(5))
+    assert second["nextCursor"] is None
+    assert first["items"][0]["newPrice"] == 12.5 and first["items"][0]["success"] is True
+    other = SimpleNamespace(id="other", discogsUserId=next(_discogs_ids), username="someone-else")
+    assert store.list_items(other, int(run["id"])) is None
+
+def test_sweep_deletes_runs_past_each_users_retention(store, user):
+    short_retention = SimpleNamespace(id="short", discogsUserId=next(_discogs_ids), username="short-retention")
+    now = datetime.now()
+    old = now - timedelta(days=30)
+    record_runs(store, user, 2, run_date=old)
+    recent = record_runs(store, user, 1, run_date=now)
+    record_runs(store, short_retention, 2, run_date=old)
+    kept = store.record(short_retention, {"runDate": now - timedelta(days=1), "status": "completed"},
+                        [{"listingId": 1, "decision": "applied"}])
+    expired = store.record(short_retention, {"runDate": old, "status": "completed"},
+                           [{"listingId": 2, "decision": "applied"}])
+    db = SessionLocal()
+    try:
+        db.add(UserSettings(user_id=int(kept["userId"]), log_retention_days=7))
+        db.commit()
+    finally:
+        db.close()
+
+    assert store.sweep(batch_size=1, now=now) >= 3
+
+    # The default retention (90 days) keeps every run of the first user
+    assert len(store.list_runs(user)["logs"]) == 3
+    assert store.list_runs(user)["logs"][0]["id"] == recent[0]["id"]
+    assert [entry["id"] for entry in store.list_runs(short_retention)["logs"]] == [kept["id"]]
+    # Snapshots go with their run
+    db = SessionLocal()
+    try:
+        for run, count in ((expired, 0), (kept, 1)):
+            query = select(func.count()).where(ListingSnapshot.run_log_id == int(run["id"]))
+            assert db.execute(query).scalar() == count
+    finally:
+        db.close()
+
+def test_session_log_import_is_all_or_nothing(store, user):
+    logs = [{"status": "completed", "results": [{"listingId": 1, "success": True}]},
+            {"status": "completed", "results": [{"success": True}]}]
+
+    with pytest.raises(KeyError):
+        store.import_session_logs(user, logs)
+    assert store.list_runs(user)["logs"] == []
+
+    logs[1]["results"][0]["listingId"] = 2
+    assert store.import_session_logs(user, logs) == 2
+    assert len(store.list_runs(user)["logs"]) == 2
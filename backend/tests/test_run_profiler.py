@@ -0,0 +1,80 @@
+import time
+
+import run_profiler
+from discogs_client import DiscogsClient, RequestStats
+from run_profiler import RssSampler, RunProfiler
+
+def test_run_stats_view_counts_only_its_own_requests():
+    pooled = DiscogsClient("key", "secret", "token", "token-secret", account_id=1)
+    run_view = pooled.with_run_stats()
+    profiler = RunProfiler(run_view)
+
+    # Concurrent work on the pooled client (e.g. bulk apply) is not part of the run
+    pooled.stats.add(calls=5, bytes_received=5000)
+    run_view.stats.add(calls=2, bytes_received=300, token_wait_seconds=1.5)
+    profile = profiler.finish()["profile"]
+
+    assert profile["apiCalls"] == 2
+    assert profile["bytesReceived"] == 300
+    assert profile["rateLimitWaitSeconds"] == 1.5
+    # The pooled client's totals still include the run's requests
+    assert pooled.stats.snapshot()["calls"] == 7
+    assert run_view.session is pooled.session
+    assert run_view.rate_limiter is pooled.rate_limiter
+
+def test_request_stats_feed_their_parent():
+    parent = RequestStats()
+    child = RequestStats(parent=parent)
+    child.add(calls=1, errors=1)
+
+    assert parent.snapshot()["calls"] == 1
+    assert parent.snapshot()["errors"] == 1
+
+def test_phases_do_not_double_count_nested_time():
+    profiler = RunProfiler()
+    with profiler.phase("price_fetch"):
+        time.sleep(0.02)
+        with profiler.phase("persist"):
+            time.sleep(0.05)
+    phases = profiler.finish()["profile"]["phases"]
+
+    assert phases["persist"] >= 0.05
+    assert phases["price_fetch"] < 0.05
+
+def test_cache_hit_rate():
+    profiler = RunProfiler()
+    for cache_hit in (True, True, False, True):
+        profiler.record_item(cache_hit)
+    profile = profiler.finish()["profile"]
+
+    assert profile["itemsProcessed"] == 4
+    assert profile["cacheHitRate"] == 0.75
+
+def test_rss_peak_is_measured_during_the_run(monkeypatch):
+    readings = iter([100 << 20, 300 << 20, 150 << 20])
+    last = [None]
+
+    def fake_rss():
+        last[0] = next(readings, last[0])
+        return last[0]
+
+    monkeypatch.setattr(run_profiler, "current_rss_bytes", fake_rss)
+    sampler = RssSampler(interval=3600)
+    sampler.sample()
+    sampler.stop()
+
+    assert sampler.start_bytes == 100 << 20
+    assert sampler.peak_bytes == 300 << 20
+
+def test_memory_profile_is_per_run():
+    profile = RunProfiler(trace_memory=False).finish()["profile"]
+    if profile["memorySource"] == "unavailable":
+        assert profile["peakMemoryMb"] is None
+    else:
+        assert profile["memorySource"] == "rss_sampled"
+        assert profile["peakMemoryMb"] > 0
+        assert 0 <= profile["memoryGrowthMb"] <= profile["peakMemoryMb"]
+
+def test_finish_is_idempotent():
+    profiler = RunProfiler()
+    assert profiler.finish() is profiler.finish()
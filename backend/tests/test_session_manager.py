@@ -0,0 +1,197 @@
+import asyncio
+import os
+import secrets
+import threading
+import time
+
+from session_manager import SessionManager
+
+def make_manager(db_path, **kwargs) -> SessionManager:
+    kwargs.setdefault("sync_ms", 0)
+    return SessionManager(db_path, sessions_dir=None, legacy_file=None, **kwargs)
+
+def test_key_updates_from_two_workers_merge(db_path):
+    first = make_manager(db_path, durability="sync")
+    second = make_manager(db_path, durability="sync")
+    first.set_session("s1", {"a": 1, "b": 1})
+    second.get_session("s1")
+
+    first.update_session_data("s1", "a", 2)
+    second.update_session_data("s1", "b", 2)
+
+    assert make_manager(db_path).get_session("s1") == {"a": 2, "b": 2}
+    # The second worker adopted the merged row rather than keeping its own stale copy
+    assert second.get_session("s1") == {"a": 2, "b": 2}
+
+def test_sync_drops_sessions_written_by_another_worker(db_path):
+    reader = make_manager(db_path)
+    writer = make_manager(db_path, durability="sync")
+    writer.set_session("s1", {"value": 1})
+    assert reader.get_session("s1") == {"value": 1}
+
+    writer.update_session_data("s1", "value", 2)
+
+    assert reader.get_session("s1") == {"value": 2}
+    assert reader.stats()["invalidations"] == 1
+
+def test_lru_keeps_at_most_cache_size_sessions(db_path):
+    manager = make_manager(db_path, durability="sync", cache_size=2)
+    for session_id in ("s1", "s2", "s3"):
+        manager.set_session(session_id, {"id": session_id})
+
+    assert list(manager.sessions) == ["s2", "s3"]
+    # Evicted sessions are read back from the database
+    assert manager.get_session("s1") == {"id": "s1"}
+    assert list(manager.sessions) == ["s3", "s1"]
+
+def test_idle_sessions_are_dropped(db_path):
+    manager = make_manager(db_path, durability="sync", idle_seconds=0.05)
+    manager.set_session("s1", {"id": "s1"})
+    time.sleep(0.1)
+    manager.set_session("s2", {"id": "s2"})
+
+    assert list(manager.sessions) == ["s2"]
+
+def test_flusher_coalesces_deferred_writes(db_path):
+    manager = make_manager(db_path, durability="deferred", write_delay_ms=50)
+    manager.set_session("s1", {"count": 0})
+    for count in range(1, 11):
+        manager.update_session_data("s1", "count", count)
+    assert make_manager(db_path).get_session("s1") is None
+
+    deadline = time.monotonic() + 5
+    while manager.stats()["dirty"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert make_manager(db_path).get_session("s1") == {"count": 10}
+    assert manager.stats()["writes"] == 1
+    manager.close()
+
+def test_close_flushes_dirty_sessions(db_path):
+    manager = make_manager(db_path, durability="deferred", write_delay_ms=60000)
+    manager.set_session("s1", {"value": 1})
+    manager.close()
+
+    assert make_manager(db_path).get_session("s1") == {"value": 1}
+
+def test_database_read_does_not_hold_the_lock(db_path):
+    manager = make_manager(db_path, durability="sync")
+    manager.set_session("cached", {"value": 1})
+    manager.set_session("slow", {"value": 2})
+    manager._forget("slow")
+
+    reading = threading.Event()
+    release = threading.Event()
+    fetch = manager._fetch
+
+    def slow_fetch(session_id):
+        reading.set()
+        release.wait(5)
+        return fetch(session_id)
+
+    manager._fetch = slow_fetch
+    reader = threading.Thread(target=manager.get_session, args=("slow",))
+    reader.start()
+    try:
+        assert reading.wait(5)
+        started = time.monotonic()
+        assert manager.get_session("cached") == {"value": 1}
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        reader.join()
+    assert manager.get_session("slow") == {"value": 2}
+
+def test_read_racing_a_sync_is_not_cached(db_path):
+    manager = make_manager(db_path, durability="sync")
+    writer = make_manager(db_path, durability="sync")
+    writer.set_session("s1", {"value": 1})
+    fetch = manager._fetch
+
+    def fetch_then_another_worker_writes(session_id):
+        stored = fetch(session_id)
+        writer.update_session_data(session_id, "value", 2)
+        manager._sync(force=True)
+        return stored
+
+    manager._fetch = fetch_then_another_worker_writes
+    assert manager.get_session("s1") == {"value": 1}
+    manager._fetch = fetch
+
+    assert "s1" not in manager.sessions
+    assert manager.get_session("s1") == {"value": 2}
+
+def test_reload_never_replaces_a_newer_copy(db_path):
+    manager = make_manager(db_path, durability="sync")
+    manager.set_session("s1", {"value": 1})
+    manager.update_session_data("s1", "value", 2)
+    manager._fetch = lambda session_id: ({"value": 1}, 1)
+
+    assert manager.reload_session("s1") == {"value": 2}
+
+def test_created_strategy_is_persisted():
+    import main
+
+    session_id = secrets.token_urlsafe(16)
+    main.session_manager.set_session(session_id, {
+        "user": {"id": session_id, "username": "tester", "email": "tester@example.invalid"},
+        "strategies": [],
+        "settings": {},
+        "logs": []
+    }, durable=True)
+    created = asyncio.run(main.create_strategy({
+        "name": "Aggressive", "description": "Undercut", "scarcityBoost": 0,
+        "offset": -5, "offsetType": "percentage"
+    }, session_id))
+    main.session_manager.flush()
+
+    stored = make_manager(os.environ["SESSIONS_DB"]).get_session(session_id)
+    assert [strategy["id"] for strategy in stored["strategies"]] == [created["strategy"]["id"]]
+    main.session_manager.delete_session(session_id)
+
+def test_popped_key_is_handed_out_once(db_path):
+    first = make_manager(db_path, durability="sync")
+    second = make_manager(db_path, durability="sync")
+    first.set_session("s1", {"logs": [1, 2], "other": 1})
+    second.get_session("s1")
+
+    assert first.pop_session_data("s1", "logs") == [1, 2]
+    assert second.pop_session_data("s1", "logs", []) == []
+
+    assert second.get_session("s1") == {"other": 1}
+    assert make_manager(db_path).get_session("s1") == {"other": 1}
+
+def test_session_logs_are_imported_once_by_concurrent_callers(monkeypatch):
+    import main
+
+    session_id = secrets.token_urlsafe(16)
+    main.session_manager.set_session(session_id, {
+        "user": {"id": session_id, "username": "tester", "email": f"{session_id}@example.invalid"},
+        "settings": {},
+        "logs": [{"status": "completed", "itemsScanned": index} for index in range(3)]
+    }, durable=True)
+    user = main.require_auth(session_id)
+    start = threading.Barrier(4)
+    store_import = main.run_log_store.import_session_logs
+
+    def slow_import(user, logs):
+        # Keep the import in progress while the other callers look at the session
+        time.sleep(0.1)
+        return store_import(user, logs)
+
+    monkeypatch.setattr(main.run_log_store, "import_session_logs", slow_import)
+
+    def import_logs():
+        start.wait()
+        main.import_session_logs(user, session_id)
+
+    threads = [threading.Thread(target=import_logs) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert len(main.run_log_store.list_runs(user)["logs"]) == 3
+        assert not main.session_manager.get_session(session_id).get("logs")
+    finally:
+        main.session_manager.delete_session(session_id)
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import secrets
+
+from sse import EventBatcher, StreamCursor, StreamOptions, encode_event
+
+def parse(frame: bytes) -> dict:
+    """Event id and decoded data of one SSE frame"""
+    assert frame.endswith(b"\n\n")
+    event = {}
+    for line in frame.decode("utf-8").strip().split("\n"):
+        field, _, value = line.partition(": ")
+        event[field] = json.loads(value) if field == "data" else value
+    return event
+
+def test_encode_event_puts_type_first():
+    frame = encode_event("progress", {"current": 3, "total": 10}, event_id="run.1.0")
+
+    assert frame == b'id: run.1.0\ndata: {"type":"progress","current":3,"total":10}\n\n'
+    assert encode_event("complete") == b'data: {"type":"complete"}\n\n'
+
+def test_suggestions_are_sent_in_batches():
+    batcher = EventBatcher(StreamOptions(batch_size=3, progress_interval_ms=60000, progress_every=1000))
+    frames = []
+    for index in range(7):
+        frames += batcher.add_suggestion({"listingId": index})
+    frames += batcher.flush()
+
+    batches = [parse(frame)["data"]["suggestions"] for frame in frames]
+    assert [[s["listingId"] for s in batch] for batch in batches] == [[0, 1, 2], [3, 4, 5], [6]]
+
+def test_batch_size_one_keeps_one_event_per_suggestion():
+    batcher = EventBatcher(StreamOptions(batch_size=1))
+
+    frames = batcher.add_suggestion({"listingId": 1})
+
+    assert [parse(frame)["data"] for frame in frames] == [{"type": "suggestion", "suggestion": {"listingId": 1}}]
+
+def test_progress_is_throttled_and_flushes_queued_suggestions_first():
+    batcher = EventBatcher(StreamOptions(batch_size=100, progress_interval_ms=60000, progress_every=5))
+    # The first progress event is due at once (nothing has been sent yet)
+    assert len(batcher.progress({"current": 0})) == 1
+
+    frames = []
+    for current in range(1, 6):
+        frames += batcher.add_suggestion({"listingId": current})
+        frames += batcher.progress({"current": current})
+
+    assert [parse(frame)["data"]["type"] for frame in frames] == ["suggestions", "progress"]
+    assert parse(frames[1])["data"]["current"] == 5
+    # The last progress is sent by flush() even if it was throttled
+    batcher.progress({"current": 6})
+    assert [parse(frame)["data"]["current"] for frame in batcher.flush()] == [6]
+
+def test_cursor_resumes_only_from_its_own_run():
+    assert StreamCursor.resume("run1", "run1.4.30").delivered == 30
+    assert StreamCursor.resume("run1", "run1.4.30").is_resumed
+    for token in (None, "", "run2.4.30", "run1.4", "run1.x.30", "garbage"):
+        cursor = StreamCursor.resume("run1", token)
+        assert (cursor.seq, cursor.delivered) == (0, 0) and not cursor.is_resumed
+
+def test_event_ids_count_delivered_suggestions():
+    batcher = EventBatcher(StreamOptions(batch_size=2, progress_interval_ms=60000), StreamCursor("run1"))
+
+    ids = [parse(frame)["id"] for frame in
+           [batcher.event("total", {"total": 3})]
+           + batcher.add_suggestion({"listingId": 1}) + batcher.add_suggestion({"listingId": 2})
+           + batcher.add_suggestion({"listingId": 3}) + batcher.flush()]
+
+    assert ids == ["run1.1.0", "run1.2.2", "run1.3.3"]
+
+def test_stream_resumes_after_last_event_id():
+    import main
+
+    session_id = secrets.token_urlsafe(16)
+    main.session_manager.set_session(session_id, {
+        "user": {"id": session_id, "username": "tester", "email": "tester@example.invalid",
+                 "accessToken": "token", "accessTokenSecret": "secret"},
+        "settings": {},
+        "suggestions": [{"listingId": listing_id} for listing_id in range(5)],
+        "analysis_complete": True,
+        "analysis_run_id": "run1"
+    })
+
+    async def drain(last_event_id):
+        response = await main.get_suggestions_stream(session_id=session_id, batch=10, progress_ms=None,
+                                                     progress_items=None, order=None, last_event_id=last_event_id)
+        return [parse(frame) async for frame in response.body_iterator]
+
+    try:
+        events = asyncio.run(drain("run1.2.3"))
+        stale_run = asyncio.run(drain("run0.2.3"))
+    finally:
+        main.session_manager.delete_session(session_id)
+
+    sent = [s["listingId"] for event in events if event["data"]["type"] == "suggestions"
+            for s in event["data"]["suggestions"]]
+    assert sent == [3, 4]
+    assert events[-1]["data"] == {"type": "complete", "totalItems": 5, "suggestionCount": 5}
+    assert events[-1]["id"].startswith("run1.")
+    # A token from another run starts over
+    assert len(stale_run[1]["data"]["suggestions"]) == 5
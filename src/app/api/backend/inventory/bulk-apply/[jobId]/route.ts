@@ -0,0 +1,38 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { buildBackendUrl } from '@/lib/api-config'
+import { withSecurity } from '@/lib/api-security'
+
+async function handleBulkApplyStatus(
+  request: NextRequest,
+  { params }: { params: Promise<{ jobId: string }> }
+) {
+  try {
+    const { searchParams } = new URL(request.url)
+    const sessionId = searchParams.get('session_id')
+    const { jobId } = await params
+    
+    if (!sessionId) {
+      return NextResponse.json({ error: 'Session ID required' }, { status: 401 })
+    }
+    
+    const response = await fetch(buildBackendUrl(`inventory/bulk-apply/${jobId}?session_id=${sessionId}`), {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    })
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}))
+      return NextResponse.json(errorData, { status: response.status })
+    }
+
+    const data = await response.json()
+    return NextResponse.json(data)
+  } catch (error) {
+    console.error('API route error:', error)
+    return NextResponse.json({ error: 'Failed to get bulk apply status' }, { status: 500 })
+  }
+}
+
+export const GET = withSecurity(handleBulkApplyStatus, { allowPublic: false })
@@ -30,7 +30,7 @@ async function handleBulkApply(request: NextRequest) {
     }
 
     const data = await response.json()
-    return NextResponse.json(data)
+    return NextResponse.json(data, { status: response.status })
   } catch (error) {
     console.error('API route error:', error)
     return NextResponse.json(
@@ -15,11 +15,27 @@ async function handleStream(request: NextRequest) {
       )
     }
     
-    const response = await fetch(buildBackendUrl(`inventory/suggestions/stream?session_id=${sessionId}`), {
+    // Forward optional per-client batching and ordering parameters
+    const backendParams = new URLSearchParams({ session_id: sessionId })
+    for (const param of ['batch', 'progress_ms', 'progress_items', 'order']) {
+      const value = searchParams.get(param)
+      if (value) {
+        backendParams.set(param, value)
+      }
+    }
+    
+    const headers: Record<string, string> = {
+      'Accept': 'text/event-stream',
+    }
+    // Pass the resume token through so reconnects only receive new events
+    const lastEventId = request.headers.get('last-event-id')
+    if (lastEventId) {
+      headers['Last-Event-ID'] = lastEventId
+    }
+    
+    const response = await fetch(buildBackendUrl(`inventory/suggestions/stream?${backendParams.toString()}`), {
       method: 'GET',
-      headers: {
-        'Accept': 'text/event-stream',
-      },
+      headers,
     })
 
     if (!response.ok) {
@@ -406,9 +406,15 @@ export const InventoryReviewTable = memo(forwardRef<InventoryReviewTableRef, Inv
                   newSuggestions.push(data.suggestion)
                   break
                   
+                case 'suggestions':
+                  // Batched suggestions (server coalesces several items per frame)
+                  newSuggestions.push(...(data.suggestions || []))
+                  break
+                  
                 case 'complete':
+                    // The complete event only carries totals - use the suggestions streamed so far
                     // Add originalIndex to maintain stable sort order during user interactions
-                    const suggestionsWithIndex = (data.suggestions || []).map((s: any, index: number) => ({
+                    const suggestionsWithIndex = (data.suggestions || newSuggestions).map((s: any, index: number) => ({
                       ...s,
                       originalIndex: index
                     }))
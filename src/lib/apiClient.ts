@@ -50,6 +50,22 @@ export interface ApiError {
   detail: string;
 }
 
+export interface BulkApplyJob {
+  jobId: string;
+  status: 'running' | 'completed' | 'failed';
+  processed: number;
+  total: number;
+  error?: string;
+  result?: {
+    message: string;
+    successful_updates: number;
+    errors: number;
+    results: { listingId: number; success: boolean; newPrice?: number; error?: string }[];
+  };
+}
+
+const BULK_APPLY_POLL_MS = 2000;
+
 export class ApiClient {
   private baseUrl: string;
   private sessionId: string | null;
@@ -163,12 +179,22 @@ export class ApiClient {
     });
   }
 
-  async bulkApply(listingIds: number[]) {
+  // Starts a background bulk apply and polls it; resolves with the result once it has finished
+  async bulkApply(listingIds: number[], onProgress?: (processed: number, total: number) => void) {
     const sessionId = localStorage.getItem('waxvalue_session_id');
-    return this.request(`/inventory/bulk-apply?session_id=${sessionId}`, {
+    let job = await this.request<BulkApplyJob>(`/inventory/bulk-apply?session_id=${sessionId}`, {
       method: 'POST',
       body: JSON.stringify({ listingIds }),
     });
+    while (job.status === 'running') {
+      onProgress?.(job.processed, job.total);
+      await new Promise(resolve => setTimeout(resolve, BULK_APPLY_POLL_MS));
+      job = await this.request<BulkApplyJob>(`/inventory/bulk-apply/${job.jobId}?session_id=${sessionId}`);
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Bulk apply failed');
+    }
+    return job.result;
   }
 
   async bulkDecline(listingIds: number[]) {
@@ -25,6 +25,7 @@ export interface UserSettings {
   maxChangePercent: number
   apiRateLimitSeconds: number
   logRetentionDays: number
+  analysisOrder?: AnalysisOrder
 }
 
 // Discogs API Types
@@ -129,6 +130,31 @@ export interface RunLog {
   errors: number
   status: 'completed' | 'failed' | 'partial'
   errorMessage?: string
+  durationSeconds?: number
+  runConfig?: {
+    order?: AnalysisOrder
+    profile?: RunProfile
+  }
+}
+
+export type AnalysisOrder = 'duplicated' | 'price_desc' | 'stale' | 'recent'
+
+export interface RunProfile {
+  phases: Record<'profile' | 'inventory' | 'price_fetch' | 'compute' | 'persist', number>
+  itemsProcessed: number
+  cacheHits: number
+  cacheHitRate: number
+  apiCalls: number
+  apiErrors: number
+  retries: number
+  bytesReceived: number
+  networkSeconds: number
+  rateLimitWaitSeconds: number
+  schedulerWaitSeconds: number
+  retrySleepSeconds: number
+  peakMemoryMb: number | null
+  memoryGrowthMb: number | null
+  memorySource: 'tracemalloc' | 'rss_sampled' | 'unavailable'
 }
 
 export interface ListingSnapshot {